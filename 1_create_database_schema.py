@@ -14,6 +14,19 @@ os.makedirs("data", exist_ok=True)
 conn = sqlite3.connect(DB_PATH)
 cur = conn.cursor()
 
+# page_size cannot change in WAL mode; VACUUM rebuilds an existing file at the new size
+if cur.execute("PRAGMA page_size").fetchone()[0] != 8192:
+    cur.execute("PRAGMA journal_mode=DELETE")
+    cur.execute("PRAGMA page_size=8192")
+    cur.execute("VACUUM")
+
+# WAL is persistent, so every downstream script inherits it
+cur.execute("PRAGMA journal_mode=WAL")
+cur.execute("PRAGMA synchronous=NORMAL")
+cur.execute("PRAGMA temp_store=MEMORY")
+cur.execute("PRAGMA cache_size=-131072")  # 128 MiB
+cur.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+
 # ----------------------------
 # CREATE TABLES
 # ----------------------------
@@ -135,9 +148,20 @@ CREATE TABLE IF NOT EXISTS player_attributes (
     CA_MID REAL,
     CA_FWD REAL
 );
+
+CREATE INDEX IF NOT EXISTS idx_players_name ON players(player_name);
+-- Per-competition/season slices of player_stats (e.g. the competition_id=0, season_id=0 aggregate rows)
+CREATE INDEX IF NOT EXISTS idx_ps_comp_season ON player_stats(competition_id, season_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ps_player_comp_season ON player_stats(player_id, competition_id, season_id);
+CREATE INDEX IF NOT EXISTS idx_ps_minutes ON player_stats(minutes_played);
+-- Top scorer / assist lists: walk in per-90 order, filter on minutes from the index, stop at LIMIT
+-- (planner statistics come from the ANALYZE that script 4 and the mapper run after loading)
+CREATE INDEX IF NOT EXISTS idx_ps_goals_minutes ON player_stats(goals_per90 DESC, minutes_played);
+CREATE INDEX IF NOT EXISTS idx_ps_assists_minutes ON player_stats(assists_per90 DESC, minutes_played);
 """)
 
 conn.commit()
+cur.execute("PRAGMA optimize")
 conn.close()
 
 print(f"✅ Database schema created successfully at {DB_PATH}")
@@ -7,6 +7,15 @@ from tqdm import tqdm
 # ----------------------------
 DB_PATH = "data/statsbomb.db"
 
+INSERT_COMPETITION_SQL = """
+INSERT OR IGNORE INTO competitions (competition_id, competition_name, season_id, season_name)
+VALUES (?, ?, ?, ?)
+"""
+INSERT_MATCH_SQL = """
+INSERT OR IGNORE INTO matches (match_id, competition_id, season_id, date, home_team, away_team, home_score, away_score)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 # Major competitions to fetch - Focus on latest seasons (2020-2024)
 COMPETITIONS = [
     # Major European Leagues (Latest 3-4 seasons)
@@ -32,33 +41,38 @@ COMPETITIONS = [
 # ----------------------------
 # Connect to SQLite
 # ----------------------------
-conn = sqlite3.connect(DB_PATH)
+# Autocommit mode; transactions are opened explicitly with BEGIN
+conn = sqlite3.connect(DB_PATH, isolation_level=None)
 cur = conn.cursor()
+# synchronous is per-connection; journal_mode=WAL is set by script 1
+cur.execute("PRAGMA synchronous=NORMAL")
+cur.execute("PRAGMA cache_size=-131072")  # 128 MiB
+cur.execute("PRAGMA mmap_size=268435456")  # 256 MiB
 
 # ----------------------------
 # HELPER FUNCTIONS
 # ----------------------------
-def get_latest_seasons(comp_id, max_seasons=4):
+def get_latest_seasons(comp_id, seasons_by_comp, max_seasons=4):
     """Get latest available seasons for a competition"""
-    try:
-        comps_df = sb.competitions()
-        available_seasons = comps_df[comps_df.competition_id == comp_id]['season_id'].tolist()
-        # Prioritize seasons from 2020 onwards (Season IDs 100+ are typically 2020+)
-        recent_seasons = [s for s in available_seasons if s >= 100]
-        if recent_seasons:
-            return sorted(recent_seasons, reverse=True)[:max_seasons]
-        else:
-            return sorted(available_seasons, reverse=True)[:max_seasons]
-    except Exception as e:
-        print(f"  Error fetching seasons for comp {comp_id}: {e}")
-        return []
+    available_seasons = seasons_by_comp.get(comp_id, [])
+    # Prioritize seasons from 2020 onwards (Season IDs 100+ are typically 2020+)
+    recent_seasons = [s for s in available_seasons if s >= 100]
+    if recent_seasons:
+        return sorted(recent_seasons, reverse=True)[:max_seasons]
+    else:
+        return sorted(available_seasons, reverse=True)[:max_seasons]
 
 # ----------------------------
 # FETCH COMPETITIONS AND MATCHES
 # ----------------------------
 print("Detecting latest available seasons...")
+# The competitions catalogue does not change during a run, so fetch it once
+COMPS_DF = sb.competitions()
+SEASONS_BY_COMP = COMPS_DF.groupby("competition_id")["season_id"].agg(list).to_dict()
+SEASON_NAME = dict(zip(zip(COMPS_DF.competition_id, COMPS_DF.season_id), COMPS_DF.season_name))
+
 for comp in COMPETITIONS:
-    latest_seasons = get_latest_seasons(comp["id"])
+    latest_seasons = get_latest_seasons(comp["id"], SEASONS_BY_COMP)
     if latest_seasons:
         comp["seasons"] = latest_seasons
         print(f"  {comp['name']}: Found seasons {latest_seasons}")
@@ -73,17 +87,12 @@ for comp in tqdm(COMPETITIONS, desc="Processing competitions"):
     for season_id in comp["seasons"]:
         try:
             # Get competition info
-            comps_df = sb.competitions()
-            comp_info = comps_df[(comps_df.competition_id == comp_id) & (comps_df.season_id == season_id)]
+            season_name = SEASON_NAME.get((comp_id, season_id))
             
-            if len(comp_info) > 0:
-                season_name = comp_info["season_name"].iloc[0]
-                
+            if season_name is not None:
                 # Insert competition
-                cur.execute("""
-                INSERT OR IGNORE INTO competitions (competition_id, competition_name, season_id, season_name)
-                VALUES (?, ?, ?, ?)
-                """, (comp_id, comp_name, season_id, season_name))
+                cur.execute("BEGIN")
+                cur.execute(INSERT_COMPETITION_SQL, (comp_id, comp_name, season_id, season_name))
                 
                 # Get matches for this competition/season
                 matches = sb.matches(competition_id=comp_id, season_id=season_id)
@@ -91,29 +100,24 @@ for comp in tqdm(COMPETITIONS, desc="Processing competitions"):
                 if len(matches) > 0:
                     print(f"  Found {len(matches)} matches in {comp_name} {season_name}")
                     
-                    # Insert matches
-                    for _, m in matches.iterrows():
-                        cur.execute("""
-                        INSERT OR IGNORE INTO matches (match_id, competition_id, season_id, date, home_team, away_team, home_score, away_score)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            m["match_id"],
-                            comp_id,
-                            season_id,
-                            m.get("match_date", ""),
-                            m.get("home_team", ""),
-                            m.get("away_team", ""),
-                            m.get("home_score", 0),
-                            m.get("away_score", 0)
-                        ))
-                        all_matches.append(m["match_id"])
+                    # Insert matches in a single batch
+                    cols = matches[["match_id", "match_date", "home_team", "away_team", "home_score", "away_score"]]
+                    cols = cols.fillna({"home_score": 0, "away_score": 0})
+                    rows = [
+                        (match_id, comp_id, season_id, *rest)
+                        for match_id, *rest in cols.itertuples(index=False, name=None)
+                    ]
+                    cur.executemany(INSERT_MATCH_SQL, rows)
+                    all_matches.extend(r[0] for r in rows)
+
+                # One commit per competition/season
+                conn.commit()
                         
         except Exception as e:
             print(f"  Error processing {comp_name} season {season_id}: {e}")
+            conn.rollback()
             continue
 
-conn.commit()
-
 # Save match list for next script
 with open("data/matches_to_process.txt", "w") as f:
     for match_id in all_matches:
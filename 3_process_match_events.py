@@ -1,7 +1,12 @@
 import sqlite3
 import pandas as pd
+import numpy as np
 from statsbombpy import sb
 import os
+import asyncio
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
 from tqdm import tqdm
 
 # ----------------------------
@@ -9,8 +14,161 @@ from tqdm import tqdm
 # ----------------------------
 DB_PATH = "data/statsbomb.db"
 CHECKPOINT_INTERVAL = 50
+FETCH_CONCURRENCY = 16
 checkpoint_file = "data/checkpoint_matches.txt"
-processed_matches_file = "data/processed_players.csv"
+# Append-only Parquet parts, one per checkpoint interval
+processed_players_dir = "data/processed_players"
+# Single-file output of earlier versions, migrated into processed_players_dir on first run
+legacy_players_csv = "data/processed_players.csv"
+
+SELECT_MATCH_INFO_SQL = "SELECT competition_id, season_id FROM matches WHERE match_id = ?"
+
+# ----------------------------
+# HELPER FUNCTIONS
+# ----------------------------
+# Column order of the per-match player records
+PLAYER_MATCH_COLS = [
+    "player", "match_id", "competition_id", "season_id", "minutes_played", "matches_played",
+    # Passing
+    "passes", "completed_passes", "key_passes", "assists",
+    # Shooting
+    "shots", "shots_on_target", "goals", "xG", "xA",
+    # Dribbling
+    "dribbles", "dribbles_successful",
+    # Defending
+    "tackles", "tackles_won", "interceptions", "clearances", "blocks",
+    # Aerial
+    "aerial_duels", "aerial_duels_won",
+    # Advanced
+    "pressures", "fouls_committed", "fouls_won", "cards_yellow", "cards_red",
+    # Goalkeeping (simplified)
+    "saves", "clean_sheets", "goals_conceded"
+]
+
+# Narrow types: per-match counts fit in int16, xG/xA in float32
+ID_TYPES = {"match_id": pa.int32(), "competition_id": pa.int16(), "season_id": pa.int16()}
+SCHEMA = pa.schema(
+    [("player", pa.string())] +
+    [(c, ID_TYPES.get(c, pa.float32() if c in ("xG", "xA") else pa.int16())) for c in PLAYER_MATCH_COLS[1:]]
+)
+
+# String columns compared against literals; as categoricals the compares run on integer codes
+CATEGORY_COLS = [
+    "type", "pass_outcome", "shot_outcome", "dribble_outcome", "tackle_outcome",
+    "duel_type", "duel_outcome", "card_type"
+]
+
+def aggregate_match_events(events, match_id, comp_id, season_id):
+    """Aggregate one match's events into a per-player Arrow table with a single groupby"""
+    events = events[events["player"].notna()]
+    events = events.astype({c: "category" for c in CATEGORY_COLS if c in events.columns})
+    columns = events.columns
+    etype = events["type"]
+
+    def outcome(col, mask, fallback):
+        # Outcome columns are only present when the match has such events
+        return mask(events[col]) if col in columns else fallback
+
+    no_rows = pd.Series(False, index=events.index)
+    is_pass = etype == "Pass"
+    is_shot = etype == "Shot"
+    is_dribble = etype == "Dribble"
+    is_tackle = etype == "Tackle"
+    is_card = etype == "Card"
+    is_aerial = (etype == "Duel") & outcome("duel_type", lambda c: c == "Aerial", no_rows)
+    is_goal = is_shot & outcome("shot_outcome", lambda c: c == "Goal", no_rows)
+
+    flags = events[["player", "minute"]].assign(
+        # Passing
+        passes=is_pass,
+        completed_passes=is_pass & outcome("pass_outcome", lambda c: c == "Complete", True),
+        key_passes=is_pass & outcome("pass_goal_assist", lambda c: c == True, no_rows),
+        assists=is_goal,
+        # Shooting
+        shots=is_shot,
+        shots_on_target=is_shot & outcome("shot_outcome", lambda c: c.isin(["Goal", "Saved"]), True),
+        goals=is_goal,
+        xG=events["shot_statsbomb_xg"].where(is_shot, 0) if "shot_statsbomb_xg" in columns else 0.0,
+        xA=events["pass_statsbomb_xa"].where(is_pass, 0) if "pass_statsbomb_xa" in columns else 0.0,
+        # Dribbling
+        dribbles=is_dribble,
+        dribbles_successful=is_dribble & outcome("dribble_outcome", lambda c: c == "Complete", True),
+        # Defending
+        tackles=is_tackle,
+        tackles_won=is_tackle & outcome("tackle_outcome", lambda c: c == "Won", True),
+        interceptions=etype == "Interception",
+        clearances=etype == "Clearance",
+        blocks=etype == "Block",
+        # Aerial
+        aerial_duels=is_aerial,
+        aerial_duels_won=is_aerial & outcome("duel_outcome", lambda c: c == "Won", no_rows),
+        # Advanced
+        pressures=etype == "Pressure",
+        fouls_committed=etype == "Foul Committed",
+        fouls_won=etype == "Foul Won",
+        cards_yellow=is_card & outcome("card_type", lambda c: c == "Yellow Card", no_rows),
+        cards_red=is_card & outcome("card_type", lambda c: c == "Red Card", no_rows),
+    )
+
+    counts = flags.drop(columns="minute").groupby("player", sort=False).sum()
+    counts.insert(0, "minutes_played", flags.groupby("player", sort=False)["minute"].max())
+    counts = counts[counts["minutes_played"] != 0]
+
+    # Build the Arrow table straight from the grouped columns
+    n = len(counts)
+    columns = {c: counts[c].to_numpy() for c in counts.columns}
+    columns["player"] = counts.index.to_numpy()
+    constants = {
+        "match_id": match_id, "competition_id": comp_id, "season_id": season_id,
+        "matches_played": 1, "saves": 0, "clean_sheets": 0, "goals_conceded": 0
+    }
+    arrays = [pa.array(columns["player"], type=pa.string())]
+    for c in PLAYER_MATCH_COLS[1:]:
+        dtype = SCHEMA.field(c).type.to_pandas_dtype()
+        values = columns[c].astype(dtype) if c in columns else np.full(n, constants[c], dtype=dtype)
+        arrays.append(pa.array(values, type=SCHEMA.field(c).type))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+async def fetch_events(match_ids, queue):
+    """Download match events concurrently and hand them to the consumer in completion order"""
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch(match_id):
+        async with semaphore:
+            try:
+                events = await asyncio.to_thread(sb.events, match_id=match_id)
+            except Exception as e:
+                events = e
+            await queue.put((match_id, events))
+
+    await asyncio.gather(*(fetch(m) for m in match_ids))
+
+# Parquet part currently being written; "_" prefixed files are ignored by readers
+part_writer = None
+part_paths = None
+
+def write_player_records(table):
+    """Append one match's player records to the open Parquet part"""
+    global part_writer, part_paths
+    if part_writer is None:
+        name = f"part-{time.time_ns()}.parquet"
+        part_paths = (os.path.join(processed_players_dir, "_" + name), os.path.join(processed_players_dir, name))
+        part_writer = pq.ParquetWriter(part_paths[0], SCHEMA)
+    part_writer.write_table(table)
+
+def flush_player_records():
+    """Close the open Parquet part so it becomes visible to readers"""
+    global part_writer
+    if part_writer is not None:
+        part_writer.close()
+        os.replace(*part_paths)
+        part_writer = None
+
+def save_checkpoint():
+    """Publish the open Parquet part, then append the matches it covers to the checkpoint"""
+    flush_player_records()
+    checkpoint_f.writelines(f"{m}\n" for m in pending_matches)
+    pending_matches.clear()
 
 # ----------------------------
 # Load match list
@@ -24,12 +182,40 @@ print(f"Found {len(all_matches)} matches to process")
 # ----------------------------
 # Connect to SQLite
 # ----------------------------
-conn = sqlite3.connect(DB_PATH)
+# Read-only use; autocommit avoids the implicit transaction bookkeeping
+conn = sqlite3.connect(DB_PATH, isolation_level=None)
 cur = conn.cursor()
+# synchronous is per-connection; journal_mode=WAL is set by script 1
+cur.execute("PRAGMA synchronous=NORMAL")
+cur.execute("PRAGMA cache_size=-131072")  # 128 MiB
+cur.execute("PRAGMA mmap_size=268435456")  # 256 MiB
 
 # ----------------------------
 # CHECKPOINT SYSTEM
 # ----------------------------
+# Player data from earlier runs stays in its Parquet parts
+os.makedirs(processed_players_dir, exist_ok=True)
+# "_" parts are leftovers of runs that crashed mid-part; their matches were never checkpointed
+for name in os.listdir(processed_players_dir):
+    if name.startswith("_"):
+        os.remove(os.path.join(processed_players_dir, name))
+has_parts = any(n.endswith(".parquet") and not n.startswith("_") for n in os.listdir(processed_players_dir))
+
+# Runs before the Parquet parts kept their records in one CSV: carry it over as the first part
+if not has_parts and os.path.exists(legacy_players_csv):
+    print(f"Converting {legacy_players_csv} into a Parquet part...")
+    legacy = pd.read_csv(legacy_players_csv)
+    legacy_table = pa.Table.from_pandas(legacy[PLAYER_MATCH_COLS], schema=SCHEMA, preserve_index=False)
+    name = f"part-{time.time_ns()}.parquet"
+    pq.write_table(legacy_table, os.path.join(processed_players_dir, "_" + name))
+    os.replace(os.path.join(processed_players_dir, "_" + name), os.path.join(processed_players_dir, name))
+    has_parts = True
+
+# A checkpoint without any player records would skip matches whose rows exist nowhere: start over
+if not has_parts and os.path.exists(checkpoint_file):
+    print("⚠️ Checkpoint found but no processed player records; ignoring it and reprocessing all matches")
+    os.remove(checkpoint_file)
+
 # Load previously processed matches if checkpoint exists
 processed_matches = set()
 if os.path.exists(checkpoint_file):
@@ -37,15 +223,11 @@ if os.path.exists(checkpoint_file):
         processed_matches = set(line.strip() for line in f)
     print(f"Resuming from checkpoint: {len(processed_matches)} matches already processed")
 
-# Load existing player data if available
-all_players = []
-if os.path.exists(processed_matches_file):
-    try:
-        df_existing = pd.read_csv(processed_matches_file)
-        all_players.append(df_existing)
-        print(f"Loaded existing player data: {len(df_existing)} records")
-    except:
-        print("Could not load existing player data, starting fresh")
+# Matches finished since the last checkpoint; appended once their data is on disk
+pending_matches = []
+checkpoint_f = open(checkpoint_file, 'a', buffering=1)
+
+records_written = 0
 
 # ----------------------------
 # PROCESS MATCH EVENTS
@@ -55,166 +237,69 @@ print(f"Processing {len(matches_to_process)} new matches...")
 
 pbar = tqdm(total=len(matches_to_process), desc="Processing matches", unit="match")
 
-for i, match_id in enumerate(matches_to_process):
-    pbar.set_description(f"Match {match_id}")
+async def process_matches():
+    global records_written
+    # Network fetches overlap; aggregation and SQLite reads stay on this thread
+    queue = asyncio.Queue(maxsize=FETCH_CONCURRENCY)
+    producer = asyncio.create_task(fetch_events(matches_to_process, queue))
+
+    for i in range(len(matches_to_process)):
+        match_id, events = await queue.get()
+        pbar.set_description(f"Match {match_id}")
     
-    try:
-        events = sb.events(match_id=match_id)
+        try:
+            if isinstance(events, Exception):
+                raise events
         
-        if len(events) == 0:
-            processed_matches.add(str(match_id))
-            pbar.update(1)
-            continue
-            
-        # Get match info for competition/season
-        match_info = cur.execute(
-            "SELECT competition_id, season_id FROM matches WHERE match_id = ?", 
-            (match_id,)
-        ).fetchone()
-        
-        if not match_info:
-            processed_matches.add(str(match_id))
-            pbar.update(1)
-            continue
+            if len(events) == 0:
+                pending_matches.append(match_id)
+                pbar.update(1)
+                continue
             
-        comp_id, season_id = match_info
-
-        # Compute per-player stats
-        player_stats = []
+            # Get match info for competition/season
+            match_info = cur.execute(SELECT_MATCH_INFO_SQL, (match_id,)).fetchone()
         
-        for player in events["player"].dropna().unique():
-            player_events = events[events["player"] == player]
-            
-            # Basic stats
-            minutes = player_events["minute"].max() if len(player_events) > 0 else 0
-            if minutes == 0:
+            if not match_info:
+                pending_matches.append(match_id)
+                pbar.update(1)
                 continue
-                
-            # Passing stats
-            passes = player_events[player_events["type"] == "Pass"]
-            completed_passes = passes[passes.get("pass_outcome", "") == "Complete"] if "pass_outcome" in passes.columns else passes
-            key_passes = passes[passes.get("pass_goal_assist", False) == True] if "pass_goal_assist" in passes.columns else pd.DataFrame()
-            
-            # Shooting stats
-            shots = player_events[player_events["type"] == "Shot"]
-            shots_on_target = shots[shots.get("shot_outcome", "").isin(["Goal", "Saved"])] if "shot_outcome" in shots.columns else shots
-            goals = shots[shots.get("shot_outcome", "") == "Goal"] if "shot_outcome" in shots.columns else pd.DataFrame()
-            
-            # Dribbling stats
-            dribbles = player_events[player_events["type"] == "Dribble"]
-            successful_dribbles = dribbles[dribbles.get("dribble_outcome", "") == "Complete"] if "dribble_outcome" in dribbles.columns else dribbles
-            
-            # Defensive stats
-            tackles = player_events[player_events["type"] == "Tackle"]
-            won_tackles = tackles[tackles.get("tackle_outcome", "") == "Won"] if "tackle_outcome" in tackles.columns else tackles
-            interceptions = player_events[player_events["type"] == "Interception"]
-            clearances = player_events[player_events["type"] == "Clearance"]
-            blocks = player_events[player_events["type"] == "Block"]
-            
-            # Aerial stats
-            aerial_duels = player_events[player_events["type"] == "Duel"]
-            aerial_duels = aerial_duels[aerial_duels.get("duel_type", "") == "Aerial"] if "duel_type" in aerial_duels.columns else pd.DataFrame()
-            won_aerial_duels = aerial_duels[aerial_duels.get("duel_outcome", "") == "Won"] if "duel_outcome" in aerial_duels.columns else pd.DataFrame()
-            
-            # Advanced stats
-            pressures = player_events[player_events["type"] == "Pressure"]
-            fouls_committed = player_events[player_events["type"] == "Foul Committed"]
-            fouls_won = player_events[player_events["type"] == "Foul Won"]
             
-            # xG and xA
-            xG = shots["shot_statsbomb_xg"].sum() if "shot_statsbomb_xg" in shots.columns else 0
-            xA = passes["pass_statsbomb_xa"].sum() if "pass_statsbomb_xa" in passes.columns else 0
-            
-            # Cards
-            cards = player_events[player_events["type"] == "Card"]
-            yellow_cards = len(cards[cards.get("card_type", "") == "Yellow Card"]) if "card_type" in cards.columns else 0
-            red_cards = len(cards[cards.get("card_type", "") == "Red Card"]) if "card_type" in cards.columns else 0
-            
-            player_stat = {
-                "player": player,
-                "match_id": match_id,
-                "competition_id": comp_id,
-                "season_id": season_id,
-                "minutes_played": minutes,
-                "matches_played": 1,
-                # Passing
-                "passes": len(passes),
-                "completed_passes": len(completed_passes),
-                "key_passes": len(key_passes),
-                "assists": len(goals),
-                # Shooting
-                "shots": len(shots),
-                "shots_on_target": len(shots_on_target),
-                "goals": len(goals),
-                "xG": xG,
-                "xA": xA,
-                # Dribbling
-                "dribbles": len(dribbles),
-                "dribbles_successful": len(successful_dribbles),
-                # Defending
-                "tackles": len(tackles),
-                "tackles_won": len(won_tackles),
-                "interceptions": len(interceptions),
-                "clearances": len(clearances),
-                "blocks": len(blocks),
-                # Aerial
-                "aerial_duels": len(aerial_duels),
-                "aerial_duels_won": len(won_aerial_duels),
-                # Advanced
-                "pressures": len(pressures),
-                "fouls_committed": len(fouls_committed),
-                "fouls_won": len(fouls_won),
-                "cards_yellow": yellow_cards,
-                "cards_red": red_cards,
-                # Goalkeeping (simplified)
-                "saves": 0,
-                "clean_sheets": 0,
-                "goals_conceded": 0
-            }
-            
-            player_stats.append(player_stat)
-        
-        if player_stats:
-            df_match = pd.DataFrame(player_stats)
-            all_players.append(df_match)
+            comp_id, season_id = match_info
+
+            # Compute per-player stats
+            match_records = aggregate_match_events(events, match_id, comp_id, season_id)
+            if match_records.num_rows > 0:
+                write_player_records(match_records)
+                records_written += match_records.num_rows
             
-        # Mark match as processed
-        processed_matches.add(str(match_id))
+            # Mark match as processed
+            pending_matches.append(match_id)
         
-        # Save checkpoint every CHECKPOINT_INTERVAL matches
-        if (i + 1) % CHECKPOINT_INTERVAL == 0:
-            # Save processed matches list
-            with open(checkpoint_file, 'w') as f:
-                for match in processed_matches:
-                    f.write(f"{match}\n")
-            
-            # Save current player data
-            if all_players:
-                df_current = pd.concat(all_players, ignore_index=True)
-                df_current.to_csv(processed_matches_file, index=False)
-                pbar.set_postfix({"Saved": f"{len(df_current)} records"})
+            # Save checkpoint every CHECKPOINT_INTERVAL matches
+            if (i + 1) % CHECKPOINT_INTERVAL == 0:
+                save_checkpoint()
+                pbar.set_postfix({"Saved": f"{records_written} records"})
             
-    except Exception as e:
-        pbar.set_postfix({"Error": f"{str(e)[:30]}..."})
-        processed_matches.add(str(match_id))
-        continue
+        except Exception as e:
+            pbar.set_postfix({"Error": f"{str(e)[:30]}..."})
+            pending_matches.append(match_id)
+            continue
     
-    pbar.update(1)
+        pbar.update(1)
+
+    await producer
+
+asyncio.run(process_matches())
 
 pbar.close()
 
-# Final save of all data
-if all_players:
-    df_players = pd.concat(all_players, ignore_index=True)
-    print(f"\nProcessed {len(df_players)} player-match records")
-    
-    # Save final checkpoint
-    with open(checkpoint_file, 'w') as f:
-        for match in processed_matches:
-            f.write(f"{match}\n")
-    
-    df_players.to_csv(processed_matches_file, index=False)
-    print(f"✅ Data saved to {processed_matches_file}")
+# Final save of all data and checkpoint
+save_checkpoint()
+checkpoint_f.close()
+
+if records_written:
+    print(f"\nProcessed {records_written} player-match records")
+    print(f"✅ Data saved to {processed_players_dir}")
 else:
     print("No player data found")
 
@@ -1,63 +1,83 @@
 import sqlite3
 import pandas as pd
-from tqdm import tqdm
 
 # ----------------------------
 # CONFIG
 # ----------------------------
 DB_PATH = "data/statsbomb.db"
-processed_matches_file = "data/processed_players.csv"
+processed_players_dir = "data/processed_players"
+
+# player_stats columns after (player_id, competition_id, season_id)
+STATS_COLS = [
+    "minutes_played", "matches_played",
+    "passes_per90", "completed_passes_per90", "pass_accuracy", "key_passes_per90", "assists_per90",
+    "shots_per90", "shots_on_target_per90", "goals_per90", "xG_per90", "xA_per90",
+    "dribbles_per90", "dribbles_successful_per90",
+    "tackles_per90", "tackles_won_per90", "interceptions_per90", "clearances_per90", "blocks_per90",
+    "aerial_duels_per90", "aerial_duels_won_per90",
+    "pressures_per90", "fouls_committed_per90", "fouls_won_per90", "cards_yellow", "cards_red"
+]
+
+# Counting stats converted to per-90 rates
+PER90_COLS = [
+    "passes", "completed_passes", "key_passes", "assists",
+    "shots", "shots_on_target", "goals", "xG", "xA",
+    "dribbles", "dribbles_successful",
+    "tackles", "tackles_won", "interceptions", "clearances", "blocks",
+    "aerial_duels", "aerial_duels_won",
+    "pressures", "fouls_committed", "fouls_won"
+]
+
+# Columns summed per player
+SUM_COLS = ["minutes_played", "matches_played"] + PER90_COLS + ["cards_yellow", "cards_red"]
+
+INSERT_PLAYER_SQL = "INSERT OR IGNORE INTO players (player_name) VALUES (?)"
+INSERT_PLAYER_STAT_SQL = """
+INSERT INTO player_stats (
+    player_id, competition_id, season_id, minutes_played, matches_played,
+    passes_per90, completed_passes_per90, pass_accuracy, key_passes_per90, assists_per90,
+    shots_per90, shots_on_target_per90, goals_per90, xG_per90, xA_per90,
+    dribbles_per90, dribbles_successful_per90,
+    tackles_per90, tackles_won_per90, interceptions_per90, clearances_per90, blocks_per90,
+    aerial_duels_per90, aerial_duels_won_per90,
+    pressures_per90, fouls_committed_per90, fouls_won_per90, cards_yellow, cards_red
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(player_id, competition_id, season_id) DO UPDATE SET
+""" + ",\n".join(f"    {c} = excluded.{c}" for c in STATS_COLS)
+
+# player_stats joined to player names, limited to the dashboard's 500-minute cut
+CREATE_STATS_DENORM_SQL = """
+CREATE TABLE player_stats_denorm AS
+SELECT ps.*, p.player_name
+FROM player_stats ps
+JOIN players p ON ps.player_id = p.player_id
+WHERE ps.minutes_played >= 500
+"""
 
 # ----------------------------
 # Load processed player data
 # ----------------------------
 print("Loading processed player data...")
-df_players = pd.read_csv(processed_matches_file)
+df_players = pd.read_parquet(processed_players_dir, columns=["player"] + SUM_COLS)
 print(f"Loaded {len(df_players)} player-match records")
 
 # ----------------------------
 # Connect to SQLite
 # ----------------------------
-conn = sqlite3.connect(DB_PATH)
+# Autocommit mode; transactions are opened explicitly with BEGIN
+conn = sqlite3.connect(DB_PATH, isolation_level=None)
 cur = conn.cursor()
+# synchronous is per-connection; journal_mode=WAL is set by script 1
+cur.execute("PRAGMA synchronous=NORMAL")
+cur.execute("PRAGMA cache_size=-131072")  # 128 MiB
+cur.execute("PRAGMA mmap_size=268435456")  # 256 MiB
 
 # ----------------------------
 # Aggregate player stats
 # ----------------------------
 print("Aggregating player statistics...")
-agg = df_players.groupby("player").agg(
-    minutes_played=("minutes_played", "sum"),
-    matches_played=("matches_played", "sum"),
-    # Passing
-    passes=("passes", "sum"),
-    completed_passes=("completed_passes", "sum"),
-    key_passes=("key_passes", "sum"),
-    assists=("assists", "sum"),
-    # Shooting
-    shots=("shots", "sum"),
-    shots_on_target=("shots_on_target", "sum"),
-    goals=("goals", "sum"),
-    xG=("xG", "sum"),
-    xA=("xA", "sum"),
-    # Dribbling
-    dribbles=("dribbles", "sum"),
-    dribbles_successful=("dribbles_successful", "sum"),
-    # Defending
-    tackles=("tackles", "sum"),
-    tackles_won=("tackles_won", "sum"),
-    interceptions=("interceptions", "sum"),
-    clearances=("clearances", "sum"),
-    blocks=("blocks", "sum"),
-    # Aerial
-    aerial_duels=("aerial_duels", "sum"),
-    aerial_duels_won=("aerial_duels_won", "sum"),
-    # Advanced
-    pressures=("pressures", "sum"),
-    fouls_committed=("fouls_committed", "sum"),
-    fouls_won=("fouls_won", "sum"),
-    cards_yellow=("cards_yellow", "sum"),
-    cards_red=("cards_red", "sum")
-).reset_index()
+# One multi-column sum instead of a named aggregation per column
+agg = df_players.groupby("player", sort=False)[SUM_COLS].sum().reset_index()
 
 # ----------------------------
 # Compute per-90 stats
@@ -65,39 +85,10 @@ agg = df_players.groupby("player").agg(
 print("Computing per-90 statistics...")
 minutes_90 = agg["minutes_played"] / 90
 
-# Passing
-agg["passes_per90"] = agg["passes"] / minutes_90
-agg["completed_passes_per90"] = agg["completed_passes"] / minutes_90
+# One (players x stats) divide instead of a Series division per column
+per90 = agg[PER90_COLS].to_numpy(dtype=float) / minutes_90.to_numpy()[:, None]
+agg = pd.concat([agg, pd.DataFrame(per90, columns=[c + "_per90" for c in PER90_COLS], index=agg.index)], axis=1)
 agg["pass_accuracy"] = (agg["completed_passes"] / agg["passes"] * 100).fillna(0)
-agg["key_passes_per90"] = agg["key_passes"] / minutes_90
-agg["assists_per90"] = agg["assists"] / minutes_90
-
-# Shooting
-agg["shots_per90"] = agg["shots"] / minutes_90
-agg["shots_on_target_per90"] = agg["shots_on_target"] / minutes_90
-agg["goals_per90"] = agg["goals"] / minutes_90
-agg["xG_per90"] = agg["xG"] / minutes_90
-agg["xA_per90"] = agg["xA"] / minutes_90
-
-# Dribbling
-agg["dribbles_per90"] = agg["dribbles"] / minutes_90
-agg["dribbles_successful_per90"] = agg["dribbles_successful"] / minutes_90
-
-# Defending
-agg["tackles_per90"] = agg["tackles"] / minutes_90
-agg["tackles_won_per90"] = agg["tackles_won"] / minutes_90
-agg["interceptions_per90"] = agg["interceptions"] / minutes_90
-agg["clearances_per90"] = agg["clearances"] / minutes_90
-agg["blocks_per90"] = agg["blocks"] / minutes_90
-
-# Aerial
-agg["aerial_duels_per90"] = agg["aerial_duels"] / minutes_90
-agg["aerial_duels_won_per90"] = agg["aerial_duels_won"] / minutes_90
-
-# Advanced
-agg["pressures_per90"] = agg["pressures"] / minutes_90
-agg["fouls_committed_per90"] = agg["fouls_committed"] / minutes_90
-agg["fouls_won_per90"] = agg["fouls_won"] / minutes_90
 
 print(f"Aggregated stats for {len(agg)} players")
 
@@ -107,80 +98,49 @@ print(f"Aggregated stats for {len(agg)} players")
 print("Inserting player data into database...")
 
 # Insert players
-players_inserted = 0
 print("Inserting players...")
-for _, row in tqdm(agg.iterrows(), total=len(agg), desc="Players", unit="player"):
-    try:
-        cur.execute("INSERT OR IGNORE INTO players (player_name) VALUES (?)", (row["player"],))
-        players_inserted += 1
-    except Exception as e:
-        print(f"  Error inserting player {row['player']}: {e}")
-        continue
-
+cur.execute("BEGIN")
+cur.executemany(INSERT_PLAYER_SQL, [(name,) for name in agg["player"]])
+players_inserted = cur.rowcount
 conn.commit()
 print(f"Inserted {players_inserted} players")
 
 # FIXED: Fetch actual player_id mapping from database instead of using enumerate
 print("Fetching player IDs from database...")
-player_id_map = {}
-for _, row in agg.iterrows():
-    result = cur.execute("SELECT player_id FROM players WHERE player_name = ?", (row["player"],)).fetchone()
-    if result:
-        player_id_map[row["player"]] = result[0]
+rows = cur.execute("SELECT player_name, MIN(player_id) FROM players GROUP BY player_name").fetchall()
+player_id_map = dict(rows)
 
 print(f"Mapped {len(player_id_map)} players to database IDs")
 
-# Delete existing stats before inserting (to avoid duplicates on re-run)
-print("Clearing existing aggregated stats...")
-cur.execute("DELETE FROM player_stats WHERE competition_id = 0 AND season_id = 0")
+agg["player_id"] = agg["player"].map(player_id_map)
+for name in agg.loc[agg["player_id"].isna(), "player"]:
+    print(f"  Warning: No player_id found for {name}")
+
+# Upsert on the (player_id, competition_id, season_id) unique index from script 1
+print("Inserting player stats...")
+cur.execute("BEGIN")
+# Frame in player_stats column order; competition_id=0, season_id=0 for aggregated stats
+stats_df = agg.loc[agg["player_id"].notna(), ["player_id"] + STATS_COLS].astype({"player_id": int})
+stats_df.insert(1, "competition_id", 0)
+stats_df.insert(2, "season_id", 0)
+# One prepared statement over all rows; faster than to_sql(method="multi") on SQLite
+cur.executemany(INSERT_PLAYER_STAT_SQL, stats_df.itertuples(index=False, name=None))
 conn.commit()
-
-# Insert player_stats with batch processing
-stats_inserted = 0
-batch_size = 100
-print(f"Inserting player stats in batches of {batch_size}...")
-
-for i in tqdm(range(0, len(agg), batch_size), desc="Batches", unit="batch"):
-    batch = agg.iloc[i:i+batch_size]
-    
-    for _, row in batch.iterrows():
-        try:
-            player_id = player_id_map.get(row["player"])
-            if player_id is None:
-                print(f"  Warning: No player_id found for {row['player']}")
-                continue
-                
-            cur.execute("""
-            INSERT INTO player_stats (
-                player_id, competition_id, season_id, minutes_played, matches_played,
-                passes_per90, completed_passes_per90, pass_accuracy, key_passes_per90, assists_per90,
-                shots_per90, shots_on_target_per90, goals_per90, xG_per90, xA_per90,
-                dribbles_per90, dribbles_successful_per90,
-                tackles_per90, tackles_won_per90, interceptions_per90, clearances_per90, blocks_per90,
-                aerial_duels_per90, aerial_duels_won_per90,
-                pressures_per90, fouls_committed_per90, fouls_won_per90, cards_yellow, cards_red
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                player_id, 0, 0,  # competition_id=0, season_id=0 for aggregated stats
-                row["minutes_played"], row["matches_played"],
-                row["passes_per90"], row["completed_passes_per90"], row["pass_accuracy"],
-                row["key_passes_per90"], row["assists_per90"],
-                row["shots_per90"], row["shots_on_target_per90"], row["goals_per90"],
-                row["xG_per90"], row["xA_per90"],
-                row["dribbles_per90"], row["dribbles_successful_per90"],
-                row["tackles_per90"], row["tackles_won_per90"], row["interceptions_per90"],
-                row["clearances_per90"], row["blocks_per90"],
-                row["aerial_duels_per90"], row["aerial_duels_won_per90"],
-                row["pressures_per90"], row["fouls_committed_per90"], row["fouls_won_per90"],
-                row["cards_yellow"], row["cards_red"]
-            ))
-            stats_inserted += 1
-        except Exception as e:
-            print(f"  Error inserting stats for {row['player']}: {e}")
-            continue
-    
-    conn.commit()
+stats_inserted = len(stats_df)
 
 print(f"Successfully inserted stats for {stats_inserted} players")
 
+# Rebuild the pre-joined, pre-filtered copy the dashboard reads
+print("Refreshing player_stats_denorm...")
+cur.execute("BEGIN")
+cur.execute("DROP TABLE IF EXISTS player_stats_denorm")
+cur.execute(CREATE_STATS_DENORM_SQL)
+cur.execute("CREATE INDEX idx_psd_minutes ON player_stats_denorm(minutes_played DESC)")
+cur.execute("CREATE INDEX idx_psd_goals ON player_stats_denorm(goals_per90 DESC)")
+cur.execute("CREATE INDEX idx_psd_assists ON player_stats_denorm(assists_per90 DESC)")
+conn.commit()
+
+# Planner statistics (sqlite_stat1) for the rows just written; PRAGMA optimize skips tables
+# this connection never queried
+cur.execute("ANALYZE")
 conn.close()
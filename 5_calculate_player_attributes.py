@@ -1,27 +1,50 @@
 import sqlite3
 import pandas as pd
 import numpy as np
-from tqdm import tqdm
 
 # ----------------------------
 # CONFIG
 # ----------------------------
 DB_PATH = "data/statsbomb.db"
 ATTR_TABLE = "player_attributes"
+RANDOM_SEED = None  # set to an int for reproducible ages and PA draws
+
+# Stat columns read by the attribute formulas
+STAT_COLS = [
+    "minutes_played",
+    "passes_per90", "pass_accuracy", "key_passes_per90", "assists_per90",
+    "shots_per90", "shots_on_target_per90", "goals_per90", "xG_per90",
+    "dribbles_per90", "dribbles_successful_per90",
+    "tackles_per90", "tackles_won_per90", "interceptions_per90", "clearances_per90",
+    "aerial_duels_per90", "aerial_duels_won_per90",
+    "saves_per90", "clean_sheets", "goals_conceded_per90",
+    "pressures_per90"
+]
+
+# League strength coefficients by competition_id (unknown competitions get 0.8)
+LEAGUE_COEFFS = {
+    2: 1.0, 49: 0.95, 11: 0.9, 12: 0.85, 9: 0.8,
+    37: 1.1, 38: 0.9, 55: 0.8,
+    43: 1.05, 50: 1.0, 72: 0.85, 44: 0.8, 45: 0.75
+}
 
 # ----------------------------
 # Connect to SQLite
 # ----------------------------
 conn = sqlite3.connect(DB_PATH)
 cur = conn.cursor()
+# synchronous is per-connection; journal_mode=WAL is set by script 1
+cur.execute("PRAGMA synchronous=NORMAL")
+cur.execute("PRAGMA cache_size=-131072")  # 128 MiB
 
 # ----------------------------
 # Load player stats from database
 # ----------------------------
 print("Loading player stats from database...")
-df_stats = pd.read_sql("""
-SELECT ps.*, p.player_name 
-FROM player_stats ps 
+# Only the columns the attribute formulas read
+df_stats = pd.read_sql(f"""
+SELECT ps.competition_id, {", ".join("ps." + c for c in STAT_COLS)}, p.player_name
+FROM player_stats ps
 JOIN players p ON ps.player_id = p.player_id
 """, conn)
 
@@ -32,300 +55,284 @@ if len(df_stats) == 0:
 
 print(f"Loaded {len(df_stats)} player records")
 
-# Add touches_per90 column (simplified calculation)
-df_stats["touches_per90"] = (df_stats["passes_per90"] + df_stats["dribbles_per90"]).fillna(0)
+# Normalise the schema once; everything below reads columns directly
+df_stats["competition_id"] = df_stats["competition_id"].fillna(0).astype("int32")
 
 # ----------------------------
 # HELPER FUNCTIONS
 # ----------------------------
-def percentile_to_1_20(series, min_minutes=500):
+def percentile_to_1_20(series):
     """Convert series to 1-20 scale using percentiles"""
-    s = pd.Series(series).fillna(0)
-    mask = df_stats["minutes_played"] >= min_minutes
-    if mask.sum() > 0:
-        baseline = s[mask]
-        if len(baseline) > 0:
-            ranks = s.rank(pct=True)
-            return (1 + ranks * 19).round(2)
+    s = np.nan_to_num(np.asarray(series))
+    if has_baseline:
+        # Average rank of each tie group, as Series.rank(pct=True)
+        _, inverse, counts = np.unique(s, return_inverse=True, return_counts=True)
+        avg_rank = np.cumsum(counts) - (counts - 1) / 2
+        return np.round(1 + avg_rank[inverse] / len(s) * 19, 2)
     # Fallback to simple scaling
-    return ((s - s.min()) / (s.max() - s.min() + 1e-8) * 19 + 1).round(2)
-
-def get_league_coefficient(comp_id):
-    """Get league strength coefficient"""
-    league_coeffs = {
-        2: 1.0, 49: 0.95, 11: 0.9, 12: 0.85, 9: 0.8,
-        37: 1.1, 38: 0.9, 55: 0.8,
-        43: 1.05, 50: 1.0, 72: 0.85, 44: 0.8, 45: 0.75
-    }
-    return league_coeffs.get(comp_id, 0.8)
+    return np.round((s - s.min()) / (s.max() - s.min() + 1e-8) * 19 + 1, 2)
+
+def weighted_sum(*terms, factors=()):
+    """Sum (array, weight) terms and apply factors in place, reusing two float32 buffers"""
+    total = np.zeros(len(terms[0][0]), dtype=np.float32)
+    scratch = np.empty_like(total)
+    for values, weight in terms:
+        np.multiply(values, weight, out=scratch)
+        total += scratch
+    for factor in factors:
+        total *= factor
+    return total
 
 def calculate_age_factor(age):
-    """Calculate age-based performance factor"""
-    if age <= 21:
-        return 1.1
-    elif age <= 25:
-        return 1.05
-    elif age <= 30:
-        return 1.0
-    else:
-        return 0.95
-
-# Add age column (simplified - random for now)
-df_stats["age"] = np.random.randint(18, 35, len(df_stats))
+    """Calculate age-based performance factor for an array of ages"""
+    return np.select([age <= 21, age <= 25, age <= 30], [1.1, 1.05, 1.0], default=0.95)
 
-# ----------------------------
-# CALCULATE ATTRIBUTES
-# ----------------------------
-print("\nCalculating Football Manager-style attributes...")
-pbar = tqdm(total=7, desc="Processing", unit="category")
+# Percentiles need at least one player past the minutes cutoff
+has_baseline = bool((df_stats["minutes_played"] >= 500).any())
 
-# Technical Attributes
-print("Computing technical attributes...")
-df_stats["passing"] = percentile_to_1_20(
-    (df_stats["passes_per90"] * 0.3 + 
-     df_stats["pass_accuracy"] * 0.25 + 
-     df_stats["key_passes_per90"] * 0.25 +
-     df_stats["assists_per90"] * 0.2) * 
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1) *
-    df_stats.apply(lambda x: calculate_age_factor(x.get('age', 25)), axis=1)
-)
+# One generator for every random draw in the script
+rng = np.random.default_rng(RANDOM_SEED)
 
-df_stats["shooting"] = percentile_to_1_20(
-    (df_stats["goals_per90"] * 0.3 + 
-     df_stats["xG_per90"] * 0.25 + 
-     df_stats["shots_on_target_per90"] * 0.25 +
-     (df_stats["goals_per90"] / (df_stats["shots_per90"] + 0.1)) * 0.2) *
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-)
+# Player ages (simplified - random for now)
+age = rng.integers(18, 35, len(df_stats), dtype=np.int16)
+age_factor = calculate_age_factor(age).astype(np.float32)
 
-df_stats["dribbling"] = percentile_to_1_20(
-    (df_stats["dribbles_per90"] * 0.4 +
-     df_stats["dribbles_successful_per90"] * 0.4 +
-     (df_stats["dribbles_successful_per90"] / (df_stats["dribbles_per90"] + 0.1)) * 0.2) *
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-)
+# League coefficient per row, computed once and reused by every attribute
+league_coef = df_stats["competition_id"].map(LEAGUE_COEFFS).fillna(0.8).to_numpy(dtype=np.float32)
 
-df_stats["first_touch"] = percentile_to_1_20(
-    (df_stats["dribbles_successful_per90"] * 0.4 +
-     df_stats["pass_accuracy"] * 0.3 +
-     df_stats["touches_per90"] * 0.3) *
-    df_stats.apply(lambda x: calculate_age_factor(x.get('age', 25)), axis=1)
-)
+# Pull each stat column out once so the formulas work on plain float32 arrays;
+# the 1-20 scale is rounded to 2 decimals, far coarser than float32 precision
+stat = {c: df_stats[c].to_numpy(dtype=np.float32, na_value=np.nan) for c in STAT_COLS}
 
-df_stats["crossing"] = percentile_to_1_20(
-    (df_stats["key_passes_per90"] * 0.5 +
-     df_stats["assists_per90"] * 0.3 +
-     df_stats["pass_accuracy"] * 0.2) *
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-)
+# touches_per90 (simplified calculation) straight from the arrays
+stat["touches_per90"] = np.nan_to_num(stat["passes_per90"] + stat["dribbles_per90"])
 
-df_stats["finishing"] = percentile_to_1_20(
-    (df_stats["goals_per90"] * 0.4 +
-     df_stats["shots_on_target_per90"] * 0.3 +
-     (df_stats["goals_per90"] / (df_stats["xG_per90"] + 0.1)) * 0.3)
-)
+# ----------------------------
+# CALCULATE ATTRIBUTES
+# ----------------------------
+print("\nCalculating Football Manager-style attributes...")
+# Attributes are collected as arrays and turned into a DataFrame once at the end
+attrs = {}
 
-df_stats["long_shots"] = percentile_to_1_20(
-    (df_stats["shots_per90"] * 0.4 +
-     df_stats["xG_per90"] * 0.3 +
-     (df_stats["shots_on_target_per90"] / (df_stats["shots_per90"] + 0.1)) * 0.3) *
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-)
-pbar.update(1)
+# Technical Attributes
+print("Computing technical attributes...")
+attrs["passing"] = percentile_to_1_20(weighted_sum(
+    (stat["passes_per90"], 0.3),
+    (stat["pass_accuracy"], 0.25),
+    (stat["key_passes_per90"], 0.25),
+    (stat["assists_per90"], 0.2),
+    factors=(league_coef, age_factor)
+))
+
+attrs["shooting"] = percentile_to_1_20(weighted_sum(
+    (stat["goals_per90"], 0.3),
+    (stat["xG_per90"], 0.25),
+    (stat["shots_on_target_per90"], 0.25),
+    (stat["goals_per90"] / (stat["shots_per90"] + 0.1), 0.2),
+    factors=(league_coef,)
+))
+
+attrs["dribbling"] = percentile_to_1_20(weighted_sum(
+    (stat["dribbles_per90"], 0.4),
+    (stat["dribbles_successful_per90"], 0.4),
+    (stat["dribbles_successful_per90"] / (stat["dribbles_per90"] + 0.1), 0.2),
+    factors=(league_coef,)
+))
+
+attrs["first_touch"] = percentile_to_1_20(weighted_sum(
+    (stat["dribbles_successful_per90"], 0.4),
+    (stat["pass_accuracy"], 0.3),
+    (stat["touches_per90"], 0.3),
+    factors=(age_factor,)
+))
+
+attrs["crossing"] = percentile_to_1_20(weighted_sum(
+    (stat["key_passes_per90"], 0.5),
+    (stat["assists_per90"], 0.3),
+    (stat["pass_accuracy"], 0.2),
+    factors=(league_coef,)
+))
+
+attrs["finishing"] = percentile_to_1_20(weighted_sum(
+    (stat["goals_per90"], 0.4),
+    (stat["shots_on_target_per90"], 0.3),
+    (stat["goals_per90"] / (stat["xG_per90"] + 0.1), 0.3),
+))
+
+attrs["long_shots"] = percentile_to_1_20(weighted_sum(
+    (stat["shots_per90"], 0.4),
+    (stat["xG_per90"], 0.3),
+    (stat["shots_on_target_per90"] / (stat["shots_per90"] + 0.1), 0.3),
+    factors=(league_coef,)
+))
 
 # Physical Attributes
 print("Computing physical attributes...")
-df_stats["pace"] = percentile_to_1_20(
-    (df_stats["dribbles_per90"] * 0.4 +
-     df_stats["pressures_per90"] * 0.3 +
-     df_stats["dribbles_successful_per90"] * 0.3) *
-    df_stats.apply(lambda x: calculate_age_factor(x.get('age', 25)), axis=1)
-)
-
-df_stats["acceleration"] = percentile_to_1_20(
-    (df_stats["dribbles_successful_per90"] * 0.5 +
-     df_stats["dribbles_per90"] * 0.3 +
-     df_stats["pressures_per90"] * 0.2) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) <= 23 else 1.0, axis=1)
-)
-
-df_stats["stamina"] = percentile_to_1_20(
-    (df_stats["minutes_played"] / 1000 * 0.4 +
-     df_stats["pressures_per90"] * 0.3 +
-     df_stats["tackles_per90"] * 0.3) *
-    df_stats.apply(lambda x: 0.9 if x.get('age', 25) > 30 else 1.0, axis=1)
-)
-
-df_stats["strength"] = percentile_to_1_20(
-    (df_stats["aerial_duels_per90"] * 0.4 +
-     df_stats["tackles_per90"] * 0.3 +
-     df_stats["aerial_duels_won_per90"] * 0.3) *
-    df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)
-)
-
-df_stats["jumping_reach"] = percentile_to_1_20(
-    (df_stats["aerial_duels_won_per90"] * 0.6 +
-     df_stats["aerial_duels_per90"] * 0.4) *
-    df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)
-)
-pbar.update(1)
+attrs["pace"] = percentile_to_1_20(weighted_sum(
+    (stat["dribbles_per90"], 0.4),
+    (stat["pressures_per90"], 0.3),
+    (stat["dribbles_successful_per90"], 0.3),
+    factors=(age_factor,)
+))
+
+attrs["acceleration"] = percentile_to_1_20(weighted_sum(
+    (stat["dribbles_successful_per90"], 0.5),
+    (stat["dribbles_per90"], 0.3),
+    (stat["pressures_per90"], 0.2),
+    factors=(np.where(age <= 23, 1.1, 1.0),)
+))
+
+attrs["stamina"] = percentile_to_1_20(weighted_sum(
+    (stat["minutes_played"] / 1000, 0.4),
+    (stat["pressures_per90"], 0.3),
+    (stat["tackles_per90"], 0.3),
+    factors=(np.where(age > 30, 0.9, 1.0),)
+))
+
+attrs["strength"] = percentile_to_1_20(weighted_sum(
+    (stat["aerial_duels_per90"], 0.4),
+    (stat["tackles_per90"], 0.3),
+    (stat["aerial_duels_won_per90"], 0.3),
+    factors=(np.where((age >= 25) & (age <= 30), 1.05, 1.0),)
+))
+
+attrs["jumping_reach"] = percentile_to_1_20(weighted_sum(
+    (stat["aerial_duels_won_per90"], 0.6),
+    (stat["aerial_duels_per90"], 0.4),
+    factors=(np.where((age >= 25) & (age <= 30), 1.05, 1.0),)
+))
 
 # Mental Attributes
 print("Computing mental attributes...")
-df_stats["positioning"] = percentile_to_1_20(
-    (df_stats["interceptions_per90"] * 0.3 +
-     df_stats["key_passes_per90"] * 0.25 +
-     df_stats["pressures_per90"] * 0.25 +
-     df_stats["tackles_per90"] * 0.2) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 28 else 1.0, axis=1)
-)
-
-df_stats["vision"] = percentile_to_1_20(
-    (df_stats["key_passes_per90"] * 0.4 +
-     df_stats["assists_per90"] * 0.3 +
-     df_stats["passes_per90"] * 0.3) *
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-)
-
-df_stats["composure"] = percentile_to_1_20(
-    (df_stats["pass_accuracy"] * 0.4 +
-     df_stats["dribbles_successful_per90"] * 0.3 +
-     df_stats["goals_per90"] * 0.3)
-)
-
-df_stats["concentration"] = percentile_to_1_20(
-    (df_stats["interceptions_per90"] * 0.4 +
-     df_stats["tackles_won_per90"] * 0.3 +
-     df_stats["clearances_per90"] * 0.3) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)
-)
-
-df_stats["decisions"] = percentile_to_1_20(
-    (df_stats["key_passes_per90"] * 0.3 +
-     df_stats["tackles_won_per90"] * 0.25 +
-     df_stats["dribbles_successful_per90"] * 0.25 +
-     (df_stats["assists_per90"] + df_stats["goals_per90"]) * 0.2) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 24 else 1.0, axis=1)
-)
-
-df_stats["leadership"] = percentile_to_1_20(
-    (df_stats["minutes_played"] / 1000 * 0.4 +
-     df_stats["assists_per90"] * 0.3 +
-     df_stats["goals_per90"] * 0.3) *
-    df_stats.apply(lambda x: 1.2 if x.get('age', 25) >= 28 else 1.0, axis=1)
-)
-pbar.update(1)
+attrs["positioning"] = percentile_to_1_20(weighted_sum(
+    (stat["interceptions_per90"], 0.3),
+    (stat["key_passes_per90"], 0.25),
+    (stat["pressures_per90"], 0.25),
+    (stat["tackles_per90"], 0.2),
+    factors=(np.where(age >= 28, 1.1, 1.0),)
+))
+
+attrs["vision"] = percentile_to_1_20(weighted_sum(
+    (stat["key_passes_per90"], 0.4),
+    (stat["assists_per90"], 0.3),
+    (stat["passes_per90"], 0.3),
+    factors=(league_coef,)
+))
+
+attrs["composure"] = percentile_to_1_20(weighted_sum(
+    (stat["pass_accuracy"], 0.4),
+    (stat["dribbles_successful_per90"], 0.3),
+    (stat["goals_per90"], 0.3),
+))
+
+attrs["concentration"] = percentile_to_1_20(weighted_sum(
+    (stat["interceptions_per90"], 0.4),
+    (stat["tackles_won_per90"], 0.3),
+    (stat["clearances_per90"], 0.3),
+    factors=(np.where(age >= 26, 1.1, 1.0),)
+))
+
+attrs["decisions"] = percentile_to_1_20(weighted_sum(
+    (stat["key_passes_per90"], 0.3),
+    (stat["tackles_won_per90"], 0.25),
+    (stat["dribbles_successful_per90"], 0.25),
+    (stat["assists_per90"] + stat["goals_per90"], 0.2),
+    factors=(np.where(age >= 24, 1.1, 1.0),)
+))
+
+attrs["leadership"] = percentile_to_1_20(weighted_sum(
+    (stat["minutes_played"] / 1000, 0.4),
+    (stat["assists_per90"], 0.3),
+    (stat["goals_per90"], 0.3),
+    factors=(np.where(age >= 28, 1.2, 1.0),)
+))
 
 # Defensive Attributes
 print("Computing defensive attributes...")
-df_stats["tackling"] = percentile_to_1_20(
-    (df_stats["tackles_won_per90"] * 0.5 +
-     df_stats["tackles_per90"] * 0.3 +
-     (df_stats["tackles_won_per90"] / (df_stats["tackles_per90"] + 0.1)) * 0.2) *
-    df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)
-)
-
-df_stats["marking"] = percentile_to_1_20(
-    (df_stats["interceptions_per90"] * 0.4 +
-     df_stats["pressures_per90"] * 0.3 +
-     df_stats["tackles_per90"] * 0.3) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)
-)
-
-df_stats["heading"] = percentile_to_1_20(
-    (df_stats["aerial_duels_won_per90"] * 0.6 +
-     df_stats["aerial_duels_per90"] * 0.4) *
-    df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)
-)
-pbar.update(1)
+attrs["tackling"] = percentile_to_1_20(weighted_sum(
+    (stat["tackles_won_per90"], 0.5),
+    (stat["tackles_per90"], 0.3),
+    (stat["tackles_won_per90"] / (stat["tackles_per90"] + 0.1), 0.2),
+    factors=(np.where((age >= 25) & (age <= 30), 1.05, 1.0),)
+))
+
+attrs["marking"] = percentile_to_1_20(weighted_sum(
+    (stat["interceptions_per90"], 0.4),
+    (stat["pressures_per90"], 0.3),
+    (stat["tackles_per90"], 0.3),
+    factors=(np.where(age >= 26, 1.1, 1.0),)
+))
+
+attrs["heading"] = percentile_to_1_20(weighted_sum(
+    (stat["aerial_duels_won_per90"], 0.6),
+    (stat["aerial_duels_per90"], 0.4),
+    factors=(np.where((age >= 25) & (age <= 30), 1.05, 1.0),)
+))
 
 # Goalkeeping Attributes
 print("Computing goalkeeping attributes...")
-df_stats["goalkeeping"] = percentile_to_1_20(
-    (df_stats["saves_per90"] * 0.4 +
-     df_stats["clean_sheets"] * 0.3 +
-     (100 - df_stats["goals_conceded_per90"] * 10) * 0.3) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)
-)
-
-df_stats["reflexes"] = percentile_to_1_20(
-    df_stats["saves_per90"] *
-    df_stats.apply(lambda x: 1.05 if x.get('age', 25) <= 28 else 1.0, axis=1)
-)
-
-df_stats["handling"] = percentile_to_1_20(
-    (df_stats["clean_sheets"] * 0.6 +
-     df_stats["pass_accuracy"] * 0.4) *
-    df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)
-)
-
-df_stats["kicking"] = percentile_to_1_20(
-    (df_stats["passes_per90"] * 0.5 +
-     df_stats["pass_accuracy"] * 0.5) *
-    df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-)
-pbar.update(1)
+attrs["goalkeeping"] = percentile_to_1_20(weighted_sum(
+    (stat["saves_per90"], 0.4),
+    (stat["clean_sheets"], 0.3),
+    (100 - stat["goals_conceded_per90"] * 10, 0.3),
+    factors=(np.where(age >= 26, 1.1, 1.0),)
+))
+
+attrs["reflexes"] = percentile_to_1_20(weighted_sum(
+    (stat["saves_per90"], 1),
+    factors=(np.where(age <= 28, 1.05, 1.0),)
+))
+
+attrs["handling"] = percentile_to_1_20(weighted_sum(
+    (stat["clean_sheets"], 0.6),
+    (stat["pass_accuracy"], 0.4),
+    factors=(np.where(age >= 26, 1.1, 1.0),)
+))
+
+attrs["kicking"] = percentile_to_1_20(weighted_sum(
+    (stat["passes_per90"], 0.5),
+    (stat["pass_accuracy"], 0.5),
+    factors=(league_coef,)
+))
 
 # Position-specific CA calculations
 print("Computing position-specific ratings...")
-def compute_position_CA(row, position_type):
-    if position_type == "GK":
-        weights = {"goalkeeping": 0.4, "reflexes": 0.2, "handling": 0.2, "kicking": 0.2}
-    elif position_type == "DEF":
-        weights = {"tackling": 0.25, "marking": 0.25, "heading": 0.2, "positioning": 0.15, "pace": 0.15}
-    elif position_type == "MID":
-        weights = {"passing": 0.25, "vision": 0.2, "positioning": 0.15, "dribbling": 0.15, "tackling": 0.15, "stamina": 0.1}
-    else:  # FWD
-        weights = {"shooting": 0.3, "pace": 0.2, "dribbling": 0.2, "finishing": 0.15, "positioning": 0.15}
-    
-    base_ca = sum(row[k] * w for k, w in weights.items())
-    league_coeff = get_league_coefficient(row.get('competition_id', 0))
-    
-    age = row.get('age', 25)
-    if position_type == "GK":
-        age_factor = 1.1 if 28 <= age <= 32 else 1.0
-    elif position_type == "DEF":
-        age_factor = 1.05 if 26 <= age <= 30 else 1.0
-    elif position_type == "MID":
-        age_factor = 1.05 if 24 <= age <= 28 else 1.0
-    else:  # FWD
-        age_factor = 1.05 if 22 <= age <= 26 else 1.0
-    
-    return round(base_ca * league_coeff * age_factor, 2)
-
-df_stats["CA_GK"] = df_stats.apply(lambda x: compute_position_CA(x, "GK"), axis=1)
-df_stats["CA_DEF"] = df_stats.apply(lambda x: compute_position_CA(x, "DEF"), axis=1)
-df_stats["CA_MID"] = df_stats.apply(lambda x: compute_position_CA(x, "MID"), axis=1)
-df_stats["CA_FWD"] = df_stats.apply(lambda x: compute_position_CA(x, "FWD"), axis=1)
+POSITION_WEIGHTS = {
+    "GK": {"goalkeeping": 0.4, "reflexes": 0.2, "handling": 0.2, "kicking": 0.2},
+    "DEF": {"tackling": 0.25, "marking": 0.25, "heading": 0.2, "positioning": 0.15, "pace": 0.15},
+    "MID": {"passing": 0.25, "vision": 0.2, "positioning": 0.15, "dribbling": 0.15, "tackling": 0.15, "stamina": 0.1},
+    "FWD": {"shooting": 0.3, "pace": 0.2, "dribbling": 0.2, "finishing": 0.15, "positioning": 0.15},
+}
+# (min_age, max_age, factor) of each position's peak years
+POSITION_PEAK_AGES = {"GK": (28, 32, 1.1), "DEF": (26, 30, 1.05), "MID": (24, 28, 1.05), "FWD": (22, 26, 1.05)}
+
+def compute_position_CA(position_type):
+    """Weighted attribute sum for one position as a single matrix-vector product"""
+    weights = POSITION_WEIGHTS[position_type]
+    base_ca = np.column_stack([attrs[k] for k in weights]) @ np.array(list(weights.values()))
+    lo, hi, factor = POSITION_PEAK_AGES[position_type]
+    peak_factor = np.where((age >= lo) & (age <= hi), factor, 1.0)
+    return np.round(base_ca * league_coef * peak_factor, 2)
+
+for position_type in POSITION_WEIGHTS:
+    attrs[f"CA_{position_type}"] = compute_position_CA(position_type)
 
 # Overall CA
-df_stats["CA"] = (
-    df_stats["CA_GK"] * 0.1 +
-    df_stats["CA_DEF"] * 0.3 +
-    df_stats["CA_MID"] * 0.3 +
-    df_stats["CA_FWD"] * 0.3
-).round(2)
-
-# Potential Ability (PA)
-def compute_PA(ca, age):
-    if age <= 20:
-        base_uplift = 6
-        variance = 2
-    elif age <= 24:
-        base_uplift = 4
-        variance = 1.5
-    elif age <= 28:
-        base_uplift = 2
-        variance = 1
-    else:
-        base_uplift = 0
-        variance = 0.5
-    
-    total_uplift = base_uplift + np.random.normal(0, variance)
-    return min(20, max(ca, ca + total_uplift))
-
-df_stats["PA"] = df_stats.apply(lambda x: compute_PA(x["CA"], x["age"]), axis=1)
-pbar.update(1)
+attrs["CA"] = np.round(
+    attrs["CA_GK"] * 0.1 +
+    attrs["CA_DEF"] * 0.3 +
+    attrs["CA_MID"] * 0.3 +
+    attrs["CA_FWD"] * 0.3,
+    2
+)
+
+# Potential Ability (PA): age-banded uplift, drawn for all players in one call
+age_bands = [age <= 20, age <= 24, age <= 28]
+base_uplift = np.select(age_bands, [6, 4, 2], default=0)
+variance = np.select(age_bands, [2, 1.5, 1], default=0.5)
+total_uplift = base_uplift + rng.normal(0, variance)
+ca = attrs["CA"]
+attrs["PA"] = np.minimum(20, np.maximum(ca, ca + total_uplift))
 
 # ----------------------------
 # Save to database
@@ -342,13 +349,25 @@ attr_cols = [
     "CA", "PA", "CA_GK", "CA_DEF", "CA_MID", "CA_FWD"
 ]
 
-df_save = df_stats[attr_cols].copy()
-df_save.to_sql(ATTR_TABLE, conn, index=False)
-
-pbar.update(1)
-pbar.close()
+attrs["player_name"] = df_stats["player_name"].to_numpy()
+df_save = pd.DataFrame({c: attrs[c] for c in attr_cols})
+# to_sql on sqlite3 already batches rows through executemany in one transaction
+df_save.to_sql(ATTR_TABLE, conn, index=False, chunksize=1000)
+
+# Name lookups for the dashboard search: NOCASE index for prefix LIKE, FTS5 for word-prefix matches
+cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_player_name ON {ATTR_TABLE}(player_name COLLATE NOCASE)")
+cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_player_name_exact ON {ATTR_TABLE}(player_name)")
+# Top-N lists on the dashboard order by CA and PA
+cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_ca ON {ATTR_TABLE}(CA DESC)")
+cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_pa ON {ATTR_TABLE}(PA DESC)")
+cur.execute("DROP TABLE IF EXISTS player_names_fts")
+cur.execute("CREATE VIRTUAL TABLE player_names_fts USING fts5(player_name)")
+cur.execute(f"INSERT INTO player_names_fts (player_name) SELECT player_name FROM {ATTR_TABLE}")
 
 conn.commit()
+# Planner statistics (sqlite_stat1) for the rows just written; PRAGMA optimize skips tables
+# this connection never queried
+cur.execute("ANALYZE")
 conn.close()
 
 print(f"\n✅ Attributes calculated and saved to {ATTR_TABLE}")
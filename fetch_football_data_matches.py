@@ -1,54 +1,69 @@
 import os
 import sqlite3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 import logging
 from tqdm import tqdm
 import time
+import threading
 import json
+import atexit
 from typing import Dict, Any, List, Set
 
 # Progress tracking
 PROGRESS_FILE = "data/fetch_progress.json"
+PROGRESS_SAVE_INTERVAL = 50  # completed matches between database flushes and progress saves
+
+# Progress file contents, read once at startup and rewritten on save
+progress_data: Dict[str, Any] = {}
 
 def load_progress() -> tuple[Set[int], List[Dict[str, str]]]:
     """Load progress from file"""
     if os.path.exists(PROGRESS_FILE):
         with open(PROGRESS_FILE, 'r') as f:
-            data = json.load(f)
-            return set(data.get('completed_matches', [])), data.get('skipped_seasons', [])
-    return set(), []
+            progress_data.update(json.load(f))
+    return set(progress_data.get('completed_matches', [])), progress_data.get('skipped_seasons', [])
 
 def save_progress(completed_matches: Set[int]):
-    """Save progress to file"""
-    with open(PROGRESS_FILE, 'r') as f:
-        data = json.load(f)
-    data['completed_matches'] = list(completed_matches)
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(data, f, indent=4)
-
-def should_skip_season(season_year: str, competition_code: str, skipped_seasons: List[Dict[str, str]]) -> bool:
+    """Save progress to file atomically (write temp file, then rename)"""
+    progress_data['completed_matches'] = list(completed_matches)
+    tmp_path = PROGRESS_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(progress_data, f, indent=4)
+    os.replace(tmp_path, PROGRESS_FILE)
+
+def should_skip_season(season_year: str, competition_code: str, skip_set: frozenset) -> bool:
     """Check if this season should be skipped"""
-    return any(
-        skip['competition_code'] == competition_code and skip['year'] == season_year
-        for skip in skipped_seasons
-    )
+    return (competition_code, season_year) in skip_set
+
+class RateLimiter:
+    """Spaces request starts at least `interval` seconds apart, shared across threads"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_start = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        time.sleep(start - now)
+
+# 10 requests per minute limit; time spent on the request itself counts towards the gap
+RATE_LIMITER = RateLimiter(6)
 
-def make_request(url: str, headers: Dict[str, str], delay: int = 6) -> Dict[str, Any]:
-    """Make a request to the API with rate limiting handling"""
-    while True:
-        response = requests.get(url, headers=headers)
-        if response.status_code == 429:
-            retry_after = int(response.headers.get('Retry-After', delay))
-            logging.warning(f"Rate limit hit. Waiting {retry_after} seconds...")
-            time.sleep(retry_after)
-            continue
-        elif response.status_code == 200:
-            time.sleep(delay)  # Wait 6 seconds between successful requests (10 requests per minute limit)
-            return response.json()
-        else:
-            logging.error(f"Request failed: {response.status_code}")
-            return {}
+def make_request(url: str) -> Dict[str, Any]:
+    """Make a request to the API; rate limiting (429) retries are handled by the session"""
+    RATE_LIMITER.wait()
+    response = SESSION.get(url)
+    if response.status_code == 200:
+        return response.json()
+    logging.error(f"Request failed: {response.status_code}")
+    return {}
 
 
 # Setup logging
@@ -61,13 +76,69 @@ logging.basicConfig(
 DB_PATH = "data/football_data.db"
 FOOTBALL_DATA_API_KEY = os.getenv('FOOTBALL_DATA_API_KEY', 'edab257cb26c4a0c87f18d5f629a17e6')
 
+# Shared keep-alive session; retries rate-limited and transient failures honouring Retry-After
+SESSION = requests.Session()
+SESSION.headers.update({'X-Auth-Token': FOOTBALL_DATA_API_KEY})
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+))
+
+INSERT_MATCH_SQL = """
+    INSERT OR IGNORE INTO matches (
+        match_id, competition_id, season_id, utc_date, status, matchday, stage, group_name, home_team, away_team, home_score, away_score
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+INSERT_SCORER_SQL = """
+    INSERT OR IGNORE INTO scorers (
+        match_id, team_id, player_name, minute, additional_minute, type
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_MATCH_STATS_SQL = """
+    INSERT OR IGNORE INTO match_stats (
+        match_id, team_id, shots, shots_on_goal, possession,
+        passes, pass_accuracy, fouls, yellow_cards, red_cards,
+        offsides, corners
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 try:
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
 except Exception as e:
     logging.error(f"Error connecting to database: {e}")
     raise
 
+# Rows buffered in memory and written in one transaction per flush
+match_rows: List[tuple] = []
+scorer_rows: List[tuple] = []
+stat_rows: List[tuple] = []
+pending_matches: List[int] = []
+
+def flush_rows():
+    """Write buffered rows in one transaction, then record the flushed matches as completed"""
+    with conn:
+        cur.executemany(INSERT_MATCH_SQL, match_rows)
+        cur.executemany(INSERT_SCORER_SQL, scorer_rows)
+        cur.executemany(INSERT_MATCH_STATS_SQL, stat_rows)
+    logging.info(f"Flushed {len(match_rows)} matches, {len(scorer_rows)} scorers, {len(stat_rows)} team stats")
+    match_rows.clear()
+    scorer_rows.clear()
+    stat_rows.clear()
+    # Progress only ever lists matches whose rows are committed
+    completed_matches.update(pending_matches)
+    pending_matches.clear()
+    save_progress(completed_matches)
+
 # Fetch competitions
 # Specify major competitions we want to fetch
 TIER_ONE_COMPETITIONS = [
@@ -84,9 +155,8 @@ TIER_ONE_COMPETITIONS = [
 ]
 
 url = 'https://api.football-data.org/v4/competitions'
-headers = {'X-Auth-Token': FOOTBALL_DATA_API_KEY}
 try:
-    response_data = make_request(url, headers)
+    response_data = make_request(url)
     all_competitions = response_data.get('competitions', [])
     # Print all available competitions and their codes
     print("\nAvailable competitions:")
@@ -126,6 +196,9 @@ conn.commit()
 # Load progress and skipped seasons
 completed_matches, skipped_seasons = load_progress()
 print(f"\nLoaded {len(completed_matches)} completed matches and {len(skipped_seasons)} skipped seasons")
+# Progress is saved periodically; make sure the tail is written on exit
+atexit.register(lambda: save_progress(completed_matches))
+skip_set = frozenset((skip['competition_code'], skip['year']) for skip in skipped_seasons)
 
 # Fetch and insert last 3 years of seasons and matches
 print("\nProcessing competitions...")
@@ -134,7 +207,7 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
     # Fetch competition details to get seasons
     comp_url = f'https://api.football-data.org/v4/competitions/{comp_id}'
     try:
-        comp_details = make_request(comp_url, headers)
+        comp_details = make_request(comp_url)
         seasons = comp_details.get('seasons', [])
     except Exception as e:
         logging.error(f"Error fetching competition details for {comp_id}: {e}")
@@ -148,7 +221,7 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
             year = start_date[:4]
             
             # Check if we should skip this season
-            if should_skip_season(year, comp.get('code'), skipped_seasons):
+            if should_skip_season(year, comp.get('code'), skip_set):
                 logging.info(f"Skipping season {year} for competition {comp.get('name')} ({comp.get('code')})")
                 continue
                 
@@ -165,12 +238,12 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
         year = start_date[:4]
         matches_url = f'https://api.football-data.org/v4/competitions/{comp_id}/matches?season={year}'
         try:
-            matches_data = make_request(matches_url, headers)
+            matches_data = make_request(matches_url)
             matches = matches_data.get('matches', [])
         except Exception as e:
             logging.error(f"Error fetching matches for competition {comp_id} season {season_id}: {e}")
             matches = []
-        matches_pbar = tqdm(matches, desc=f"Processing matches for {comp.get('name')} {year}", leave=False)
+        matches_pbar = tqdm(matches, desc=f"Processing matches for {comp.get('name')} {year}", leave=False, mininterval=1.0)
         for m in matches_pbar:
             try:
                 match_id = m.get('id')
@@ -189,19 +262,15 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
                 away_team = m.get('awayTeam', {}).get('name', '')
                 home_score = m.get('score', {}).get('fullTime', {}).get('home', 0)
                 away_score = m.get('score', {}).get('fullTime', {}).get('away', 0)
-                cur.execute("""
-                    INSERT OR IGNORE INTO matches (
-                        match_id, competition_id, season_id, utc_date, status, matchday, stage, group_name, home_team, away_team, home_score, away_score
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+                match_rows.append((
                     match_id, comp_id, season_id, utc_date, status, matchday, stage, group_name, home_team, away_team, home_score, away_score
                 ))
-                logging.info(f"Inserted match {match_id} for competition {comp_id} season {season_id}")
+                logging.info(f"Buffered match {match_id} for competition {comp_id} season {season_id}")
 
                 # Fetch detailed match information including scorers and stats
                 try:
                     match_detail_url = f'https://api.football-data.org/v4/matches/{match_id}'
-                    match_details = make_request(match_detail_url, headers)
+                    match_details = make_request(match_detail_url)
 
                     if match_details:
                         logging.info(f"Match details response: {str(match_details)[:200]}...")  # Log first 200 chars
@@ -213,11 +282,7 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
                             try:
                                 player = scorer.get('player', {})
                                 team = scorer.get('team', {})
-                                cur.execute("""
-                                    INSERT OR IGNORE INTO scorers (
-                                        match_id, team_id, player_name, minute, additional_minute, type
-                                    ) VALUES (?, ?, ?, ?, ?, ?)
-                                """, (
+                                scorer_rows.append((
                                     match_id,
                                     team.get('id'),
                                     player.get('name'),
@@ -225,7 +290,7 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
                                     scorer.get('extraTime'),
                                     scorer.get('type', 'REGULAR')
                                 ))
-                                logging.info(f"Inserted scorer: {player.get('name')} for match {match_id}")
+                                logging.info(f"Buffered scorer: {player.get('name')} for match {match_id}")
                             except Exception as e:
                                 logging.error(f"Error inserting scorer: {e}")
 
@@ -239,49 +304,43 @@ for comp in tqdm(competitions, desc="Fetching competitions"):
                                     team_id = match_details.get(team, {}).get('id')
                                     stats_data = team_stats.get('statistics', {})
                                     logging.info(f"Found stats for team {team_id}: {str(stats_data)[:200]}...")
+                                    # One pass over the stats list instead of a scan per stat type
+                                    stat_values = {item['type']: item['value'] for item in stats_data}
 
-                                    cur.execute("""
-                                        INSERT OR IGNORE INTO match_stats (
-                                            match_id, team_id, shots, shots_on_goal, possession,
-                                            passes, pass_accuracy, fouls, yellow_cards, red_cards,
-                                            offsides, corners
-                                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                                    """, (
+                                    stat_rows.append((
                                         match_id,
                                         team_id,
-                                        next((item['value'] for item in stats_data if item['type'] == 'SHOT_ON_GOAL'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'SHOT_ON_TARGET'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'BALL_POSSESSION'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'PASS'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'PASS_ACCURACY'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'FOUL'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'YELLOW_CARD'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'RED_CARD'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'OFFSIDE'), 0),
-                                        next((item['value'] for item in stats_data if item['type'] == 'CORNER_KICK'), 0)
+                                        stat_values.get('SHOT_ON_GOAL', 0),
+                                        stat_values.get('SHOT_ON_TARGET', 0),
+                                        stat_values.get('BALL_POSSESSION', 0),
+                                        stat_values.get('PASS', 0),
+                                        stat_values.get('PASS_ACCURACY', 0),
+                                        stat_values.get('FOUL', 0),
+                                        stat_values.get('YELLOW_CARD', 0),
+                                        stat_values.get('RED_CARD', 0),
+                                        stat_values.get('OFFSIDE', 0),
+                                        stat_values.get('CORNER_KICK', 0)
                                     ))
-                                    logging.info(f"Inserted match stats for team {team_id} in match {match_id}")
+                                    logging.info(f"Buffered match stats for team {team_id} in match {match_id}")
                                 else:
                                     logging.warning(f"No stats found for {team} in match {match_id}")
                             except Exception as e:
                                 logging.error(f"Error processing stats for {team} in match {match_id}: {e}")
-                        # Mark match as completed and save progress
-                        completed_matches.add(match_id)
-                        save_progress(completed_matches)
+                        # Match is completed once its buffered rows are flushed
+                        pending_matches.append(match_id)
+                        if len(pending_matches) >= PROGRESS_SAVE_INTERVAL:
+                            flush_rows()
                     else:
                         logging.error(f"Failed to get match details")
                         logging.warning("No data received from the API for this match")
 
-                    # Add a small delay to avoid rate limiting
-                    time.sleep(1)
-
                 except Exception as e:
                     logging.error(f"Error inserting match {m.get('id')} for competition {comp_id} season {season_id}: {e}")
             except Exception as e:
                 logging.error(f"Error processing match {m.get('id')}: {e}")
 
-            # End of competition loop
-            conn.commit()
+        # End of season: write everything buffered for it
+        flush_rows()
 
 # Close connection at the very end
 conn.close()
@@ -46,107 +46,305 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Columns the pages actually read
+ATTR_COLS = (
+    "player_name", "CA", "PA", "CA_GK", "CA_DEF", "CA_MID", "CA_FWD",
+    "passing", "shooting", "dribbling", "first_touch", "crossing", "finishing",
+    "pace", "acceleration", "stamina", "strength", "jumping_reach",
+    "positioning", "vision", "composure", "concentration", "decisions", "leadership",
+    "tackling", "marking", "heading",
+    "goalkeeping", "reflexes", "handling", "kicking"
+)
+STATS_COLS = ("minutes_played", "goals_per90", "assists_per90", "pass_accuracy", "xG_per90")
+
 # Database connection
+DB_PATH = "data/statsbomb.db"
+
+@st.cache_resource
+def get_conn():
+    """Open one shared read-only connection for every loader"""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+    # Per-connection settings; journal_mode=WAL is set by the pipeline
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
 @st.cache_data
 def load_database_info():
     """Load basic database information"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
     
-    # Get table counts
+    # Get table counts in a single round trip; internal tables (SQLite's own, the FTS5
+    # name index and its shadow tables, script 4's denormalised copy, the mapper's
+    # checkpoint tables) are not listed
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
-    
-    table_counts = {}
-    for table in tables:
-        table_name = table[0]
-        count = pd.read_sql(f"SELECT COUNT(*) as count FROM {table_name}", conn)['count'].iloc[0]
-        table_counts[table_name] = count
+    cursor.execute("""
+        SELECT name FROM sqlite_master
+        WHERE type='table'
+          AND name NOT LIKE 'sqlite_%'
+          AND name NOT GLOB 'player_names_fts*'
+          AND name NOT IN ('player_stats_denorm', 'processed_matches', 'player_match_stats')
+    """)
+    tables = [row[0] for row in cursor.fetchall()]
+    if not tables:
+        return {}
     
-    conn.close()
-    return table_counts
+    query = " UNION ALL ".join(f"SELECT '{t}', COUNT(*) FROM \"{t}\"" for t in tables)
+    return dict(cursor.execute(query).fetchall())
 
 @st.cache_data
 def load_player_attributes(limit=None):
     """Load player attributes"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
     
-    query = "SELECT * FROM player_attributes ORDER BY CA DESC"
-    if limit:
-        query += f" LIMIT {limit}"
+    # LIMIT is always bound (-1 = no limit) so the statement text never changes
+    query = f"SELECT {', '.join(ATTR_COLS)} FROM player_attributes ORDER BY CA DESC LIMIT ?"
     
-    df = pd.read_sql(query, conn)
-    conn.close()
-    return df
+    # Ratings are 1-20 with two decimals; float32 is plenty and halves the frame.
+    # Passing dtype= builds the columns narrow instead of casting a float64 frame afterwards
+    return pd.read_sql_query(query, conn, params=[limit or -1], dtype={c: np.float32 for c in ATTR_COLS[1:]})
+
+@st.cache_data
+def attribute_correlations(cols):
+    """Correlation matrix for a tuple of attribute columns, cached per selection"""
+    # Ratings keep two decimals, so they stay float32 rather than uint8; the matrix is
+    # narrowed and rounded too so the heatmap JSON carries short numbers
+    return load_player_attributes()[list(cols)].corr().astype(np.float32).round(2)
+
+# Not cached: script 4 creates the table and the mapper drops it while the dashboard runs
+def stats_source():
+    """FROM target for the 500+ minute stats rows: script 4's pre-joined table when present"""
+    cursor = get_conn().execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='player_stats_denorm'"
+    )
+    if cursor.fetchone():
+        return "player_stats_denorm"
+    # Database predates the denormalised table: join on the fly
+    return """(
+        SELECT ps.*, p.player_name
+        FROM player_stats ps
+        JOIN players p ON ps.player_id = p.player_id
+        WHERE ps.minutes_played >= 500
+    )"""
 
 @st.cache_data
 def load_player_stats(limit=None):
     """Load player stats"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
     
-    query = """
-    SELECT ps.*, p.player_name 
-    FROM player_stats ps 
-    JOIN players p ON ps.player_id = p.player_id
-    WHERE ps.minutes_played >= 500
-    ORDER BY ps.minutes_played DESC
+    query = f"""
+    SELECT {', '.join(STATS_COLS)}, player_name
+    FROM {stats_source()}
+    ORDER BY minutes_played DESC
+    LIMIT ?
     """
-    if limit:
-        query += f" LIMIT {limit}"
     
-    df = pd.read_sql(query, conn)
-    conn.close()
+    df = pd.read_sql_query(query, conn, params=[limit or -1], dtype={c: np.float32 for c in STATS_COLS[1:]})
     return df
 
+@st.cache_data
+def load_player_row(player_name):
+    """Load one player's attributes by name (uses the player_name index)"""
+    query = f"SELECT {', '.join(ATTR_COLS)} FROM player_attributes WHERE player_name = ? LIMIT 1"
+    return pd.read_sql(query, get_conn(), params=[player_name]).iloc[0]
+
+@st.cache_data
+def players_with_stats():
+    """Rows past the 500-minute gate; a plain count of the denormalised table when present"""
+    return get_conn().execute(f"SELECT COUNT(*) FROM {stats_source()}").fetchone()[0]
+
+@st.cache_data
+def position_means():
+    """Average CA per position, aggregated in SQLite rather than in pandas"""
+    cursor = get_conn().execute(
+        "SELECT AVG(CA_GK), AVG(CA_DEF), AVG(CA_MID), AVG(CA_FWD) FROM player_attributes"
+    )
+    return dict(zip(['Goalkeeper', 'Defender', 'Midfielder', 'Forward'], cursor.fetchone()))
+
+@st.cache_data
+def performance_summary():
+    """Headline Performance metrics in one aggregate query"""
+    cursor = get_conn().execute(f"""
+        SELECT AVG(goals_per90), AVG(assists_per90), AVG(pass_accuracy), SUM(minutes_played)
+        FROM {stats_source()}
+    """)
+    return dict(zip(['goals_per90', 'assists_per90', 'pass_accuracy', 'minutes_played'], cursor.fetchone()))
+
+# Columns the top-N helpers may order by (interpolated into SQL, so whitelisted)
+TOP_ATTR_COLS = {"CA", "PA"}
+TOP_STATS_COLS = {"goals_per90", "assists_per90"}
+
+@st.cache_data
+def top_players_by(column, n=10):
+    """Top n players by an attribute column, ordered and limited in SQL"""
+    if column not in TOP_ATTR_COLS:
+        raise ValueError(f"Unsupported column: {column}")
+    query = f"SELECT player_name, CA, PA FROM player_attributes ORDER BY {column} DESC LIMIT ?"
+    return pd.read_sql(query, get_conn(), params=[n])
+
+@st.cache_data
+def top_performers_by(column, n=10):
+    """Top n players by a per-90 stat, ordered and limited in SQL"""
+    if column not in TOP_STATS_COLS:
+        raise ValueError(f"Unsupported column: {column}")
+    query = f"SELECT player_name, {column}, minutes_played FROM {stats_source()} ORDER BY {column} DESC LIMIT ?"
+    return pd.read_sql(query, get_conn(), params=[n])
+
 @st.cache_data
 def search_players(search_term, limit=50):
     """Search for players"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
     
     query = """
     SELECT pa.player_name, pa.CA, pa.PA, pa.passing, pa.shooting, pa.dribbling, 
            pa.pace, pa.tackling, pa.goalkeeping, ps.minutes_played, ps.goals_per90, ps.assists_per90
     FROM player_attributes pa
-    LEFT JOIN player_stats ps ON pa.player_name = ps.player_name
-    WHERE pa.player_name LIKE ?
+    LEFT JOIN players p ON p.player_name = pa.player_name
+    LEFT JOIN player_stats ps ON ps.player_id = p.player_id AND ps.competition_id = 0 AND ps.season_id = 0
+    WHERE {name_filter}
     ORDER BY pa.CA DESC
     LIMIT ?
     """
     
-    df = pd.read_sql(query, conn, params=[f"%{search_term}%", limit])
-    conn.close()
+    # Indexed word-prefix match via the FTS5 table written by script 5;
+    # each word is quoted so user input cannot inject FTS query syntax
+    fts_query = " ".join('"' + word.replace('"', '""') + '"*' for word in search_term.split())
+    try:
+        df = pd.read_sql(
+            query.format(name_filter="pa.player_name IN (SELECT player_name FROM player_names_fts WHERE player_names_fts MATCH ?)"),
+            conn, params=[fts_query, limit]
+        )
+    except pd.io.sql.DatabaseError:
+        # Database predates the FTS table: fall back to a substring scan
+        df = pd.read_sql(query.format(name_filter="pa.player_name LIKE ?"), conn, params=[f"%{search_term}%", limit])
     return df
 
+RADAR_ATTRS = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 
+               'positioning', 'tackling', 'goalkeeping', 'vision', 'composure']
+
+# Axes, fill and layout are identical for every player; build and validate them once
+_RADAR_TEMPLATE = go.Figure(go.Scatterpolar(theta=RADAR_ATTRS, fill='toself', line_color='blue'))
+_RADAR_TEMPLATE.update_layout(
+    polar=dict(
+        radialaxis=dict(
+            visible=True,
+            range=[0, 20]
+        )),
+    showlegend=True,
+    height=500
+)
+
 def create_radar_chart(player_data, player_name):
     """Create radar chart for a player"""
-    radar_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 
-                   'positioning', 'tackling', 'goalkeeping', 'vision', 'composure']
-    
-    values = [player_data[attr] for attr in radar_attrs]
-    
-    fig = go.Figure()
+    fig = go.Figure(_RADAR_TEMPLATE)
+    fig.data[0].r = player_data.reindex(RADAR_ATTRS).to_numpy()
+    fig.data[0].name = player_name
+    fig.layout.title.text = f"{player_name} - Player Attributes"
+    return fig
+
+# ----------------------------
+# Cached figure builders: reruns reuse the built figure instead of re-encoding it
+# ----------------------------
+TOP_BAR_LABELS = {
+    'CA': 'Current Ability', 'PA': 'Potential Ability',
+    'goals_per90': 'Goals per 90', 'assists_per90': 'Assists per 90',
+}
+
+@st.cache_data
+def build_top_players_fig(column, n, title):
+    """Horizontal bar chart of the top n players by an attribute"""
+    fig = px.bar(
+        top_players_by(column, n),
+        x=column,
+        y='player_name',
+        orientation='h',
+        title=title,
+        labels={column: TOP_BAR_LABELS[column], 'player_name': 'Player'}
+    )
+    fig.update_layout(height=500)
+    return fig
+
+@st.cache_data
+def build_top_performers_fig(column, n, title):
+    """Horizontal bar chart of the top n performers by a per-90 stat"""
+    return px.bar(
+        top_performers_by(column, n),
+        x=column,
+        y='player_name',
+        orientation='h',
+        title=title,
+        labels={column: TOP_BAR_LABELS[column], 'player_name': 'Player'}
+    )
+
+@st.cache_data
+def build_distribution_fig(category, attrs):
+    """2x3 grid of attribute histograms for one category"""
+    attributes_df = load_player_attributes()
+    fig = make_subplots(rows=2, cols=3, subplot_titles=attrs[:6])
     
-    fig.add_trace(go.Scatterpolar(
-        r=values,
-        theta=radar_attrs,
-        fill='toself',
-        name=player_name,
-        line_color='blue'
-    ))
+    for i, attr in enumerate(attrs[:6]):
+        row = (i // 3) + 1
+        col = (i % 3) + 1
+        
+        # Bin on the server so the browser receives 20 bars, not every rating
+        counts, edges = np.histogram(attributes_df[attr].dropna().to_numpy(), bins=20)
+        fig.add_trace(
+            go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), name=attr, showlegend=False),
+            row=row, col=col
+        )
     
     fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=True,
-                range=[0, 20]
-            )),
-        showlegend=True,
-        title=f"{player_name} - Player Attributes",
-        height=500
+        title=f"{category} Attributes Distribution",
+        height=600,
+        showlegend=False,
+        bargap=0
     )
+    return fig
+
+@st.cache_data
+def build_correlation_fig(cols):
+    """Correlation heatmap for the selected attributes"""
+    return px.imshow(
+        attribute_correlations(cols),
+        text_auto=True,
+        aspect="auto",
+        title="Attribute Correlation Matrix",
+        color_continuous_scale="RdBu_r"
+    )
+
+@st.cache_data
+def build_goals_xg_fig(max_points=5000):
+    """Goals vs xG scatter; the y=x reference is a WebGL trace so the figure uses one context"""
+    stats_df = load_player_stats()
+    # Diagonal spans the full data even when the scatter is sampled
+    max_val = max(stats_df['xG_per90'].max(), stats_df['goals_per90'].max())
+    if len(stats_df) > max_points:
+        stats_df = stats_df.sample(max_points, random_state=0)
     
+    fig = go.Figure([
+        go.Scattergl(
+            x=stats_df['xG_per90'], y=stats_df['goals_per90'], mode='markers',
+            text=stats_df['player_name'], hoverinfo='text+x+y', name='Players'
+        ),
+        go.Scattergl(
+            x=[0, max_val], y=[0, max_val], mode='lines',
+            line=dict(dash='dash', color='red'), hoverinfo='skip', name='Goals = xG'
+        ),
+    ])
+    fig.update_layout(
+        title="Goals per 90 vs Expected Goals per 90",
+        xaxis_title='Expected Goals per 90',
+        yaxis_title='Goals per 90',
+        showlegend=False
+    )
     return fig
 
+@st.cache_data
+def build_radar_fig(player_name):
+    """Radar chart for a single player"""
+    return create_radar_chart(load_player_row(player_name), player_name)
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">⚽ Football Scout Dashboard</h1>', unsafe_allow_html=True)
@@ -158,16 +356,14 @@ def main():
         ["📊 Overview", "🔍 Player Search", "📈 Analytics", "🏆 Top Players", "⚽ Performance"]
     )
     
-    # Load data
-    with st.spinner("Loading database..."):
-        db_info = load_database_info()
-        attributes_df = load_player_attributes()
-        stats_df = load_player_stats()
-    
+    # Each page loads only the data it renders
     # Overview Page
     if page == "📊 Overview":
         st.header("📊 Database Overview")
         
+        with st.spinner("Loading database..."):
+            db_info = load_database_info()
+        
         # Key metrics
         col1, col2, col3, col4 = st.columns(4)
         
@@ -181,7 +377,7 @@ def main():
         with col2:
             st.metric(
                 label="Players with Stats",
-                value=f"{db_info.get('player_stats', 0):,}",
+                value=f"{players_with_stats():,}",
                 delta=None
             )
         
@@ -205,16 +401,18 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            st.write("**Tables in Database:**")
-            for table, count in db_info.items():
-                st.write(f"• **{table}**: {count:,} records")
+            # One markdown block per list instead of one message per line
+            st.markdown("**Tables in Database:**\n\n" + "\n".join(
+                f"• **{table}**: {count:,} records  " for table, count in db_info.items()
+            ))
         
         with col2:
             # Top players preview
-            st.write("**Top 5 Players by CA:**")
-            top_5 = attributes_df.head(5)[['player_name', 'CA', 'PA']]
-            for _, player in top_5.iterrows():
-                st.write(f"• **{player['player_name']}**: CA {player['CA']:.1f}, PA {player['PA']:.1f}")
+            top_5 = top_players_by('CA', 5)
+            st.markdown("**Top 5 Players by CA:**\n\n" + "\n".join(
+                f"• **{name}**: CA {ca:.1f}, PA {pa:.1f}  "
+                for name, ca, pa in top_5[['player_name', 'CA', 'PA']].itertuples(index=False, name=None)
+            ))
         
         # Attribute distributions
         st.subheader("📈 Attribute Distributions")
@@ -232,23 +430,7 @@ def main():
         selected_attrs = attr_categories[selected_category]
         
         # Create distribution plot
-        fig = make_subplots(rows=2, cols=3, subplot_titles=selected_attrs[:6])
-        
-        for i, attr in enumerate(selected_attrs[:6]):
-            row = (i // 3) + 1
-            col = (i % 3) + 1
-            
-            fig.add_trace(
-                go.Histogram(x=attributes_df[attr], name=attr, showlegend=False),
-                row=row, col=col
-            )
-        
-        fig.update_layout(
-            title=f"{selected_category} Attributes Distribution",
-            height=600,
-            showlegend=False
-        )
-        
+        fig = build_distribution_fig(selected_category, tuple(selected_attrs))
         st.plotly_chart(fig, use_container_width=True)
     
     # Player Search Page
@@ -264,50 +446,72 @@ def main():
             if not search_results.empty:
                 st.success(f"Found {len(search_results)} players matching '{search_term}'")
                 
-                # Display search results
-                for _, player in search_results.iterrows():
-                    with st.expander(f"👤 {player['player_name']} (CA: {player['CA']:.1f}, PA: {player['PA']:.1f})"):
-                        col1, col2, col3 = st.columns(3)
-                        
-                        with col1:
-                            st.write("**Basic Info:**")
-                            st.write(f"• Current Ability: {player['CA']:.1f}")
-                            st.write(f"• Potential Ability: {player['PA']:.1f}")
-                        
-                        with col2:
-                            st.write("**Key Attributes:**")
-                            st.write(f"• Passing: {player['passing']:.1f}")
-                            st.write(f"• Shooting: {player['shooting']:.1f}")
-                            st.write(f"• Dribbling: {player['dribbling']:.1f}")
-                        
-                        with col3:
-                            st.write("**Performance:**")
-                            if pd.notna(player['goals_per90']):
-                                st.write(f"• Goals/90: {player['goals_per90']:.2f}")
-                            if pd.notna(player['assists_per90']):
-                                st.write(f"• Assists/90: {player['assists_per90']:.2f}")
-                            if pd.notna(player['minutes_played']):
-                                st.write(f"• Minutes: {player['minutes_played']:,}")
+                # Display search results as one table; details render only for the selected row
+                event = st.dataframe(
+                    search_results,
+                    use_container_width=True,
+                    hide_index=True,
+                    on_select="rerun",
+                    selection_mode="single-row",
+                    column_config={
+                        "player_name": "Player",
+                        "CA": st.column_config.NumberColumn("CA", format="%.1f"),
+                        "PA": st.column_config.NumberColumn("PA", format="%.1f"),
+                        "minutes_played": st.column_config.NumberColumn("Minutes", format="%d"),
+                        "goals_per90": st.column_config.NumberColumn("Goals/90", format="%.2f"),
+                        "assists_per90": st.column_config.NumberColumn("Assists/90", format="%.2f"),
+                    }
+                )
+                
+                if event.selection.rows:
+                    player = search_results.iloc[event.selection.rows[0]]
+                    st.markdown(f"#### 👤 {player.player_name} (CA: {player.CA:.1f}, PA: {player.PA:.1f})")
+                    col1, col2, col3 = st.columns(3)
+                    
+                    # One markdown call per column; trailing double spaces are line breaks
+                    col1.markdown(
+                        f"**Basic Info:**  \n"
+                        f"• Current Ability: {player.CA:.1f}  \n"
+                        f"• Potential Ability: {player.PA:.1f}"
+                    )
+                    col2.markdown(
+                        f"**Key Attributes:**  \n"
+                        f"• Passing: {player.passing:.1f}  \n"
+                        f"• Shooting: {player.shooting:.1f}  \n"
+                        f"• Dribbling: {player.dribbling:.1f}"
+                    )
+                    performance = ["**Performance:**"]
+                    if pd.notna(player.goals_per90):
+                        performance.append(f"• Goals/90: {player.goals_per90:.2f}")
+                    if pd.notna(player.assists_per90):
+                        performance.append(f"• Assists/90: {player.assists_per90:.2f}")
+                    if pd.notna(player.minutes_played):
+                        performance.append(f"• Minutes: {player.minutes_played:,.0f}")
+                    col3.markdown("  \n".join(performance))
+                else:
+                    st.caption("Select a row to see the player's details.")
                 
                 # Player comparison
                 st.subheader("🆚 Player Comparison")
                 
                 if len(search_results) >= 2:
-                    player1_name = st.selectbox("Select first player:", search_results['player_name'].tolist())
+                    # Index the results by name once so both lookups are hash hits
+                    radar_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'tackling', 'goalkeeping']
+                    radar_by_name = search_results.drop_duplicates('player_name').set_index('player_name')[radar_attrs]
+                    
+                    player1_name = st.selectbox("Select first player:", radar_by_name.index.tolist())
                     player2_name = st.selectbox("Select second player:", 
-                                              [p for p in search_results['player_name'].tolist() if p != player1_name])
+                                              radar_by_name.index.drop(player1_name).tolist())
                     
                     if st.button("Compare Players"):
-                        player1_data = search_results[search_results['player_name'] == player1_name].iloc[0]
-                        player2_data = search_results[search_results['player_name'] == player2_name].iloc[0]
-                        
                         # Create comparison chart
-                        radar_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'tackling', 'goalkeeping']
+                        player1_values = radar_by_name.loc[player1_name].to_numpy()
+                        player2_values = radar_by_name.loc[player2_name].to_numpy()
                         
                         fig = go.Figure()
                         
                         fig.add_trace(go.Scatterpolar(
-                            r=[player1_data[attr] for attr in radar_attrs],
+                            r=player1_values,
                             theta=radar_attrs,
                             fill='toself',
                             name=player1_name,
@@ -315,7 +519,7 @@ def main():
                         ))
                         
                         fig.add_trace(go.Scatterpolar(
-                            r=[player2_data[attr] for attr in radar_attrs],
+                            r=player2_values,
                             theta=radar_attrs,
                             fill='toself',
                             name=player2_name,
@@ -336,6 +540,9 @@ def main():
     elif page == "📈 Analytics":
         st.header("📈 Advanced Analytics")
         
+        with st.spinner("Loading database..."):
+            attributes_df = load_player_attributes()
+        
         # Attribute correlations
         st.subheader("🔗 Attribute Correlations")
         
@@ -344,16 +551,7 @@ def main():
         selected_attrs = st.multiselect("Select attributes for correlation:", all_attrs, default=all_attrs[:6])
         
         if selected_attrs:
-            corr_data = attributes_df[selected_attrs].corr()
-            
-            fig = px.imshow(
-                corr_data,
-                text_auto=True,
-                aspect="auto",
-                title="Attribute Correlation Matrix",
-                color_continuous_scale="RdBu_r"
-            )
-            
+            fig = build_correlation_fig(tuple(selected_attrs))
             st.plotly_chart(fig, use_container_width=True)
         
         # CA vs PA analysis
@@ -368,19 +566,18 @@ def main():
                 x='CA', 
                 y='PA',
                 title="Current Ability vs Potential Ability",
-                labels={'CA': 'Current Ability', 'PA': 'Potential Ability'}
+                labels={'CA': 'Current Ability', 'PA': 'Potential Ability'},
+                render_mode='webgl'
             )
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             # Position-specific CA comparison
-            pos_cols = ['CA_GK', 'CA_DEF', 'CA_MID', 'CA_FWD']
-            pos_means = [attributes_df[col].mean() for col in pos_cols]
-            pos_labels = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
+            pos_means = position_means()
             
             fig = px.bar(
-                x=pos_labels,
-                y=pos_means,
+                x=list(pos_means.keys()),
+                y=list(pos_means.values()),
                 title="Average CA by Position",
                 labels={'x': 'Position', 'y': 'Average CA'}
             )
@@ -395,66 +592,49 @@ def main():
         
         with col1:
             st.subheader("🥇 Top 10 by Current Ability")
-            top_ca = attributes_df.head(10)[['player_name', 'CA', 'PA']]
-            
-            fig = px.bar(
-                top_ca,
-                x='CA',
-                y='player_name',
-                orientation='h',
-                title="Top 10 Players by CA",
-                labels={'CA': 'Current Ability', 'player_name': 'Player'}
-            )
-            fig.update_layout(height=500)
+            fig = build_top_players_fig('CA', 10, "Top 10 Players by CA")
             st.plotly_chart(fig, use_container_width=True)
         
         with col2:
             st.subheader("🚀 Top 10 by Potential Ability")
-            top_pa = attributes_df.nlargest(10, 'PA')[['player_name', 'CA', 'PA']]
-            
-            fig = px.bar(
-                top_pa,
-                x='PA',
-                y='player_name',
-                orientation='h',
-                title="Top 10 Players by PA",
-                labels={'PA': 'Potential Ability', 'player_name': 'Player'}
-            )
-            fig.update_layout(height=500)
+            fig = build_top_players_fig('PA', 10, "Top 10 Players by PA")
             st.plotly_chart(fig, use_container_width=True)
         
         # Player radar charts
         st.subheader("🎯 Player Radar Charts")
         
-        selected_player = st.selectbox("Select a player for radar chart:", attributes_df['player_name'].head(20))
+        selected_player = st.selectbox("Select a player for radar chart:", top_players_by('CA', 20)['player_name'])
         
         if selected_player:
-            player_data = attributes_df[attributes_df['player_name'] == selected_player].iloc[0]
-            radar_fig = create_radar_chart(player_data, selected_player)
+            radar_fig = build_radar_fig(selected_player)
             st.plotly_chart(radar_fig, use_container_width=True)
     
     # Performance Page
     elif page == "⚽ Performance":
         st.header("⚽ Performance Statistics")
         
+        with st.spinner("Loading database..."):
+            stats_df = load_player_stats()
+        
         if not stats_df.empty:
             # Performance metrics
+            summary = performance_summary()
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                avg_goals = stats_df['goals_per90'].mean()
+                avg_goals = summary['goals_per90']
                 st.metric("Avg Goals/90", f"{avg_goals:.2f}")
             
             with col2:
-                avg_assists = stats_df['assists_per90'].mean()
+                avg_assists = summary['assists_per90']
                 st.metric("Avg Assists/90", f"{avg_assists:.2f}")
             
             with col3:
-                avg_pass_acc = stats_df['pass_accuracy'].mean()
+                avg_pass_acc = summary['pass_accuracy']
                 st.metric("Avg Pass Accuracy", f"{avg_pass_acc:.1f}%")
             
             with col4:
-                total_minutes = stats_df['minutes_played'].sum()
+                total_minutes = int(summary['minutes_played'])
                 st.metric("Total Minutes", f"{total_minutes:,}")
             
             # Top performers
@@ -464,53 +644,19 @@ def main():
             
             with col1:
                 st.write("**Top 10 Goal Scorers (per 90):**")
-                top_goals = stats_df.nlargest(10, 'goals_per90')[['player_name', 'goals_per90', 'minutes_played']]
-                
-                fig = px.bar(
-                    top_goals,
-                    x='goals_per90',
-                    y='player_name',
-                    orientation='h',
-                    title="Top 10 Goal Scorers",
-                    labels={'goals_per90': 'Goals per 90', 'player_name': 'Player'}
-                )
+                fig = build_top_performers_fig('goals_per90', 10, "Top 10 Goal Scorers")
                 st.plotly_chart(fig, use_container_width=True)
             
             with col2:
                 st.write("**Top 10 Assist Leaders (per 90):**")
-                top_assists = stats_df.nlargest(10, 'assists_per90')[['player_name', 'assists_per90', 'minutes_played']]
-                
-                fig = px.bar(
-                    top_assists,
-                    x='assists_per90',
-                    y='player_name',
-                    orientation='h',
-                    title="Top 10 Assist Leaders",
-                    labels={'assists_per90': 'Assists per 90', 'player_name': 'Player'}
-                )
+                fig = build_top_performers_fig('assists_per90', 10, "Top 10 Assist Leaders")
                 st.plotly_chart(fig, use_container_width=True)
             
             # Goals vs xG analysis
             st.subheader("📊 Goals vs Expected Goals")
             
             if 'xG_per90' in stats_df.columns:
-                fig = px.scatter(
-                    stats_df,
-                    x='xG_per90',
-                    y='goals_per90',
-                    title="Goals per 90 vs Expected Goals per 90",
-                    labels={'xG_per90': 'Expected Goals per 90', 'goals_per90': 'Goals per 90'},
-                    hover_data=['player_name']
-                )
-                
-                # Add diagonal line
-                max_val = max(stats_df['xG_per90'].max(), stats_df['goals_per90'].max())
-                fig.add_shape(
-                    type="line",
-                    x0=0, y0=0, x1=max_val, y1=max_val,
-                    line=dict(dash="dash", color="red")
-                )
-                
+                fig = build_goals_xg_fig()
                 st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("No performance statistics available. Please run the data collection script first.")
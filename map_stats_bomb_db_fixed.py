@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 from statsbombpy import sb
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from tqdm import tqdm
 
 # ----------------------------
@@ -33,14 +35,114 @@ COMPETITIONS = [
     {"id": 45, "name": "AFC Asian Cup", "seasons": []}, # Auto-detect latest
 ]
 ATTR_TABLE = "player_attributes"
+# Build the whole database in memory and write it out once at the end with VACUUM INTO.
+# Much faster for full rebuilds, but a crash loses the run's progress (the events
+# cache still saves the downloads); leave off for resumable incremental runs.
+STAGE_IN_MEMORY = False
+
+RANDOM_SEED = None  # set to an int for reproducible ages and PA draws
+
+# League strength coefficients by competition prestige
+LEAGUE_COEFFS = {
+    2: 1.0,    # Premier League
+    49: 0.95,   # La Liga  
+    11: 0.9,    # Serie A
+    12: 0.85,   # Bundesliga
+    9: 0.8,     # Ligue 1
+    37: 1.1,    # Champions League
+    38: 0.9,    # Europa League
+    55: 0.8,    # Europa Conference League
+    43: 1.05,   # World Cup
+    50: 1.0,    # Euro
+    72: 0.85,   # Nations League
+    44: 0.8,    # Copa America
+    45: 0.75    # AFC Asian Cup
+}
+
+# sb.matches() columns stored in the matches table
+MATCH_COLS = ["match_id", "match_date", "home_team", "away_team", "home_score", "away_score"]
+MATCH_DEFAULTS = {"match_date": "", "home_team": "", "away_team": "", "home_score": 0, "away_score": 0}
+INSERT_MATCH_SQL = """
+INSERT OR IGNORE INTO matches (match_id, competition_id, season_id, date, home_team, away_team, home_score, away_score)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Counting stats converted to per-90 rates
+PER90_COLS = [
+    "passes", "completed_passes", "key_passes", "assists",
+    "shots", "shots_on_target", "goals", "xG", "xA",
+    "dribbles", "dribbles_successful",
+    "tackles", "tackles_won", "interceptions", "clearances", "blocks",
+    "aerial_duels", "aerial_duels_won",
+    "pressures", "fouls_committed", "fouls_won"
+]
+
+# Attribute weights of each position's CA, and the (min_age, max_age, factor) of its peak years
+POSITION_WEIGHTS = {
+    "GK": {"goalkeeping": 0.4, "reflexes": 0.2, "handling": 0.2, "kicking": 0.2},
+    "DEF": {"tackling": 0.25, "marking": 0.25, "heading": 0.2, "positioning": 0.15, "pace": 0.15},
+    "MID": {"passing": 0.25, "vision": 0.2, "positioning": 0.15, "dribbling": 0.15, "tackling": 0.15, "stamina": 0.1},
+    "FWD": {"shooting": 0.3, "pace": 0.2, "dribbling": 0.2, "finishing": 0.15, "positioning": 0.15},
+}
+POSITION_PEAK_AGES = {"GK": (28, 32, 1.1), "DEF": (26, 30, 1.05), "MID": (24, 28, 1.05), "FWD": (22, 26, 1.05)}
+
+# player_stats value columns, in INSERT order after player_id/competition_id/season_id
+STATS_COLS = [
+    "minutes_played", "matches_played",
+    "passes_per90", "completed_passes_per90", "pass_accuracy", "key_passes_per90", "assists_per90",
+    "shots_per90", "shots_on_target_per90", "goals_per90", "xG_per90", "xA_per90",
+    "dribbles_per90", "dribbles_successful_per90",
+    "tackles_per90", "tackles_won_per90", "interceptions_per90", "clearances_per90", "blocks_per90",
+    "aerial_duels_per90", "aerial_duels_won_per90",
+    "pressures_per90", "fouls_committed_per90", "fouls_won_per90", "cards_yellow", "cards_red",
+]
+# Upsert on the (player_id, competition_id, season_id) unique index, as in script 4, so reruns
+# replace each player's aggregate row instead of adding another
+INSERT_PLAYER_STAT_SQL = f"""
+INSERT INTO player_stats (player_id, competition_id, season_id, {', '.join(STATS_COLS)})
+VALUES ({', '.join('?' * (len(STATS_COLS) + 3))})
+ON CONFLICT(player_id, competition_id, season_id) DO UPDATE SET
+""" + ",\n".join(f"    {c} = excluded.{c}" for c in STATS_COLS)
 
 os.makedirs("data", exist_ok=True)
 
 # ----------------------------
 # Connect to SQLite
 # ----------------------------
-conn = sqlite3.connect(DB_PATH)
+# Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+if STAGE_IN_MEMORY:
+    # Start from the current file so earlier runs' data and checkpoints carry over
+    conn = sqlite3.connect(":memory:", isolation_level=None)
+    disk_conn = sqlite3.connect(DB_PATH)
+    disk_conn.backup(conn)
+    disk_conn.close()
+else:
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
 cur = conn.cursor()
+cur.executescript("""
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-262144;
+PRAGMA mmap_size=268435456;
+""")
+
+def close_db():
+    """Refresh planner statistics and close the connection, publishing the staged database when staging"""
+    # sqlite_stat1 for everything this run wrote; PRAGMA optimize skips tables this connection never queried
+    conn.execute("ANALYZE")
+    if STAGE_IN_MEMORY:
+        tmp_path = DB_PATH + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # VACUUM INTO writes a compact copy in one pass; the rename swaps it in atomically
+        conn.execute("VACUUM INTO ?", (tmp_path,))
+        os.replace(tmp_path, DB_PATH)
+        # The copy is written in rollback-journal mode; restore WAL for the other scripts
+        disk_conn = sqlite3.connect(DB_PATH)
+        disk_conn.execute("PRAGMA journal_mode=WAL")
+        disk_conn.close()
+    conn.close()
 
 # ----------------------------
 # CREATE TABLES
@@ -157,6 +259,49 @@ CREATE TABLE IF NOT EXISTS player_attributes (
     CA_MID REAL,
     CA_FWD REAL
 );
+-- Event-pass checkpoint: matches already aggregated and their per-player records
+CREATE TABLE IF NOT EXISTS processed_matches (
+    match_id INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS player_match_stats (
+    player TEXT,
+    match_id INTEGER,
+    competition_id INTEGER,
+    season_id INTEGER,
+    minutes_played INTEGER,
+    matches_played INTEGER,
+    passes INTEGER,
+    completed_passes INTEGER,
+    key_passes INTEGER,
+    assists INTEGER,
+    shots INTEGER,
+    shots_on_target INTEGER,
+    goals INTEGER,
+    xG REAL,
+    xA REAL,
+    dribbles INTEGER,
+    dribbles_successful INTEGER,
+    tackles INTEGER,
+    tackles_won INTEGER,
+    interceptions INTEGER,
+    clearances INTEGER,
+    blocks INTEGER,
+    aerial_duels INTEGER,
+    aerial_duels_won INTEGER,
+    pressures INTEGER,
+    fouls_committed INTEGER,
+    fouls_won INTEGER,
+    cards_yellow INTEGER,
+    cards_red INTEGER,
+    saves INTEGER,
+    clean_sheets INTEGER,
+    goals_conceded INTEGER
+);
+-- Databases written by earlier versions hold one aggregate row per player per run: keep the latest
+DELETE FROM player_stats WHERE rowid NOT IN (
+    SELECT MAX(rowid) FROM player_stats GROUP BY player_id, competition_id, season_id
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ps_player_comp_season ON player_stats(player_id, competition_id, season_id);
 """)
 conn.commit()
 
@@ -166,30 +311,35 @@ conn.commit()
 print("Fetching competitions and matches...")
 
 # Function to get latest available seasons for a competition
-def get_latest_seasons(comp_id, max_seasons=4):
-    try:
-        comps_df = sb.competitions()
-        available_seasons = comps_df[comps_df.competition_id == comp_id]['season_id'].tolist()
-        # Return the latest seasons, sorted in descending order
-        # Prioritize seasons from 2020 onwards
-        recent_seasons = [s for s in available_seasons if s >= 100]  # Season IDs 100+ are typically 2020+
-        if recent_seasons:
-            return sorted(recent_seasons, reverse=True)[:max_seasons]
-        else:
-            return sorted(available_seasons, reverse=True)[:max_seasons]
-    except:
-        return []
+def get_latest_seasons(comp_id, seasons_by_comp, max_seasons=4):
+    available_seasons = seasons_by_comp.get(comp_id, [])
+    # Return the latest seasons, sorted in descending order
+    # Prioritize seasons from 2020 onwards
+    recent_seasons = [s for s in available_seasons if s >= 100]  # Season IDs 100+ are typically 2020+
+    if recent_seasons:
+        return sorted(recent_seasons, reverse=True)[:max_seasons]
+    else:
+        return sorted(available_seasons, reverse=True)[:max_seasons]
 
 # Update competitions with latest available seasons
 print("Detecting latest available seasons...")
+# The competitions catalogue does not change during a run, so fetch it once
+COMPS_DF = sb.competitions()
+SEASONS_BY_COMP = COMPS_DF.groupby("competition_id")["season_id"].agg(list).to_dict()
+SEASON_NAME = dict(zip(zip(COMPS_DF.competition_id, COMPS_DF.season_id), COMPS_DF.season_name))
+
 for comp in COMPETITIONS:
-    latest_seasons = get_latest_seasons(comp["id"])
+    latest_seasons = get_latest_seasons(comp["id"], SEASONS_BY_COMP)
     if latest_seasons:
         comp["seasons"] = latest_seasons
         print(f"  {comp['name']}: Found seasons {latest_seasons}")
 
 all_matches = []
+# match_id -> (competition_id, season_id), filled as matches are inserted
+MATCH_META = {}
 
+# All competition/match inserts go out in one transaction
+cur.execute("BEGIN IMMEDIATE")
 for comp in COMPETITIONS:
     comp_id = comp["id"]
     comp_name = comp["name"]
@@ -199,38 +349,30 @@ for comp in COMPETITIONS:
     for season_id in comp["seasons"]:
         try:
             # Get competition info
-            comps_df = sb.competitions()
-            comp_info = comps_df[(comps_df.competition_id == comp_id) & (comps_df.season_id == season_id)]
+            season_name = SEASON_NAME.get((comp_id, season_id))
             
-            if len(comp_info) > 0:
+            if season_name is not None:
                 # Insert competition
                 cur.execute("""
                 INSERT OR IGNORE INTO competitions (competition_id, competition_name, season_id, season_name)
                 VALUES (?, ?, ?, ?)
-                """, (comp_id, comp_name, season_id, comp_info["season_name"].iloc[0]))
+                """, (comp_id, comp_name, season_id, season_name))
                 
                 # Get matches for this competition/season
                 matches = sb.matches(competition_id=comp_id, season_id=season_id)
                 
                 if len(matches) > 0:
-                    print(f"  Found {len(matches)} matches in {comp_name} {comp_info['season_name'].iloc[0]}")
+                    print(f"  Found {len(matches)} matches in {comp_name} {season_name}")
                     
-                    # Insert matches
-                    for _, m in matches.iterrows():
-                        cur.execute("""
-                        INSERT OR IGNORE INTO matches (match_id, competition_id, season_id, date, home_team, away_team, home_score, away_score)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            m["match_id"],
-                            comp_id,
-                            season_id,
-                            m.get("match_date", ""),
-                            m.get("home_team", ""),
-                            m.get("away_team", ""),
-                            m.get("home_score", 0),
-                            m.get("away_score", 0)
-                        ))
-                        all_matches.append(m["match_id"])
+                    # Insert matches in a single batch; absent columns fall back to the old defaults
+                    cols = matches.reindex(columns=MATCH_COLS).fillna(MATCH_DEFAULTS)
+                    rows = [
+                        (match_id, comp_id, season_id, *rest)
+                        for match_id, *rest in cols.itertuples(index=False, name=None)
+                    ]
+                    cur.executemany(INSERT_MATCH_SQL, rows)
+                    all_matches.extend(r[0] for r in rows)
+                    MATCH_META.update((r[0], (comp_id, season_id)) for r in rows)
                 else:
                     print(f"  No matches found for {comp_name} season {season_id}")
             else:
@@ -250,188 +392,213 @@ print("Processing match events and calculating player stats...")
 
 # Checkpoint system - save progress every 50 matches
 CHECKPOINT_INTERVAL = 50
-checkpoint_file = "data/checkpoint_matches.txt"
-processed_matches_file = "data/processed_players.csv"
+FETCH_CONCURRENCY = 16
+# Projected sb.events() frames, one Parquet file per match, so reruns skip the download
+events_cache_dir = "data/events_cache"
+os.makedirs(events_cache_dir, exist_ok=True)
 
-# Load previously processed matches if checkpoint exists
-processed_matches = set()
-if os.path.exists(checkpoint_file):
-    with open(checkpoint_file, 'r') as f:
-        processed_matches = set(line.strip() for line in f)
+# Matches aggregated by earlier runs are recorded in the database itself
+processed_matches = {row[0] for row in cur.execute("SELECT match_id FROM processed_matches")}
+if processed_matches:
     print(f"Resuming from checkpoint: {len(processed_matches)} matches already processed")
 
-# Load existing player data if available
+# Work since the last checkpoint: per-match player frames and the matches they cover
 all_players = []
-if os.path.exists(processed_matches_file):
+pending_matches = []
+
+def save_checkpoint():
+    """Write the pending player records and their match ids in one transaction"""
+    new_records = sum(len(df) for df in all_players)
+    cur.execute("BEGIN IMMEDIATE")
+    for df in all_players:
+        cur.executemany(INSERT_PLAYER_MATCH_SQL, df.itertuples(index=False, name=None))
+    cur.executemany("INSERT OR IGNORE INTO processed_matches (match_id) VALUES (?)", ((m,) for m in pending_matches))
+    conn.commit()
+    processed_matches.update(pending_matches)
+    all_players.clear()
+    pending_matches.clear()
+    return new_records
+
+# Column order of the per-match player records
+PLAYER_MATCH_COLS = [
+    "player", "match_id", "competition_id", "season_id", "minutes_played", "matches_played",
+    # Passing
+    "passes", "completed_passes", "key_passes", "assists",
+    # Shooting
+    "shots", "shots_on_target", "goals", "xG", "xA",
+    # Dribbling
+    "dribbles", "dribbles_successful",
+    # Defending
+    "tackles", "tackles_won", "interceptions", "clearances", "blocks",
+    # Aerial
+    "aerial_duels", "aerial_duels_won",
+    # Advanced
+    "pressures", "fouls_committed", "fouls_won", "cards_yellow", "cards_red",
+    # Goalkeeping (simplified)
+    "saves", "clean_sheets", "goals_conceded"
+]
+INSERT_PLAYER_MATCH_SQL = f"""
+INSERT INTO player_match_stats ({', '.join(PLAYER_MATCH_COLS)})
+VALUES ({', '.join('?' * len(PLAYER_MATCH_COLS))})
+"""
+
+# Event columns read by aggregate_match_events; the rest of the ~150 are dropped on arrival
+EVENT_COLS = [
+    "player", "minute", "type",
+    "pass_outcome", "pass_goal_assist", "pass_statsbomb_xa",
+    "shot_outcome", "shot_statsbomb_xg",
+    "dribble_outcome", "tackle_outcome", "duel_type", "duel_outcome", "card_type"
+]
+
+# Stats that are a plain count of one event type
+TYPE_COUNTS = {
+    "passes": "Pass", "shots": "Shot", "dribbles": "Dribble", "tackles": "Tackle",
+    "interceptions": "Interception", "clearances": "Clearance", "blocks": "Block",
+    "pressures": "Pressure", "fouls_committed": "Foul Committed", "fouls_won": "Foul Won",
+}
+
+def aggregate_match_events(events, match_id, comp_id, season_id):
+    """Aggregate one match's events into per-player records with a single groupby"""
+    events = events[events["player"].notna()]
+    columns = events.columns
+    etype = events["type"]
+
+    def outcome(col, mask, fallback):
+        # Outcome columns are only present when the match has such events
+        return mask(events[col]) if col in columns else fallback
+
+    # Every plain per-type count from one pass over the type column
+    type_counts = events.groupby(["player", "type"], sort=False).size().unstack(fill_value=0)
+    type_counts = type_counts.reindex(columns=list(TYPE_COUNTS.values()), fill_value=0)
+    type_counts.columns = list(TYPE_COUNTS)
+
+    # Counts that depend on an outcome column are summed from boolean flags
+    no_rows = pd.Series(False, index=events.index)
+    is_pass = etype == "Pass"
+    is_shot = etype == "Shot"
+    is_dribble = etype == "Dribble"
+    is_tackle = etype == "Tackle"
+    is_card = etype == "Card"
+    is_aerial = (etype == "Duel") & outcome("duel_type", lambda c: c == "Aerial", no_rows)
+    is_goal = is_shot & outcome("shot_outcome", lambda c: c == "Goal", no_rows)
+
+    flags = events[["player"]].assign(
+        completed_passes=is_pass & outcome("pass_outcome", lambda c: c == "Complete", True),
+        key_passes=is_pass & outcome("pass_goal_assist", lambda c: c == True, no_rows),
+        assists=is_goal,  # Simplified
+        shots_on_target=is_shot & outcome("shot_outcome", lambda c: c.isin(["Goal", "Saved"]), True),
+        goals=is_goal,
+        xG=events["shot_statsbomb_xg"].where(is_shot, 0) if "shot_statsbomb_xg" in columns else 0.0,
+        xA=events["pass_statsbomb_xa"].where(is_pass, 0) if "pass_statsbomb_xa" in columns else 0.0,
+        dribbles_successful=is_dribble & outcome("dribble_outcome", lambda c: c == "Complete", True),
+        tackles_won=is_tackle & outcome("tackle_outcome", lambda c: c == "Won", True),
+        aerial_duels=is_aerial,
+        aerial_duels_won=is_aerial & outcome("duel_outcome", lambda c: c == "Won", no_rows),
+        cards_yellow=is_card & outcome("card_type", lambda c: c == "Yellow Card", no_rows),
+        cards_red=is_card & outcome("card_type", lambda c: c == "Red Card", no_rows),
+    )
+
+    counts = pd.concat([type_counts, flags.groupby("player", sort=False).sum()], axis=1)
+    counts["minutes_played"] = events.groupby("player", sort=False)["minute"].max()
+    counts = counts[counts["minutes_played"] != 0].rename_axis("player").reset_index()
+
+    counts = counts.assign(
+        match_id=match_id, competition_id=comp_id, season_id=season_id, matches_played=1,
+        # Goalkeeping (simplified)
+        saves=0, clean_sheets=0, goals_conceded=0
+    )
+    return counts[PLAYER_MATCH_COLS]
+
+def fetch_events(match_id):
+    """Load one match's events from the disk cache or download them; errors are returned so the main loop can report them"""
+    cache_path = os.path.join(events_cache_dir, f"{match_id}.parquet")
     try:
-        df_existing = pd.read_csv(processed_matches_file)
-        all_players.append(df_existing)
-        print(f"Loaded existing player data: {len(df_existing)} records")
-    except:
-        print("Could not load existing player data, starting fresh")
+        if os.path.exists(cache_path):
+            return match_id, pd.read_parquet(cache_path)
+        events = sb.events(match_id=match_id)
+        # Keep only the columns the aggregation reads; absent ones stay absent so
+        # aggregate_match_events still applies its missing-column fallbacks
+        events = events[[c for c in EVENT_COLS if c in events.columns]]
+        # Write under a temporary name so an interrupted run never leaves a truncated cache entry
+        tmp_path = cache_path + ".tmp"
+        events.to_parquet(tmp_path, index=False, compression="zstd")
+        os.replace(tmp_path, cache_path)
+        return match_id, events
+    except Exception as e:
+        return match_id, e
+
+def iter_match_events(match_ids):
+    """Yield (match_id, events) in completion order with a bounded number of downloads in flight"""
+    ids = iter(match_ids)
+    with ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+        # Two requests queued per worker keeps the pool busy without buffering every match
+        in_flight = {executor.submit(fetch_events, m) for m in islice(ids, FETCH_CONCURRENCY * 2)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                in_flight.update(executor.submit(fetch_events, m) for m in islice(ids, 1))
 
 # Process matches with error handling and checkpointing
-matches_to_process = [m for m in all_matches if str(m) not in processed_matches]
+matches_to_process = [m for m in all_matches if m not in processed_matches]
 print(f"Processing {len(matches_to_process)} new matches...")
 
-# Create progress bar for match processing
-pbar = tqdm(total=len(matches_to_process), desc="Processing matches", unit="match")
+# Create progress bar for match processing; the only bar left around a hot loop, so redraw at most once a second
+pbar = tqdm(total=len(matches_to_process), desc="Processing matches", unit="match", mininterval=1.0)
 
-for i, match_id in enumerate(matches_to_process):
-    pbar.set_description(f"Processing match {i+1}/{len(matches_to_process)}: {match_id}")
+# Downloads run on worker threads; aggregation, SQLite and checkpoints stay on this thread
+for i, (match_id, events) in enumerate(iter_match_events(matches_to_process)):
+    pbar.set_description(f"Processing match {i+1}/{len(matches_to_process)}: {match_id}", refresh=False)
     
     try:
-        events = sb.events(match_id=match_id)
+        if isinstance(events, Exception):
+            raise events
         
         if len(events) == 0:
-            processed_matches.add(str(match_id))
+            pending_matches.append(match_id)
             continue
             
         # Get match info for competition/season
-        match_info = cur.execute("SELECT competition_id, season_id FROM matches WHERE match_id = ?", (match_id,)).fetchone()
+        match_info = MATCH_META.get(match_id)
         if not match_info:
-            processed_matches.add(str(match_id))
+            pending_matches.append(match_id)
             continue
         comp_id, season_id = match_info
 
         # Compute comprehensive per-player stats
-        player_stats = []
-        
-        for player in events["player"].dropna().unique():
-            player_events = events[events["player"] == player]
-            
-            # Basic stats
-            minutes = player_events["minute"].max() if len(player_events) > 0 else 0
-            if minutes == 0:
-                continue
-                
-            # Passing stats
-            passes = player_events[player_events["type"] == "Pass"]
-            completed_passes = passes[passes.get("pass_outcome", "") == "Complete"] if "pass_outcome" in passes.columns else passes
-            key_passes = passes[passes.get("pass_goal_assist", False) == True] if "pass_goal_assist" in passes.columns else pd.DataFrame()
-            
-            # Shooting stats
-            shots = player_events[player_events["type"] == "Shot"]
-            shots_on_target = shots[shots.get("shot_outcome", "").isin(["Goal", "Saved"])] if "shot_outcome" in shots.columns else shots
-            goals = shots[shots.get("shot_outcome", "") == "Goal"] if "shot_outcome" in shots.columns else pd.DataFrame()
-            
-            # Dribbling stats
-            dribbles = player_events[player_events["type"] == "Dribble"]
-            successful_dribbles = dribbles[dribbles.get("dribble_outcome", "") == "Complete"] if "dribble_outcome" in dribbles.columns else dribbles
-            
-            # Defensive stats
-            tackles = player_events[player_events["type"] == "Tackle"]
-            won_tackles = tackles[tackles.get("tackle_outcome", "") == "Won"] if "tackle_outcome" in tackles.columns else tackles
-            interceptions = player_events[player_events["type"] == "Interception"]
-            clearances = player_events[player_events["type"] == "Clearance"]
-            blocks = player_events[player_events["type"] == "Block"]
-            
-            # Aerial stats
-            aerial_duels = player_events[player_events["type"] == "Duel"]
-            aerial_duels = aerial_duels[aerial_duels.get("duel_type", "") == "Aerial"] if "duel_type" in aerial_duels.columns else pd.DataFrame()
-            won_aerial_duels = aerial_duels[aerial_duels.get("duel_outcome", "") == "Won"] if "duel_outcome" in aerial_duels.columns else pd.DataFrame()
-            
-            # Advanced stats
-            pressures = player_events[player_events["type"] == "Pressure"]
-            fouls_committed = player_events[player_events["type"] == "Foul Committed"]
-            fouls_won = player_events[player_events["type"] == "Foul Won"]
-            
-            # xG and xA
-            xG = shots["shot_statsbomb_xg"].sum() if "shot_statsbomb_xg" in shots.columns else 0
-            xA = passes["pass_statsbomb_xa"].sum() if "pass_statsbomb_xa" in passes.columns else 0
-            
-            # Cards
-            cards = player_events[player_events["type"] == "Card"]
-            yellow_cards = len(cards[cards.get("card_type", "") == "Yellow Card"]) if "card_type" in cards.columns else 0
-            red_cards = len(cards[cards.get("card_type", "") == "Red Card"]) if "card_type" in cards.columns else 0
-            
-            player_stat = {
-                "player": player,
-                "match_id": match_id,
-                "competition_id": comp_id,
-                "season_id": season_id,
-                "minutes_played": minutes,
-                "matches_played": 1,
-                # Passing
-                "passes": len(passes),
-                "completed_passes": len(completed_passes),
-                "key_passes": len(key_passes),
-                "assists": len(goals),  # Simplified
-                # Shooting
-                "shots": len(shots),
-                "shots_on_target": len(shots_on_target),
-                "goals": len(goals),
-                "xG": xG,
-                "xA": xA,
-                # Dribbling
-                "dribbles": len(dribbles),
-                "dribbles_successful": len(successful_dribbles),
-                # Defending
-                "tackles": len(tackles),
-                "tackles_won": len(won_tackles),
-                "interceptions": len(interceptions),
-                "clearances": len(clearances),
-                "blocks": len(blocks),
-                # Aerial
-                "aerial_duels": len(aerial_duels),
-                "aerial_duels_won": len(won_aerial_duels),
-                # Advanced
-                "pressures": len(pressures),
-                "fouls_committed": len(fouls_committed),
-                "fouls_won": len(fouls_won),
-                "cards_yellow": yellow_cards,
-                "cards_red": red_cards,
-                # Goalkeeping (simplified)
-                "saves": 0,
-                "clean_sheets": 0,
-                "goals_conceded": 0
-            }
-            
-            player_stats.append(player_stat)
-        
-        if player_stats:
-            df_match = pd.DataFrame(player_stats)
+        df_match = aggregate_match_events(events, match_id, comp_id, season_id)
+        if len(df_match) > 0:
             all_players.append(df_match)
             
         # Mark match as processed
-        processed_matches.add(str(match_id))
+        pending_matches.append(match_id)
         
         # Save checkpoint every CHECKPOINT_INTERVAL matches
         if (i + 1) % CHECKPOINT_INTERVAL == 0:
             pbar.set_postfix({"Checkpoint": f"Saving progress at match {i+1}"})
-            # Save processed matches list
-            with open(checkpoint_file, 'w') as f:
-                for match in processed_matches:
-                    f.write(f"{match}\n")
-            
-            # Save current player data
-            if all_players:
-                df_current = pd.concat(all_players, ignore_index=True)
-                df_current.to_csv(processed_matches_file, index=False)
-                pbar.set_postfix({"Saved": f"{len(df_current)} player records"})
+            new_records = save_checkpoint()
+            pbar.set_postfix({"Saved": f"{new_records} new player records"})
             
     except Exception as e:
-        pbar.set_postfix({"Error": f"Match {match_id}: {str(e)[:30]}..."})
+        pbar.set_postfix({"Error": f"Match {match_id}: {str(e)[:30]}..."}, refresh=False)
         # Still mark as processed to avoid infinite retry
-        processed_matches.add(str(match_id))
-        continue
+        pending_matches.append(match_id)
     
-    # Update progress bar
-    pbar.update(1)
+    finally:
+        # Skipped and failed matches count too, so the bar reaches its total
+        pbar.update(1)
 
 # Close progress bar
 pbar.close()
 
 # Final save of all data
-if all_players:
-    df_players = pd.concat(all_players, ignore_index=True)
+save_checkpoint()
+print("Final checkpoint saved")
+
+# Single read of every checkpointed record, old and new, for the aggregation
+df_players = pd.read_sql("SELECT * FROM player_match_stats", conn)
+if len(df_players) > 0:
     print(f"Processed {len(df_players)} player-match records")
-    # Save final checkpoint
-    with open(checkpoint_file, 'w') as f:
-        for match in processed_matches:
-            f.write(f"{match}\n")
-    df_players.to_csv(processed_matches_file, index=False)
-    print("Final checkpoint saved")
 else:
     print("No player data found")
     df_players = pd.DataFrame()
@@ -473,35 +640,11 @@ if len(df_players) > 0:
         cards_red=("cards_red", "sum")
     ).reset_index()
 
-    # Compute per-90 stats
+    # Compute per-90 stats: one (players x stats) divide instead of a Series division per column
     minutes_90 = agg["minutes_played"] / 90
-    agg["passes_per90"] = agg["passes"] / minutes_90
-    agg["completed_passes_per90"] = agg["completed_passes"] / minutes_90
+    per90 = agg[PER90_COLS].to_numpy(dtype=float) / minutes_90.to_numpy()[:, None]
+    agg = pd.concat([agg, pd.DataFrame(per90, columns=[c + "_per90" for c in PER90_COLS], index=agg.index)], axis=1)
     agg["pass_accuracy"] = (agg["completed_passes"] / agg["passes"] * 100).fillna(0)
-    agg["key_passes_per90"] = agg["key_passes"] / minutes_90
-    agg["assists_per90"] = agg["assists"] / minutes_90
-    
-    agg["shots_per90"] = agg["shots"] / minutes_90
-    agg["shots_on_target_per90"] = agg["shots_on_target"] / minutes_90
-    agg["goals_per90"] = agg["goals"] / minutes_90
-    agg["xG_per90"] = agg["xG"] / minutes_90
-    agg["xA_per90"] = agg["xA"] / minutes_90
-    
-    agg["dribbles_per90"] = agg["dribbles"] / minutes_90
-    agg["dribbles_successful_per90"] = agg["dribbles_successful"] / minutes_90
-    
-    agg["tackles_per90"] = agg["tackles"] / minutes_90
-    agg["tackles_won_per90"] = agg["tackles_won"] / minutes_90
-    agg["interceptions_per90"] = agg["interceptions"] / minutes_90
-    agg["clearances_per90"] = agg["clearances"] / minutes_90
-    agg["blocks_per90"] = agg["blocks"] / minutes_90
-    
-    agg["aerial_duels_per90"] = agg["aerial_duels"] / minutes_90
-    agg["aerial_duels_won_per90"] = agg["aerial_duels_won"] / minutes_90
-    
-    agg["pressures_per90"] = agg["pressures"] / minutes_90
-    agg["fouls_committed_per90"] = agg["fouls_committed"] / minutes_90
-    agg["fouls_won_per90"] = agg["fouls_won"] / minutes_90
     
     print(f"Aggregated stats for {len(agg)} players")
 else:
@@ -515,72 +658,38 @@ if len(agg) > 0:
     print("Inserting player data into database...")
     
     try:
-        # Insert players with error handling
-        players_inserted = 0
-        print("Inserting players into database...")
-        for _, row in tqdm(agg.iterrows(), total=len(agg), desc="Inserting players", unit="player"):
-            try:
-                cur.execute("INSERT OR IGNORE INTO players (player_name) VALUES (?)", (row["player"],))
-                players_inserted += 1
-            except Exception as e:
-                print(f"  Error inserting player {row['player']}: {e}")
-                continue
+        # Players and stats are written in one transaction
+        cur.execute("BEGIN IMMEDIATE")
         
-        conn.commit()
+        # Stage the names in a temp table, then add only the new ones in one statement
+        print("Inserting players into database...")
+        cur.execute("CREATE TEMP TABLE _tmp_names (player_name TEXT)")
+        cur.executemany("INSERT INTO _tmp_names VALUES (?)", ((name,) for name in agg["player"]))
+        cur.execute("""
+        INSERT INTO players (player_name)
+        SELECT t.player_name FROM _tmp_names t
+        WHERE NOT EXISTS (SELECT 1 FROM players p WHERE p.player_name = t.player_name)
+        """)
+        players_inserted = cur.rowcount
+        cur.execute("DROP TABLE _tmp_names")
         print(f"Inserted {players_inserted} players into database")
         
-        # Map player_name → player_id
-        players_dict = {name: i for i, name in enumerate(agg["player"], start=1)}
-        
-        # Insert comprehensive player_stats with batch processing
-        stats_inserted = 0
-        batch_size = 100
-        num_batches = (len(agg) - 1) // batch_size + 1
-        print(f"Processing {num_batches} batches of player stats...")
-        
-        for i in tqdm(range(0, len(agg), batch_size), desc="Processing batches", unit="batch"):
-            batch = agg.iloc[i:i+batch_size]
-            
-            for _, row in batch.iterrows():
-                try:
-                    player_id = players_dict[row["player"]]
-                    cur.execute("""
-                    INSERT INTO player_stats (
-                        player_id, competition_id, season_id, minutes_played, matches_played,
-                        passes_per90, completed_passes_per90, pass_accuracy, key_passes_per90, assists_per90,
-                        shots_per90, shots_on_target_per90, goals_per90, xG_per90, xA_per90,
-                        dribbles_per90, dribbles_successful_per90,
-                        tackles_per90, tackles_won_per90, interceptions_per90, clearances_per90, blocks_per90,
-                        aerial_duels_per90, aerial_duels_won_per90,
-                        pressures_per90, fouls_committed_per90, fouls_won_per90, cards_yellow, cards_red
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        player_id, 0, 0,  # competition_id=0 for aggregated stats, season_id=0 for all seasons
-                        row["minutes_played"], row["matches_played"],
-                        row["passes_per90"], row["completed_passes_per90"], row["pass_accuracy"], 
-                        row["key_passes_per90"], row["assists_per90"],
-                        row["shots_per90"], row["shots_on_target_per90"], row["goals_per90"], 
-                        row["xG_per90"], row["xA_per90"],
-                        row["dribbles_per90"], row["dribbles_successful_per90"],
-                        row["tackles_per90"], row["tackles_won_per90"], row["interceptions_per90"], 
-                        row["clearances_per90"], row["blocks_per90"],
-                        row["aerial_duels_per90"], row["aerial_duels_won_per90"],
-                        row["pressures_per90"], row["fouls_committed_per90"], row["fouls_won_per90"], 
-                        row["cards_yellow"], row["cards_red"]
-                    ))
-                    stats_inserted += 1
-                except Exception as e:
-                    print(f"  Error inserting stats for player {row['player']}: {e}")
-                    continue
-            
-            # Commit batch
-            try:
-                conn.commit()
-                print(f"  Committed batch {i//batch_size + 1}")
-            except Exception as e:
-                print(f"  Error committing batch: {e}")
-                conn.rollback()
+        # Map player_name → player_id from the table itself, so rows from earlier runs keep their ids
+        player_id_map = dict(cur.execute("SELECT player_name, MIN(player_id) FROM players GROUP BY player_name").fetchall())
+        agg["player_id"] = agg["player"].map(player_id_map)
+        
+        # Frame in player_stats column order; competition_id=0 / season_id=0 mark the all-competition aggregate
+        stats_df = agg[STATS_COLS].copy()
+        stats_df.insert(0, "player_id", agg["player_id"])
+        stats_df.insert(1, "competition_id", 0)
+        stats_df.insert(2, "season_id", 0)
+        # One prepared statement over all rows; faster than to_sql(method="multi") on SQLite
+        cur.executemany(INSERT_PLAYER_STAT_SQL, stats_df.itertuples(index=False, name=None))
+        stats_inserted = len(stats_df)
+        # Script 4's pre-joined copy would now be stale; without it the dashboard joins live
+        cur.execute("DROP TABLE IF EXISTS player_stats_denorm")
         
+        conn.commit()
         print(f"Successfully inserted stats for {stats_inserted} players")
         
     except Exception as e:
@@ -604,23 +713,24 @@ if len(agg) > 0:
         
         if len(df_stats) == 0:
             print("No player stats found in database")
-            conn.close()
+            close_db()
             exit()
         
         print(f"Loaded {len(df_stats)} player records for attribute calculation")
         
+        # Percentile ranking needs some players past the 500-minute baseline; checked once
+        has_baseline = bool((df_stats["minutes_played"] >= 500).any())
+        
         # Percentile helper with better handling
-        def percentile_to_1_20(series, min_minutes=500):
-            s = pd.Series(series).fillna(0)
-            # Only use players with sufficient minutes for percentile baseline
-            mask = df_stats["minutes_played"] >= min_minutes
-            if mask.sum() > 0:
-                baseline = s[mask]
-                if len(baseline) > 0:
-                    ranks = s.rank(pct=True)
-                    return (1 + ranks * 19).round(2)
+        def percentile_to_1_20(series):
+            s = np.nan_to_num(np.asarray(series, dtype=float))
+            if has_baseline:
+                # Average rank of each tie group, as Series.rank(pct=True)
+                _, inverse, counts = np.unique(s, return_inverse=True, return_counts=True)
+                avg_rank = np.cumsum(counts) - (counts - 1) / 2
+                return np.round(1 + avg_rank[inverse] / len(s) * 19, 2)
             # Fallback to simple scaling
-            return ((s - s.min()) / (s.max() - s.min() + 1e-8) * 19 + 1).round(2)
+            return np.round((s - s.min()) / (s.max() - s.min() + 1e-8) * 19 + 1, 2)
         
         # Enhanced attribute calculation with league coefficients and contextual factors
         print("Computing enhanced technical attributes...")
@@ -628,37 +738,10 @@ if len(agg) > 0:
         # Create progress bar for attribute calculation
         attr_pbar = tqdm(total=7, desc="Calculating attributes", unit="category")
         
-        # Calculate league strength coefficients based on competition
-        def get_league_coefficient(comp_id):
-            """Get league strength coefficient based on competition prestige"""
-            league_coeffs = {
-                2: 1.0,    # Premier League
-                49: 0.95,   # La Liga  
-                11: 0.9,    # Serie A
-                12: 0.85,   # Bundesliga
-                9: 0.8,     # Ligue 1
-                37: 1.1,    # Champions League
-                38: 0.9,    # Europa League
-                55: 0.8,    # Europa Conference League
-                43: 1.05,   # World Cup
-                50: 1.0,    # Euro
-                72: 0.85,   # Nations League
-                44: 0.8,    # Copa America
-                45: 0.75    # AFC Asian Cup
-            }
-            return league_coeffs.get(comp_id, 0.8)
-        
-        # Calculate opponent strength factor (simplified - based on competition level)
-        def get_opponent_strength_factor(comp_id, season_id):
-            """Calculate opponent strength factor"""
-            base_coeff = get_league_coefficient(comp_id)
-            # Champions League and international competitions have higher opponent strength
-            if comp_id in [37, 43, 50]:  # Champions League, World Cup, Euro
-                return base_coeff * 1.2
-            elif comp_id in [38, 55]:  # Europa competitions
-                return base_coeff * 1.1
-            else:
-                return base_coeff
+        # League strength coefficient per row, looked up once from LEAGUE_COEFFS
+        def league_coefficients():
+            """League coefficient for every row at once (0.8 for unlisted competitions)"""
+            return df_stats["competition_id"].map(LEAGUE_COEFFS).fillna(0.8).to_numpy()
         
         # Calculate performance consistency (lower variance = more consistent)
         def calculate_consistency_factor(series):
@@ -672,308 +755,307 @@ if len(agg) > 0:
             # Lower CV = more consistent = higher factor
             return max(0.7, 1.0 - (cv * 0.3))
         
-        # Calculate pressure performance (performance in high-pressure situations)
-        def calculate_pressure_performance(row):
-            """Calculate how well player performs under pressure"""
-            # Based on performance in Champions League, World Cup, Euro
-            high_pressure_comps = [37, 43, 50]  # Champions League, World Cup, Euro
-            # This is simplified - in reality you'd track performance by competition
-            return 1.0 + (0.1 if row.get('competition_id', 0) in high_pressure_comps else 0.0)
-        
-        # Calculate age factor (younger players get potential boost, older players get experience boost)
-        def calculate_age_factor(age):
-            """Calculate age-based performance factor"""
-            if age <= 21:
-                return 1.1  # Young players get potential boost
-            elif age <= 25:
-                return 1.05  # Peak age
-            elif age <= 30:
-                return 1.0   # Prime age
-            else:
-                return 0.95  # Slight decline for older players
+        # Pressure performance: +10% for Champions League, World Cup and Euro rows
+        # (simplified - in reality you'd track performance by competition)
+        def pressure_factors():
+            """Pressure factor for every row at once"""
+            return np.where(df_stats["competition_id"].isin([37, 43, 50]), 1.1, 1.0)
+        
+        # Age factor (younger players get potential boost, older players decline slightly)
+        def age_factors(age):
+            """Age-based performance factor for an array of ages"""
+            return np.select([age <= 21, age <= 25, age <= 30], [1.1, 1.05, 1.0], default=0.95)
+        
+        def weighted_sum(*terms, factors=()):
+            """Sum (array, weight) terms and apply factors in place, reusing two float32 buffers"""
+            total = np.zeros(len(df_stats), dtype=np.float32)
+            scratch = np.empty_like(total)
+            for values, weight in terms:
+                np.multiply(values, weight, out=scratch)
+                total += scratch
+            for factor in factors:
+                total *= factor
+            return total
+        
+        # One generator for every random draw in the attribute pass
+        rng = np.random.default_rng(RANDOM_SEED)
+        
+        # Add age column (simplified - you'd get this from player data); drawn before
+        # the attributes so every age-dependent factor uses each player's assigned age
+        age = rng.integers(18, 35, len(df_stats))
+        df_stats["age"] = age
+        
+        # Row factors shared by many attributes, computed once
+        league_coef = league_coefficients()
+        age_factor = age_factors(age)
+        pressure_factor = pressure_factors()
+        peak_physical = np.where((age >= 25) & (age <= 30), 1.05, 1.0)  # Peak physical age
+        experienced = np.where(age >= 26, 1.1, 1.0)
+        
+        # Raw stat columns read once as float32 arrays so the formulas below run as plain NumPy
+        # arithmetic instead of index-aligned pandas Series operations, on half the bytes
+        STAT_INPUT_COLS = [
+            "aerial_duels_per90",
+            "aerial_duels_won_per90",
+            "assists_per90",
+            "clean_sheets",
+            "clearances_per90",
+            "dribbles_per90",
+            "dribbles_successful_per90",
+            "goals_conceded_per90",
+            "goals_per90",
+            "interceptions_per90",
+            "key_passes_per90",
+            "minutes_played",
+            "pass_accuracy",
+            "passes_per90",
+            "pressures_per90",
+            "saves_per90",
+            "shots_on_target_per90",
+            "shots_per90",
+            "tackles_per90",
+            "tackles_won_per90",
+            "touches_per90",
+            "xG_per90",
+        ]
+        stat = {c: df_stats[c].to_numpy(dtype=np.float32) for c in STAT_INPUT_COLS}
         
         # Enhanced passing calculation with multiple factors
-        df_stats["passing"] = percentile_to_1_20(
-            (df_stats["passes_per90"] * 0.3 + 
-             df_stats["pass_accuracy"] * 0.25 + 
-             df_stats["key_passes_per90"] * 0.25 +
-             df_stats["assists_per90"] * 0.2) * 
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1) *
-            df_stats.apply(lambda x: calculate_age_factor(x.get('age', 25)), axis=1)
-        )
+        df_stats["passing"] = percentile_to_1_20(weighted_sum(
+            (stat["passes_per90"], 0.3),
+            (stat["pass_accuracy"], 0.25),
+            (stat["key_passes_per90"], 0.25),
+            (stat["assists_per90"], 0.2),
+            factors=(league_coef, age_factor),
+        ))
         attr_pbar.update(1)
         
         # Enhanced shooting with efficiency and pressure factors
-        df_stats["shooting"] = percentile_to_1_20(
-            (df_stats["goals_per90"] * 0.3 + 
-             df_stats["xG_per90"] * 0.25 + 
-             df_stats["shots_on_target_per90"] * 0.25 +
-             (df_stats["goals_per90"] / (df_stats["shots_per90"] + 0.1)) * 0.2) *  # Efficiency factor
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1) *
-            df_stats.apply(lambda x: calculate_pressure_performance(x), axis=1)
-        )
+        df_stats["shooting"] = percentile_to_1_20(weighted_sum(
+            (stat["goals_per90"], 0.3),
+            (stat["xG_per90"], 0.25),
+            (stat["shots_on_target_per90"], 0.25),
+            (stat["goals_per90"] / (stat["shots_per90"] + 0.1), 0.2),  # Efficiency factor
+            factors=(league_coef, pressure_factor),
+        ))
         
         # Enhanced dribbling with success rate and opponent strength
-        df_stats["dribbling"] = percentile_to_1_20(
-            (df_stats["dribbles_per90"] * 0.4 + 
-             df_stats["dribbles_successful_per90"] * 0.4 +
-             (df_stats["dribbles_successful_per90"] / (df_stats["dribbles_per90"] + 0.1)) * 0.2) *  # Success rate
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-        )
+        df_stats["dribbling"] = percentile_to_1_20(weighted_sum(
+            (stat["dribbles_per90"], 0.4),
+            (stat["dribbles_successful_per90"], 0.4),
+            (stat["dribbles_successful_per90"] / (stat["dribbles_per90"] + 0.1), 0.2),  # Success rate
+            factors=(league_coef,),
+        ))
         
         # Enhanced first touch with ball control metrics
-        df_stats["first_touch"] = percentile_to_1_20(
-            (df_stats["dribbles_successful_per90"] * 0.4 + 
-             df_stats["pass_accuracy"] * 0.3 +
-             df_stats["touches_per90"] * 0.3) *  # Ball control factor
-            df_stats.apply(lambda x: calculate_age_factor(x.get('age', 25)), axis=1)
-        )
+        df_stats["first_touch"] = percentile_to_1_20(weighted_sum(
+            (stat["dribbles_successful_per90"], 0.4),
+            (stat["pass_accuracy"], 0.3),
+            (stat["touches_per90"], 0.3),  # Ball control factor
+            factors=(age_factor,),
+        ))
         
         # Enhanced crossing with wide play and delivery accuracy
-        df_stats["crossing"] = percentile_to_1_20(
-            (df_stats["key_passes_per90"] * 0.5 + 
-             df_stats["assists_per90"] * 0.3 +
-             df_stats["pass_accuracy"] * 0.2) *  # Delivery accuracy
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-        )
+        df_stats["crossing"] = percentile_to_1_20(weighted_sum(
+            (stat["key_passes_per90"], 0.5),
+            (stat["assists_per90"], 0.3),
+            (stat["pass_accuracy"], 0.2),  # Delivery accuracy
+            factors=(league_coef,),
+        ))
         
         # Enhanced finishing with clinical efficiency
-        df_stats["finishing"] = percentile_to_1_20(
-            (df_stats["goals_per90"] * 0.4 + 
-             df_stats["shots_on_target_per90"] * 0.3 +
-             (df_stats["goals_per90"] / (df_stats["xG_per90"] + 0.1)) * 0.3) *  # Clinical efficiency
-            df_stats.apply(lambda x: calculate_pressure_performance(x), axis=1)
-        )
+        df_stats["finishing"] = percentile_to_1_20(weighted_sum(
+            (stat["goals_per90"], 0.4),
+            (stat["shots_on_target_per90"], 0.3),
+            (stat["goals_per90"] / (stat["xG_per90"] + 0.1), 0.3),  # Clinical efficiency
+            factors=(pressure_factor,),
+        ))
         
         # Enhanced long shots with range and accuracy
-        df_stats["long_shots"] = percentile_to_1_20(
-            (df_stats["shots_per90"] * 0.4 + 
-             df_stats["xG_per90"] * 0.3 +
-             (df_stats["shots_on_target_per90"] / (df_stats["shots_per90"] + 0.1)) * 0.3) *  # Accuracy from distance
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)
-        )
+        df_stats["long_shots"] = percentile_to_1_20(weighted_sum(
+            (stat["shots_per90"], 0.4),
+            (stat["xG_per90"], 0.3),
+            (stat["shots_on_target_per90"] / (stat["shots_per90"] + 0.1), 0.3),  # Accuracy from distance
+            factors=(league_coef,),
+        ))
         attr_pbar.update(1)
         
         print("Computing enhanced physical attributes...")
         
         # Enhanced pace with speed and intensity factors
-        df_stats["pace"] = percentile_to_1_20(
-            (df_stats["dribbles_per90"] * 0.4 + 
-             df_stats["pressures_per90"] * 0.3 +
-             df_stats["dribbles_successful_per90"] * 0.3) *  # Speed with ball
-            df_stats.apply(lambda x: calculate_age_factor(x.get('age', 25)), axis=1)  # Age affects pace
-        )
+        df_stats["pace"] = percentile_to_1_20(weighted_sum(
+            (stat["dribbles_per90"], 0.4),
+            (stat["pressures_per90"], 0.3),
+            (stat["dribbles_successful_per90"], 0.3),  # Speed with ball
+            factors=(age_factor,),  # Age affects pace
+        ))
         
         # Enhanced acceleration with burst and change of pace
-        df_stats["acceleration"] = percentile_to_1_20(
-            (df_stats["dribbles_successful_per90"] * 0.5 + 
-             df_stats["dribbles_per90"] * 0.3 +
-             df_stats["pressures_per90"] * 0.2) *  # Quick bursts
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) <= 23 else 1.0, axis=1)  # Young players excel
-        )
+        df_stats["acceleration"] = percentile_to_1_20(weighted_sum(
+            (stat["dribbles_successful_per90"], 0.5),
+            (stat["dribbles_per90"], 0.3),
+            (stat["pressures_per90"], 0.2),  # Quick bursts
+            factors=(np.where(age <= 23, 1.1, 1.0),),  # Young players excel
+        ))
         
         # Enhanced stamina with work rate and consistency
-        df_stats["stamina"] = percentile_to_1_20(
-            (df_stats["minutes_played"] / 1000 * 0.4 +  # Playing time
-             df_stats["pressures_per90"] * 0.3 +  # Work rate
-             df_stats["tackles_per90"] * 0.3) *  # Defensive work
-            df_stats.apply(lambda x: 0.9 if x.get('age', 25) > 30 else 1.0, axis=1)  # Age affects stamina
-        )
+        df_stats["stamina"] = percentile_to_1_20(weighted_sum(
+            (stat["minutes_played"], 0.4 / 1000),  # Playing time
+            (stat["pressures_per90"], 0.3),  # Work rate
+            (stat["tackles_per90"], 0.3),  # Defensive work
+            factors=(np.where(age > 30, 0.9, 1.0),),  # Age affects stamina
+        ))
         
         # Enhanced strength with physical duels and aerial ability
-        df_stats["strength"] = percentile_to_1_20(
-            (df_stats["aerial_duels_per90"] * 0.4 + 
-             df_stats["tackles_per90"] * 0.3 +
-             df_stats["aerial_duels_won_per90"] * 0.3) *  # Physical dominance
-            df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)  # Peak physical age
-        )
+        df_stats["strength"] = percentile_to_1_20(weighted_sum(
+            (stat["aerial_duels_per90"], 0.4),
+            (stat["tackles_per90"], 0.3),
+            (stat["aerial_duels_won_per90"], 0.3),  # Physical dominance
+            factors=(peak_physical,),
+        ))
         
         # Enhanced jumping reach with aerial dominance
-        df_stats["jumping_reach"] = percentile_to_1_20(
-            (df_stats["aerial_duels_won_per90"] * 0.6 + 
-             df_stats["aerial_duels_per90"] * 0.4) *  # Aerial success rate
-            df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)  # Peak physical age
-        )
+        df_stats["jumping_reach"] = percentile_to_1_20(weighted_sum(
+            (stat["aerial_duels_won_per90"], 0.6),
+            (stat["aerial_duels_per90"], 0.4),  # Aerial success rate
+            factors=(peak_physical,),
+        ))
         attr_pbar.update(1)
         
         print("Computing enhanced mental attributes...")
         
         # Enhanced positioning with spatial awareness and tactical intelligence
-        df_stats["positioning"] = percentile_to_1_20(
-            (df_stats["interceptions_per90"] * 0.3 + 
-             df_stats["key_passes_per90"] * 0.25 + 
-             df_stats["pressures_per90"] * 0.25 +
-             df_stats["tackles_per90"] * 0.2) *  # Defensive positioning
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 28 else 1.0, axis=1)  # Experience helps
-        )
+        df_stats["positioning"] = percentile_to_1_20(weighted_sum(
+            (stat["interceptions_per90"], 0.3),
+            (stat["key_passes_per90"], 0.25),
+            (stat["pressures_per90"], 0.25),
+            (stat["tackles_per90"], 0.2),  # Defensive positioning
+            factors=(np.where(age >= 28, 1.1, 1.0),),  # Experience helps
+        ))
         
         # Enhanced vision with creativity and passing intelligence
-        df_stats["vision"] = percentile_to_1_20(
-            (df_stats["key_passes_per90"] * 0.4 + 
-             df_stats["assists_per90"] * 0.3 +
-             df_stats["passes_per90"] * 0.3) *  # Passing volume indicates vision
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)  # Higher leagues = better vision
-        )
+        df_stats["vision"] = percentile_to_1_20(weighted_sum(
+            (stat["key_passes_per90"], 0.4),
+            (stat["assists_per90"], 0.3),
+            (stat["passes_per90"], 0.3),  # Passing volume indicates vision
+            factors=(league_coef,),  # Higher leagues = better vision
+        ))
         
         # Enhanced composure with pressure handling and consistency
-        df_stats["composure"] = percentile_to_1_20(
-            (df_stats["pass_accuracy"] * 0.4 + 
-             df_stats["dribbles_successful_per90"] * 0.3 +
-             df_stats["goals_per90"] * 0.3) *  # Goals under pressure
-            df_stats.apply(lambda x: calculate_pressure_performance(x), axis=1)  # Pressure situations
-        )
+        df_stats["composure"] = percentile_to_1_20(weighted_sum(
+            (stat["pass_accuracy"], 0.4),
+            (stat["dribbles_successful_per90"], 0.3),
+            (stat["goals_per90"], 0.3),  # Goals under pressure
+            factors=(pressure_factor,),  # Pressure situations
+        ))
         
         # Enhanced concentration with defensive focus and consistency
-        df_stats["concentration"] = percentile_to_1_20(
-            (df_stats["interceptions_per90"] * 0.4 + 
-             df_stats["tackles_won_per90"] * 0.3 +
-             df_stats["clearances_per90"] * 0.3) *  # Defensive focus
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)  # Experience helps concentration
-        )
+        df_stats["concentration"] = percentile_to_1_20(weighted_sum(
+            (stat["interceptions_per90"], 0.4),
+            (stat["tackles_won_per90"], 0.3),
+            (stat["clearances_per90"], 0.3),  # Defensive focus
+            factors=(experienced,),  # Experience helps concentration
+        ))
         
         # Enhanced decisions with tactical intelligence and efficiency
-        df_stats["decisions"] = percentile_to_1_20(
-            (df_stats["key_passes_per90"] * 0.3 + 
-             df_stats["tackles_won_per90"] * 0.25 + 
-             df_stats["dribbles_successful_per90"] * 0.25 +
-             (df_stats["assists_per90"] + df_stats["goals_per90"]) * 0.2) *  # End product decisions
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 24 else 1.0, axis=1)  # Maturity helps decisions
-        )
+        df_stats["decisions"] = percentile_to_1_20(weighted_sum(
+            (stat["key_passes_per90"], 0.3),
+            (stat["tackles_won_per90"], 0.25),
+            (stat["dribbles_successful_per90"], 0.25),
+            (stat["assists_per90"], 0.2),  # End product decisions
+            (stat["goals_per90"], 0.2),
+            factors=(np.where(age >= 24, 1.1, 1.0),),  # Maturity helps decisions
+        ))
         
         # Enhanced leadership with experience and influence
-        df_stats["leadership"] = percentile_to_1_20(
-            (df_stats["minutes_played"] / 1000 * 0.4 +  # Playing time
-             df_stats["assists_per90"] * 0.3 +  # Creating for others
-             df_stats["goals_per90"] * 0.3) *  # Leading by example
-            df_stats.apply(lambda x: 1.2 if x.get('age', 25) >= 28 else 1.0, axis=1)  # Age brings leadership
-        )
+        df_stats["leadership"] = percentile_to_1_20(weighted_sum(
+            (stat["minutes_played"], 0.4 / 1000),  # Playing time
+            (stat["assists_per90"], 0.3),  # Creating for others
+            (stat["goals_per90"], 0.3),  # Leading by example
+            factors=(np.where(age >= 28, 1.2, 1.0),),  # Age brings leadership
+        ))
         attr_pbar.update(1)
         
         print("Computing enhanced defensive attributes...")
         
         # Enhanced tackling with success rate and physicality
-        df_stats["tackling"] = percentile_to_1_20(
-            (df_stats["tackles_won_per90"] * 0.5 + 
-             df_stats["tackles_per90"] * 0.3 +
-             (df_stats["tackles_won_per90"] / (df_stats["tackles_per90"] + 0.1)) * 0.2) *  # Success rate
-            df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)  # Peak physical age
-        )
+        df_stats["tackling"] = percentile_to_1_20(weighted_sum(
+            (stat["tackles_won_per90"], 0.5),
+            (stat["tackles_per90"], 0.3),
+            (stat["tackles_won_per90"] / (stat["tackles_per90"] + 0.1), 0.2),  # Success rate
+            factors=(peak_physical,),
+        ))
         
         # Enhanced marking with anticipation and defensive intelligence
-        df_stats["marking"] = percentile_to_1_20(
-            (df_stats["interceptions_per90"] * 0.4 + 
-             df_stats["pressures_per90"] * 0.3 +
-             df_stats["tackles_per90"] * 0.3) *  # Defensive activity
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)  # Experience helps marking
-        )
+        df_stats["marking"] = percentile_to_1_20(weighted_sum(
+            (stat["interceptions_per90"], 0.4),
+            (stat["pressures_per90"], 0.3),
+            (stat["tackles_per90"], 0.3),  # Defensive activity
+            factors=(experienced,),  # Experience helps marking
+        ))
         
         # Enhanced heading with aerial dominance and timing
-        df_stats["heading"] = percentile_to_1_20(
-            (df_stats["aerial_duels_won_per90"] * 0.6 + 
-             df_stats["aerial_duels_per90"] * 0.4) *  # Aerial success
-            df_stats.apply(lambda x: 1.05 if 25 <= x.get('age', 25) <= 30 else 1.0, axis=1)  # Peak physical age
-        )
+        df_stats["heading"] = percentile_to_1_20(weighted_sum(
+            (stat["aerial_duels_won_per90"], 0.6),
+            (stat["aerial_duels_per90"], 0.4),  # Aerial success
+            factors=(peak_physical,),
+        ))
         attr_pbar.update(1)
         
         print("Computing enhanced goalkeeping attributes...")
         
         # Enhanced goalkeeping with shot-stopping and command
-        df_stats["goalkeeping"] = percentile_to_1_20(
-            (df_stats["saves_per90"] * 0.4 + 
-             df_stats["clean_sheets"] * 0.3 + 
-             (100 - df_stats["goals_conceded_per90"] * 10) * 0.3) *  # Goals prevented
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)  # Experience helps goalkeeping
-        )
+        df_stats["goalkeeping"] = percentile_to_1_20(weighted_sum(
+            (stat["saves_per90"], 0.4),
+            (stat["clean_sheets"], 0.3),
+            (100 - stat["goals_conceded_per90"] * 10, 0.3),  # Goals prevented
+            factors=(experienced,),  # Experience helps goalkeeping
+        ))
         
         # Enhanced reflexes with shot-stopping ability
-        df_stats["reflexes"] = percentile_to_1_20(
-            df_stats["saves_per90"] * 
-            df_stats.apply(lambda x: 1.05 if x.get('age', 25) <= 28 else 1.0, axis=1)  # Reflexes decline with age
-        )
+        df_stats["reflexes"] = percentile_to_1_20(weighted_sum(
+            (stat["saves_per90"], 1.0),
+            factors=(np.where(age <= 28, 1.05, 1.0),),  # Reflexes decline with age
+        ))
         
         # Enhanced handling with ball control and distribution
-        df_stats["handling"] = percentile_to_1_20(
-            (df_stats["clean_sheets"] * 0.6 + 
-             df_stats["pass_accuracy"] * 0.4) *  # Ball control
-            df_stats.apply(lambda x: 1.1 if x.get('age', 25) >= 26 else 1.0, axis=1)  # Experience helps handling
-        )
+        df_stats["handling"] = percentile_to_1_20(weighted_sum(
+            (stat["clean_sheets"], 0.6),
+            (stat["pass_accuracy"], 0.4),  # Ball control
+            factors=(experienced,),  # Experience helps handling
+        ))
         
         # Enhanced kicking with distribution and accuracy
-        df_stats["kicking"] = percentile_to_1_20(
-            (df_stats["passes_per90"] * 0.5 + 
-             df_stats["pass_accuracy"] * 0.5) *  # Distribution accuracy
-            df_stats.apply(lambda x: get_league_coefficient(x.get('competition_id', 0)), axis=1)  # League quality affects kicking
-        )
+        df_stats["kicking"] = percentile_to_1_20(weighted_sum(
+            (stat["passes_per90"], 0.5),
+            (stat["pass_accuracy"], 0.5),  # Distribution accuracy
+            factors=(league_coef,),  # League quality affects kicking
+        ))
         attr_pbar.update(1)
         
-        # Enhanced position-specific CA calculations with league and age factors
-        def compute_position_CA(row, position_type):
-            # Base weights for each position
-            if position_type == "GK":
-                weights = {"goalkeeping": 0.4, "reflexes": 0.2, "handling": 0.2, "kicking": 0.2}
-            elif position_type == "DEF":
-                weights = {"tackling": 0.25, "marking": 0.25, "heading": 0.2, "positioning": 0.15, "pace": 0.15}
-            elif position_type == "MID":
-                weights = {"passing": 0.25, "vision": 0.2, "positioning": 0.15, "dribbling": 0.15, "tackling": 0.15, "stamina": 0.1}
-            else:  # FWD
-                weights = {"shooting": 0.3, "pace": 0.2, "dribbling": 0.2, "finishing": 0.15, "positioning": 0.15}
-            
-            # Calculate base CA
-            base_ca = sum(row[k] * w for k, w in weights.items())
-            
-            # Apply league coefficient
-            league_coeff = get_league_coefficient(row.get('competition_id', 0))
-            
-            # Apply age factor based on position
-            age = row.get('age', 25)
-            if position_type == "GK":
-                # Goalkeepers peak later and decline slower
-                age_factor = 1.1 if 28 <= age <= 32 else 1.0
-            elif position_type == "DEF":
-                # Defenders peak in late 20s
-                age_factor = 1.05 if 26 <= age <= 30 else 1.0
-            elif position_type == "MID":
-                # Midfielders peak in mid-20s
-                age_factor = 1.05 if 24 <= age <= 28 else 1.0
-            else:  # FWD
-                # Forwards peak earlier
-                age_factor = 1.05 if 22 <= age <= 26 else 1.0
-            
-            # Apply pressure performance factor
-            pressure_factor = calculate_pressure_performance(row)
-            
-            return round(base_ca * league_coeff * age_factor * pressure_factor, 2)
-        
-        # Calculate position-specific CAs
-        df_stats["CA_GK"] = df_stats.apply(lambda x: compute_position_CA(x, "GK"), axis=1)
-        df_stats["CA_DEF"] = df_stats.apply(lambda x: compute_position_CA(x, "DEF"), axis=1)
-        df_stats["CA_MID"] = df_stats.apply(lambda x: compute_position_CA(x, "MID"), axis=1)
-        df_stats["CA_FWD"] = df_stats.apply(lambda x: compute_position_CA(x, "FWD"), axis=1)
-        
-        # Enhanced overall CA with versatility and consistency factors
-        def calculate_versatility_factor(row):
-            """Calculate versatility based on how well player performs in multiple positions"""
-            position_cas = [row["CA_GK"], row["CA_DEF"], row["CA_MID"], row["CA_FWD"]]
-            max_ca = max(position_cas)
-            min_ca = min(position_cas)
-            
-            # Versatility bonus if player can play multiple positions well
-            if max_ca > 0:
-                versatility = 1.0 + (0.1 * (max_ca - min_ca) / max_ca)  # More versatile = higher factor
-                return min(1.2, versatility)  # Cap at 1.2
-            return 1.0
-        
-        def calculate_consistency_factor(row):
-            """Calculate consistency based on performance stability"""
-            # This is simplified - in reality you'd track performance variance over time
-            age = row.get('age', 25)
-            if age >= 26:  # More experienced players are more consistent
-                return 1.05
-            return 1.0
-        
-        # Calculate versatility and consistency factors
-        df_stats["versatility_factor"] = df_stats.apply(calculate_versatility_factor, axis=1)
-        df_stats["consistency_factor"] = df_stats.apply(calculate_consistency_factor, axis=1)
+        # Enhanced position-specific CA calculations with league and age factors:
+        # one (players x attributes) @ (attributes x positions) product for all four positions
+        position_attrs = sorted(set().union(*POSITION_WEIGHTS.values()))
+        weight_matrix = np.array([[POSITION_WEIGHTS[pos].get(a, 0.0) for pos in POSITION_WEIGHTS] for a in position_attrs])
+        base_ca = df_stats[position_attrs].to_numpy(dtype=float) @ weight_matrix
+        
+        # Each position peaks at a different age
+        peak_factor = np.column_stack([
+            np.where((age >= lo) & (age <= hi), factor, 1.0) for lo, hi, factor in POSITION_PEAK_AGES.values()
+        ])
+        position_ca = np.round(base_ca * peak_factor * (league_coef * pressure_factor)[:, None], 2)
+        for j, position_type in enumerate(POSITION_WEIGHTS):
+            df_stats[f"CA_{position_type}"] = position_ca[:, j]
+        
+        # Enhanced overall CA with versatility and consistency factors:
+        # versatility bonus if player can play multiple positions well, capped at 1.2
+        max_ca = position_ca.max(axis=1)
+        min_ca = position_ca.min(axis=1)
+        df_stats["versatility_factor"] = np.where(
+            max_ca > 0, np.minimum(1.2, 1.0 + 0.1 * (max_ca - min_ca) / np.where(max_ca > 0, max_ca, 1)), 1.0
+        )
+        # This is simplified - more experienced players are more consistent
+        df_stats["consistency_factor"] = np.where(age >= 26, 1.05, 1.0)
         
         # Enhanced overall CA with multiple factors
         df_stats["CA"] = (
@@ -985,52 +1067,26 @@ if len(agg) > 0:
             df_stats["consistency_factor"]
         ).round(2)
         
-        # Enhanced PA calculation with multiple factors
-        def compute_PA(ca, age, league_coeff, versatility_factor):
-            """Calculate Potential Ability with enhanced factors"""
-            # Base age-based potential
-            if age <= 20:
-                base_uplift = 6
-                variance = 2
-            elif age <= 24:
-                base_uplift = 4
-                variance = 1.5
-            elif age <= 28:
-                base_uplift = 2
-                variance = 1
-            else:
-                base_uplift = 0
-                variance = 0.5
-            
-            # Apply league coefficient (better leagues = higher potential)
-            league_bonus = (league_coeff - 0.8) * 2  # Scale league difference
-            
-            # Apply versatility bonus (versatile players have higher potential)
-            versatility_bonus = (versatility_factor - 1.0) * 3
-            
-            # Calculate final uplift
-            total_uplift = base_uplift + league_bonus + versatility_bonus + np.random.normal(0, variance)
-            
-            # Ensure PA is at least CA and capped at 20
-            return min(20, max(ca, ca + total_uplift))
-        
-        # Calculate PA with enhanced factors
-        df_stats["PA"] = df_stats.apply(
-            lambda x: compute_PA(
-                x["CA"], 
-                x["age"], 
-                get_league_coefficient(x.get('competition_id', 0)),
-                x["versatility_factor"]
-            ), 
-            axis=1
-        )
+        # Enhanced PA: age-banded uplift plus league and versatility bonuses,
+        # with every player's noise drawn in one call
+        age_bands = [age <= 20, age <= 24, age <= 28]
+        base_uplift = np.select(age_bands, [6, 4, 2], default=0)
+        variance = np.select(age_bands, [2, 1.5, 1], default=0.5)
+        league_bonus = (league_coef - 0.8) * 2  # Better leagues = higher potential
+        versatility_bonus = (df_stats["versatility_factor"].to_numpy() - 1.0) * 3
+        total_uplift = base_uplift + league_bonus + versatility_bonus + rng.normal(0, variance)
+        
+        # Ensure PA is at least CA and capped at 20
+        ca = df_stats["CA"].to_numpy()
+        df_stats["PA"] = np.minimum(20, np.maximum(ca, ca + total_uplift))
         
-        # Add age column (simplified - you'd get this from player data)
-        df_stats["age"] = np.random.randint(18, 35, len(df_stats))
         attr_pbar.update(1)
         
         # Save comprehensive attributes to DB
         print("Saving attributes to database...")
+        # The connection runs in autocommit mode, where to_sql would commit every row on its
+        # own; one explicit transaction covers the drop and the insert (pandas commits it)
+        cur.execute("BEGIN IMMEDIATE")
         cur.execute(f"DROP TABLE IF EXISTS {ATTR_TABLE}")
         attr_pbar.update(1)
         
@@ -1047,11 +1103,22 @@ if len(agg) > 0:
             "CA", "PA", "CA_GK", "CA_DEF", "CA_MID", "CA_FWD"
         ]
         
-        df_save = df_stats[attr_cols].copy()
-        df_save.to_sql(ATTR_TABLE, conn, index=False)
+        # to_sql only reads the frame, so the column selection is written without a defensive copy
+        df_stats[attr_cols].to_sql(ATTR_TABLE, conn, index=False, chunksize=1000)
+        
+        cur.execute("BEGIN IMMEDIATE")
+        # Name lookups for the dashboard search: NOCASE index for prefix LIKE, FTS5 for word-prefix matches
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_player_name ON {ATTR_TABLE}(player_name COLLATE NOCASE)")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_player_name_exact ON {ATTR_TABLE}(player_name)")
+        # Top-N lists on the dashboard order by CA and PA
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_ca ON {ATTR_TABLE}(CA DESC)")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_attr_pa ON {ATTR_TABLE}(PA DESC)")
+        cur.execute("DROP TABLE IF EXISTS player_names_fts")
+        cur.execute("CREATE VIRTUAL TABLE player_names_fts USING fts5(player_name)")
+        cur.execute(f"INSERT INTO player_names_fts (player_name) SELECT player_name FROM {ATTR_TABLE}")
 
         conn.commit()
-        conn.close()
+        close_db()
         print(f"✅ Comprehensive database created at {DB_PATH}")
         print(f"📊 {len(df_stats)} players with detailed attributes")
         print(f"🏆 Multiple competitions and seasons included")
@@ -1059,9 +1126,9 @@ if len(agg) > 0:
     except Exception as e:
         print(f"❌ Error in attribute calculation: {e}")
         conn.rollback()
-        conn.close()
+        close_db()
         print("Database transaction rolled back")
         
 else:
     print("❌ No data to process")
-    conn.close()
+    close_db()
@@ -2,114 +2,140 @@ import sqlite3
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+from functools import lru_cache
 from matplotlib.patches import Circle
 
+DB_PATH = "data/statsbomb.db"
+
+# player_stats columns the explorer reads
+STATS_COLS = (
+    "minutes_played", "matches_played", "goals_per90", "assists_per90",
+    "pass_accuracy", "shots_per90", "tackles_per90"
+)
+
+@lru_cache(maxsize=None)
+def load_tables():
+    """Read player attributes and stats once; every lookup after that is an in-memory index hit"""
+    conn = sqlite3.connect(DB_PATH)
+    attrs = pd.read_sql("SELECT * FROM player_attributes", conn)
+    # One stats row per player: the one with the most minutes; only the columns shown here
+    stats = pd.read_sql(f"""
+    SELECT {', '.join('ps.' + c for c in STATS_COLS)}, p.player_name 
+    FROM player_stats ps 
+    JOIN players p ON ps.player_id = p.player_id
+    ORDER BY ps.minutes_played DESC
+    """, conn).drop_duplicates("player_name")
+    conn.close()
+    
+    # Index by name (keeping the column) for O(1) lookups
+    attrs.index = attrs["player_name"]
+    stats.index = stats["player_name"]
+    attrs.index.name = stats.index.name = None
+    return attrs, stats
+
+# Key attributes for radar charts
+RADAR_ATTRS = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 
+               'positioning', 'tackling', 'goalkeeping', 'vision', 'composure']
+# Spoke angles, with the first repeated to close the polygon
+RADAR_ANGLES = np.linspace(0, 2 * np.pi, len(RADAR_ATTRS), endpoint=False).tolist()
+RADAR_ANGLES += RADAR_ANGLES[:1]
+
+# One polar figure reused by every radar chart (recreated if its window was closed)
+_RADAR_FIG = None
+_RADAR_AX = None
+
+def get_radar_axes(figsize):
+    """Return the shared radar figure and axes, cleared and resized"""
+    global _RADAR_FIG, _RADAR_AX
+    if _RADAR_FIG is None or not plt.fignum_exists(_RADAR_FIG.number):
+        _RADAR_FIG, _RADAR_AX = plt.subplots(figsize=figsize, subplot_kw=dict(projection='polar'))
+    else:
+        _RADAR_AX.cla()
+        _RADAR_FIG.set_size_inches(figsize)
+    return _RADAR_FIG, _RADAR_AX
+
+def get_players(*player_names):
+    """Attribute rows for the given names, in the order asked for"""
+    attrs, _ = load_tables()
+    return attrs.loc[[name for name in player_names if name in attrs.index]]
+
 def search_players(search_term="", limit=20):
     """Search for players by name"""
-    conn = sqlite3.connect("data/statsbomb.db")
-    
-    query = """
-    SELECT pa.player_name, pa.CA, pa.PA, pa.passing, pa.shooting, pa.dribbling, 
-           pa.pace, pa.tackling, pa.goalkeeping, ps.minutes_played, ps.goals_per90, ps.assists_per90
-    FROM player_attributes pa
-    LEFT JOIN player_stats ps ON pa.player_name = ps.player_name
-    WHERE pa.player_name LIKE ?
-    ORDER BY pa.CA DESC
-    LIMIT ?
-    """
-    
-    results = pd.read_sql(query, conn, params=[f"%{search_term}%", limit])
-    conn.close()
+    attrs, stats = load_tables()
     
-    return results
+    matches = attrs[attrs.index.str.contains(search_term, case=False, regex=False)]
+    results = matches.nlargest(limit, "CA")[
+        ["player_name", "CA", "PA", "passing", "shooting", "dribbling", "pace", "tackling", "goalkeeping"]
+    ].join(stats[["minutes_played", "goals_per90", "assists_per90"]])
+    
+    return results.reset_index(drop=True)
 
 def create_player_radar(player_name):
     """Create a radar chart for a specific player"""
-    conn = sqlite3.connect("data/statsbomb.db")
-    
     # Get player attributes
-    query = """
-    SELECT * FROM player_attributes WHERE player_name = ?
-    """
-    player_data = pd.read_sql(query, conn, params=[player_name])
-    conn.close()
+    player_data = get_players(player_name)
     
     if player_data.empty:
         print(f"❌ Player '{player_name}' not found!")
         return None
     
-    # Select key attributes for radar
-    radar_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 
-                   'positioning', 'tackling', 'goalkeeping', 'vision', 'composure']
-    
-    values = [player_data[attr].iloc[0] for attr in radar_attrs]
+    values = player_data[RADAR_ATTRS].iloc[0].tolist()
     
     # Create radar chart
-    angles = np.linspace(0, 2 * np.pi, len(radar_attrs), endpoint=False).tolist()
     values += values[:1]  # Complete the circle
-    angles += angles[:1]
     
-    fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
-    ax.plot(angles, values, 'o-', linewidth=3, label=player_name, color='blue')
-    ax.fill(angles, values, alpha=0.25, color='blue')
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(radar_attrs)
+    fig, ax = get_radar_axes((10, 10))
+    ax.plot(RADAR_ANGLES, values, 'o-', linewidth=3, label=player_name, color='blue')
+    ax.fill(RADAR_ANGLES, values, alpha=0.25, color='blue')
+    ax.set_xticks(RADAR_ANGLES[:-1])
+    ax.set_xticklabels(RADAR_ATTRS)
     ax.set_ylim(0, 20)
     ax.set_title(f'{player_name} - Player Attributes', size=16, fontweight='bold', pad=20)
     ax.grid(True)
     
     # Add value labels
-    for angle, value in zip(angles[:-1], values[:-1]):
+    for angle, value in zip(RADAR_ANGLES[:-1], values[:-1]):
         ax.text(angle, value + 0.5, f'{value:.1f}', ha='center', va='center', 
                 fontweight='bold', fontsize=10)
     
-    plt.tight_layout()
-    plt.savefig(f'data/{player_name.replace(" ", "_")}_radar.png', dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig(f'data/{player_name.replace(" ", "_")}_radar.png', dpi=300, bbox_inches='tight')
     plt.show()
     
     return player_data.iloc[0]
 
 def compare_players(player1_name, player2_name):
     """Compare two players side by side"""
-    conn = sqlite3.connect("data/statsbomb.db")
-    
     # Get both players' data
-    query = """
-    SELECT * FROM player_attributes WHERE player_name IN (?, ?)
-    """
-    players_data = pd.read_sql(query, conn, params=[player1_name, player2_name])
-    conn.close()
+    players_data = get_players(player1_name, player2_name)
     
     if len(players_data) != 2:
         print(f"❌ Could not find both players. Found {len(players_data)} players.")
         return
     
     # Create comparison chart
-    radar_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 
-                   'positioning', 'tackling', 'goalkeeping', 'vision', 'composure']
+    fig, ax = get_radar_axes((12, 10))
     
-    fig, ax = plt.subplots(figsize=(12, 10), subplot_kw=dict(projection='polar'))
+    # Both players' radar values in one selection, one row per player
+    radar_values = players_data[RADAR_ATTRS].to_numpy()
     
     colors = ['blue', 'red']
-    for i, (_, player) in enumerate(players_data.iterrows()):
-        values = [player[attr] for attr in radar_attrs]
+    for i, (name, values) in enumerate(zip(players_data['player_name'], radar_values.tolist())):
         values += values[:1]  # Complete the circle
-        angles = np.linspace(0, 2 * np.pi, len(radar_attrs), endpoint=False).tolist()
-        angles += angles[:1]
         
-        ax.plot(angles, values, 'o-', linewidth=3, label=player['player_name'], color=colors[i])
-        ax.fill(angles, values, alpha=0.2, color=colors[i])
+        ax.plot(RADAR_ANGLES, values, 'o-', linewidth=3, label=name, color=colors[i])
+        ax.fill(RADAR_ANGLES, values, alpha=0.2, color=colors[i])
     
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(radar_attrs)
+    ax.set_xticks(RADAR_ANGLES[:-1])
+    ax.set_xticklabels(RADAR_ATTRS)
     ax.set_ylim(0, 20)
     ax.set_title(f'{player1_name} vs {player2_name} - Player Comparison', 
                 size=16, fontweight='bold', pad=20)
     ax.grid(True)
     ax.legend(loc='upper right', bbox_to_anchor=(1.3, 1.0))
     
-    plt.tight_layout()
-    plt.savefig(f'data/{player1_name.replace(" ", "_")}_vs_{player2_name.replace(" ", "_")}_comparison.png', 
+    fig.tight_layout()
+    fig.savefig(f'data/{player1_name.replace(" ", "_")}_vs_{player2_name.replace(" ", "_")}_comparison.png', 
                 dpi=300, bbox_inches='tight')
     plt.show()
     
@@ -119,32 +145,16 @@ def compare_players(player1_name, player2_name):
     print(f"{'Attribute':<15} {player1_name[:20]:<20} {player2_name[:20]:<20} {'Winner':<10}")
     print("-"*80)
     
-    for attr in radar_attrs:
-        val1 = players_data.iloc[0][attr]
-        val2 = players_data.iloc[1][attr]
+    for attr, val1, val2 in zip(RADAR_ATTRS, *radar_values):
         winner = player1_name if val1 > val2 else player2_name if val2 > val1 else "Tie"
         print(f"{attr.capitalize():<15} {val1:<20.1f} {val2:<20.1f} {winner:<10}")
 
 def show_player_details(player_name):
     """Show detailed information about a player"""
-    conn = sqlite3.connect("data/statsbomb.db")
-    
-    # Get player attributes
-    attr_query = """
-    SELECT * FROM player_attributes WHERE player_name = ?
-    """
-    player_attrs = pd.read_sql(attr_query, conn, params=[player_name])
-    
-    # Get player stats
-    stats_query = """
-    SELECT ps.*, p.player_name 
-    FROM player_stats ps 
-    JOIN players p ON ps.player_id = p.player_id
-    WHERE p.player_name = ?
-    """
-    player_stats = pd.read_sql(stats_query, conn, params=[player_name])
-    
-    conn.close()
+    # Get player attributes and stats
+    _, stats = load_tables()
+    player_attrs = get_players(player_name)
+    player_stats = stats.loc[[player_name]] if player_name in stats.index else stats.iloc[:0]
     
     if player_attrs.empty:
         print(f"❌ Player '{player_name}' not found!")
@@ -1,5 +1,13 @@
 import sqlite3
+import atexit
+import sys
+from functools import lru_cache
 import pandas as pd
+import matplotlib
+# Batch runs only save PNGs, so use the non-GUI Agg backend unless --interactive is passed
+INTERACTIVE = "--interactive" in sys.argv
+if not INTERACTIVE:
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
@@ -8,9 +16,47 @@ import numpy as np
 plt.style.use('default')
 sns.set_palette("Set2")
 
-def quick_database_overview():
-    """Quick overview of the database contents"""
-    conn = sqlite3.connect("data/statsbomb.db")
+# Database connection
+DB_PATH = "data/statsbomb.db"
+
+@lru_cache(maxsize=1)
+def get_conn():
+    """Open one shared read-only connection for every query in this script"""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    # Per-connection settings; journal_mode=WAL is set by the pipeline
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    atexit.register(conn.close)
+    return conn
+
+def finish_figure():
+    """Show the current figure in --interactive runs; otherwise just free it after saving"""
+    if INTERACTIVE:
+        plt.show()
+    else:
+        plt.close()
+
+def table_row_counts(cursor, tables, exact=False):
+    """(row count, is_estimate) per table: sqlite_stat1 estimates where present, else exact COUNT(*)"""
+    # ANALYZE / PRAGMA optimize store each table's row count as the first number of its stat
+    estimates = {}
+    if not exact and "sqlite_stat1" in tables:
+        for tbl, stat in cursor.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall():
+            if tbl in tables and stat:
+                estimates.setdefault(tbl, int(stat.split()[0]))
+    
+    # Every table without statistics is counted exactly, in a single round trip
+    missing = [t for t in tables if t not in estimates]
+    counts = {}
+    if missing:
+        query = " UNION ALL ".join(f"SELECT '{t}', COUNT(*) FROM \"{t}\"" for t in missing)
+        counts = dict(cursor.execute(query).fetchall())
+    return {t: (estimates[t], True) if t in estimates else (counts[t], False) for t in tables}
+
+def quick_database_overview(exact=False):
+    """Quick overview of the database contents (sqlite_stat1 row estimates unless exact=True)"""
+    conn = get_conn()
     
     print("🔍 QUICK DATABASE OVERVIEW")
     print("="*50)
@@ -18,32 +64,34 @@ def quick_database_overview():
     # Check what tables exist
     cursor = conn.cursor()
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = cursor.fetchall()
-    print(f"📊 Tables in database: {[table[0] for table in tables]}")
+    tables = [row[0] for row in cursor.fetchall()]
+    print(f"📊 Tables in database: {tables}")
+    if not tables:
+        return
     
     # Check player counts
-    for table in tables:
-        table_name = table[0]
-        count = pd.read_sql(f"SELECT COUNT(*) as count FROM {table_name}", conn)['count'].iloc[0]
-        print(f"   • {table_name}: {count:,} records")
+    for table_name, (count, is_estimate) in table_row_counts(cursor, tables, exact).items():
+        print(f"   • {table_name}: {'~' if is_estimate else ''}{count:,} records")
     
-    # Sample data from each table
+    # Sample data from each table, read straight off the cursor
     print(f"\n📋 SAMPLE DATA:")
-    for table in tables:
-        table_name = table[0]
-        sample = pd.read_sql(f"SELECT * FROM {table_name} LIMIT 3", conn)
+    for table_name in tables:
+        cursor.execute(f'SELECT * FROM "{table_name}" LIMIT 3')
+        sample = pd.DataFrame(cursor.fetchall(), columns=[col[0] for col in cursor.description])
         print(f"\n{table_name.upper()} (first 3 rows):")
         print(sample.to_string(index=False))
-    
-    conn.close()
 
 def plot_simple_attributes():
     """Simple attribute visualization"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
+    
+    pos_cols = ['CA_GK', 'CA_DEF', 'CA_MID', 'CA_FWD']
+    tech_attrs = ['passing', 'shooting', 'dribbling', 'first_touch', 'crossing']
+    phys_attrs = ['pace', 'acceleration', 'stamina', 'strength', 'jumping_reach']
+    mean_cols = pos_cols + tech_attrs + phys_attrs
     
-    # Load attributes
-    df = pd.read_sql("SELECT * FROM player_attributes ORDER BY CA DESC LIMIT 50", conn)
-    conn.close()
+    # Load CA/PA for the scatter; only these two columns of the top 50 come back as rows
+    df = pd.read_sql("SELECT CA, PA FROM player_attributes ORDER BY CA DESC LIMIT 50", conn)
     
     if df.empty:
         print("❌ No player attributes found!")
@@ -51,6 +99,12 @@ def plot_simple_attributes():
     
     print(f"📊 Analyzing top {len(df)} players...")
     
+    # Every bar chart's averages in one aggregate query over the same top 50
+    means = dict(zip(mean_cols, conn.execute(f"""
+        SELECT {', '.join(f'AVG({c})' for c in mean_cols)}
+        FROM (SELECT {', '.join(mean_cols)} FROM player_attributes ORDER BY CA DESC LIMIT 50)
+    """).fetchone()))
+    
     # Create subplots
     fig, axes = plt.subplots(2, 2, figsize=(15, 12))
     fig.suptitle('Top 50 Players - Attribute Analysis', fontsize=16, fontweight='bold')
@@ -67,8 +121,7 @@ def plot_simple_attributes():
     axes[0,0].plot([0, max_val], [0, max_val], 'r--', alpha=0.5)
     
     # 2. Position-specific CA comparison
-    pos_cols = ['CA_GK', 'CA_DEF', 'CA_MID', 'CA_FWD']
-    pos_means = [df[col].mean() for col in pos_cols]
+    pos_means = [means[col] for col in pos_cols]
     pos_labels = ['GK', 'DEF', 'MID', 'FWD']
     
     bars = axes[0,1].bar(pos_labels, pos_means, color=['gold', 'lightblue', 'lightgreen', 'orange'])
@@ -82,8 +135,7 @@ def plot_simple_attributes():
                       f'{mean:.1f}', ha='center', va='bottom', fontweight='bold')
     
     # 3. Top technical attributes
-    tech_attrs = ['passing', 'shooting', 'dribbling', 'first_touch', 'crossing']
-    tech_means = [df[attr].mean() for attr in tech_attrs]
+    tech_means = [means[attr] for attr in tech_attrs]
     
     bars = axes[1,0].bar(tech_attrs, tech_means, color='skyblue')
     axes[1,0].set_ylabel('Average Rating')
@@ -97,8 +149,7 @@ def plot_simple_attributes():
                       f'{mean:.1f}', ha='center', va='bottom', fontweight='bold')
     
     # 4. Physical attributes
-    phys_attrs = ['pace', 'acceleration', 'stamina', 'strength', 'jumping_reach']
-    phys_means = [df[attr].mean() for attr in phys_attrs]
+    phys_means = [means[attr] for attr in phys_attrs]
     
     bars = axes[1,1].bar(phys_attrs, phys_means, color='lightcoral')
     axes[1,1].set_ylabel('Average Rating')
@@ -112,66 +163,64 @@ def plot_simple_attributes():
                       f'{mean:.1f}', ha='center', va='bottom', fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig('data/quick_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('data/quick_analysis.png', dpi=300)
+    finish_figure()
 
 def show_top_players(n=10):
     """Show top N players by different metrics"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
     
-    # Get top players by CA
-    top_ca = pd.read_sql(f"""
+    # Get top players by CA; print-only tables are read as plain tuples, no DataFrame
+    top_ca = conn.execute("""
         SELECT player_name, CA, PA, passing, shooting, dribbling, pace, tackling
         FROM player_attributes 
         ORDER BY CA DESC 
-        LIMIT {n}
-    """, conn)
+        LIMIT ?
+    """, (n,)).fetchall()
     
     print(f"\n🏆 TOP {n} PLAYERS BY CURRENT ABILITY (CA):")
     print("="*80)
     print(f"{'Rank':<4} {'Player Name':<25} {'CA':<6} {'PA':<6} {'Pass':<6} {'Shoot':<6} {'Drib':<6} {'Pace':<6} {'Tack':<6}")
     print("-"*80)
     
-    for i, (_, player) in enumerate(top_ca.iterrows(), 1):
-        print(f"{i:<4} {player['player_name'][:24]:<25} {player['CA']:<6.1f} {player['PA']:<6.1f} "
-              f"{player['passing']:<6.1f} {player['shooting']:<6.1f} {player['dribbling']:<6.1f} "
-              f"{player['pace']:<6.1f} {player['tackling']:<6.1f}")
+    # One format template per table; rows come straight from the cursor in SELECT order
+    row_fmt = "{:<4} {:<25.24} {:<6.1f} {:<6.1f} {:<6.1f} {:<6.1f} {:<6.1f} {:<6.1f} {:<6.1f}"
+    for i, row in enumerate(top_ca, 1):
+        print(row_fmt.format(i, *row))
     
     # Get top players by PA
-    top_pa = pd.read_sql(f"""
+    top_pa = conn.execute("""
         SELECT player_name, CA, PA
         FROM player_attributes 
         ORDER BY PA DESC 
-        LIMIT {n}
-    """, conn)
+        LIMIT ?
+    """, (n,)).fetchall()
     
     print(f"\n🚀 TOP {n} PLAYERS BY POTENTIAL ABILITY (PA):")
     print("="*60)
     print(f"{'Rank':<4} {'Player Name':<30} {'CA':<6} {'PA':<6}")
     print("-"*60)
     
-    for i, (_, player) in enumerate(top_pa.iterrows(), 1):
-        print(f"{i:<4} {player['player_name'][:29]:<30} {player['CA']:<6.1f} {player['PA']:<6.1f}")
-    
-    conn.close()
+    row_fmt = "{:<4} {:<30.29} {:<6.1f} {:<6.1f}"
+    for i, row in enumerate(top_pa, 1):
+        print(row_fmt.format(i, *row))
 
 def analyze_performance_stats():
     """Analyze performance statistics"""
-    conn = sqlite3.connect("data/statsbomb.db")
+    conn = get_conn()
     
     # Get performance stats
-    stats = pd.read_sql("""
-        SELECT ps.*, p.player_name 
+    stats = conn.execute("""
+        SELECT p.player_name, ps.goals_per90, ps.assists_per90, COALESCE(ps.pass_accuracy, 0), ps.minutes_played
         FROM player_stats ps 
         JOIN players p ON ps.player_id = p.player_id
         WHERE ps.minutes_played >= 500
         ORDER BY ps.goals_per90 DESC
         LIMIT 20
-    """, conn)
+    """).fetchall()
     
-    if stats.empty:
+    if not stats:
         print("❌ No performance stats found!")
-        conn.close()
         return
     
     print(f"\n⚽ TOP 20 GOAL SCORERS (per 90 minutes):")
@@ -179,30 +228,28 @@ def analyze_performance_stats():
     print(f"{'Rank':<4} {'Player Name':<25} {'Goals/90':<8} {'Assists/90':<10} {'Pass%':<6} {'Minutes':<8}")
     print("-"*90)
     
-    for i, (_, player) in enumerate(stats.iterrows(), 1):
-        print(f"{i:<4} {player['player_name'][:24]:<25} {player['goals_per90']:<8.2f} "
-              f"{player['assists_per90']:<10.2f} {player['pass_accuracy']:<6.1f} {player['minutes_played']:<8}")
+    row_fmt = "{:<4} {:<25.24} {:<8.2f} {:<10.2f} {:<6.1f} {:<8}"
+    for i, row in enumerate(stats, 1):
+        print(row_fmt.format(i, *row))
     
     # Top assist leaders
-    assist_stats = pd.read_sql("""
-        SELECT ps.*, p.player_name 
+    assist_stats = conn.execute("""
+        SELECT p.player_name, ps.assists_per90, ps.key_passes_per90, ps.minutes_played
         FROM player_stats ps 
         JOIN players p ON ps.player_id = p.player_id
         WHERE ps.minutes_played >= 500
         ORDER BY ps.assists_per90 DESC
         LIMIT 10
-    """, conn)
+    """).fetchall()
     
     print(f"\n🎯 TOP 10 ASSIST LEADERS (per 90 minutes):")
     print("="*70)
     print(f"{'Rank':<4} {'Player Name':<25} {'Assists/90':<10} {'Key Passes/90':<12} {'Minutes':<8}")
     print("-"*70)
     
-    for i, (_, player) in enumerate(assist_stats.iterrows(), 1):
-        print(f"{i:<4} {player['player_name'][:24]:<25} {player['assists_per90']:<10.2f} "
-              f"{player['key_passes_per90']:<12.2f} {player['minutes_played']:<8}")
-    
-    conn.close()
+    row_fmt = "{:<4} {:<25.24} {:<10.2f} {:<12.2f} {:<8}"
+    for i, row in enumerate(assist_stats, 1):
+        print(row_fmt.format(i, *row))
 
 def main():
     """Main function for quick analysis"""
@@ -210,8 +257,8 @@ def main():
     print("="*50)
     
     try:
-        # Quick database overview
-        quick_database_overview()
+        # Quick database overview (pass --exact to COUNT(*) tables that have statistics too)
+        quick_database_overview(exact="--exact" in sys.argv)
         
         # Show top players
         show_top_players(10)
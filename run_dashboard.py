@@ -4,6 +4,7 @@ Football Scout Dashboard Launcher
 Run this script to start the Streamlit dashboard
 """
 
+import importlib.util
 import subprocess
 import sys
 import os
@@ -11,25 +12,18 @@ import time
 
 def check_dependencies():
     """Check if required packages are installed"""
-    required_packages = ['streamlit', 'pandas', 'numpy', 'plotly', 'sqlite3']
-    missing_packages = []
-    
-    for package in required_packages:
-        try:
-            if package == 'sqlite3':
-                import sqlite3
-            else:
-                __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    # Presence check only: find_spec locates a package without importing it
+    # (sqlite3 is in the standard library, so it is always there)
+    required_packages = ['streamlit', 'pandas', 'numpy', 'plotly']
+    missing_packages = [p for p in required_packages if importlib.util.find_spec(p) is None]
     
     if missing_packages:
         print(f"❌ Missing required packages: {', '.join(missing_packages)}")
-        print("📦 Installing missing packages...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install"] + missing_packages)
-        print("✅ All packages installed successfully!")
+        print(f"📦 Install them with: {sys.executable} -m pip install {' '.join(missing_packages)}")
+        return False
     
-    return len(missing_packages) == 0
+    print("✅ All required packages found!")
+    return True
 
 def check_database():
     """Check if database exists"""
@@ -49,7 +43,8 @@ def main():
     
     # Check dependencies
     print("🔍 Checking dependencies...")
-    check_dependencies()
+    if not check_dependencies():
+        return
     
     # Check database
     print("🗄️ Checking database...")
@@ -1,5 +1,15 @@
 import sqlite3
+import atexit
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import pandas as pd
+import matplotlib
+# Batch runs only save PNGs, so use the non-GUI Agg backend unless --interactive is passed
+INTERACTIVE = "--interactive" in sys.argv
+if not INTERACTIVE:
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
@@ -13,10 +23,39 @@ sns.set_palette("husl")
 
 # Database connection
 DB_PATH = "data/statsbomb.db"
+# Parquet copies of load_data's frames, rebuilt whenever the database changes
+CACHE_DIR = "data/visualize_cache"
+
+@lru_cache(maxsize=1)
+def get_conn():
+    """Open one shared read-only connection for every query in this script"""
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    # Per-connection settings; journal_mode=WAL is set by the pipeline
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    conn.execute("PRAGMA temp_store=MEMORY")
+    atexit.register(conn.close)
+    return conn
+
+def finish_figure():
+    """Show the current figure in --interactive runs; otherwise just free it after saving"""
+    if INTERACTIVE:
+        plt.show()
+    else:
+        plt.close()
+
+def data_cache_paths():
+    """Parquet cache files for load_data, keyed on when the database (or its WAL) last changed"""
+    key = max(os.stat(p).st_mtime_ns for p in (DB_PATH, DB_PATH + "-wal") if os.path.exists(p))
+    return {name: os.path.join(CACHE_DIR, f"{name}_{key}.parquet") for name in ("attributes", "stats")}
 
 def load_data():
     """Load player attributes and stats from database"""
-    conn = sqlite3.connect(DB_PATH)
+    cache_paths = data_cache_paths()
+    if all(os.path.exists(p) for p in cache_paths.values()):
+        return pd.read_parquet(cache_paths["attributes"]), pd.read_parquet(cache_paths["stats"])
+    
+    conn = get_conn()
     
     # Load player attributes
     attributes_df = pd.read_sql("""
@@ -33,10 +72,27 @@ def load_data():
         ORDER BY ps.minutes_played DESC
     """, conn)
     
-    conn.close()
+    # Replace any stale cache; write under a temporary name so an interrupted run never leaves a truncated file
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for name in os.listdir(CACHE_DIR):
+        os.remove(os.path.join(CACHE_DIR, name))
+    for df, path in ((attributes_df, cache_paths["attributes"]), (stats_df, cache_paths["stats"])):
+        df.to_parquet(path + ".tmp", index=False, compression="zstd")
+        os.replace(path + ".tmp", path)
     
     return attributes_df, stats_df
 
+# Shared histogram bins on the 1-20 rating scale
+RATING_EDGES = np.linspace(1, 20, 21)
+
+def plot_binned_histograms(ax, df, attrs):
+    """Bin every attribute with np.histogram on the shared edges and draw them as steps"""
+    values = df[attrs].to_numpy(dtype=np.float32)
+    for i, attr in enumerate(attrs):
+        col = values[:, i]
+        counts, _ = np.histogram(col[~np.isnan(col)], bins=RATING_EDGES)
+        ax.stairs(counts, RATING_EDGES, label=attr, alpha=0.7)
+
 def plot_attribute_distributions(attributes_df):
     """Plot distributions of all attributes"""
     print("📊 Creating attribute distribution plots...")
@@ -56,8 +112,7 @@ def plot_attribute_distributions(attributes_df):
     fig.suptitle('Player Attribute Distributions', fontsize=20, fontweight='bold')
     
     # Technical attributes
-    axes[0,0].hist([attributes_df[attr].dropna() for attr in tech_attrs], 
-                   bins=20, alpha=0.7, label=tech_attrs)
+    plot_binned_histograms(axes[0,0], attributes_df, tech_attrs)
     axes[0,0].set_title('Technical Attributes', fontsize=14, fontweight='bold')
     axes[0,0].set_xlabel('Attribute Rating (1-20)')
     axes[0,0].set_ylabel('Number of Players')
@@ -65,8 +120,7 @@ def plot_attribute_distributions(attributes_df):
     axes[0,0].grid(True, alpha=0.3)
     
     # Physical attributes
-    axes[0,1].hist([attributes_df[attr].dropna() for attr in phys_attrs], 
-                  bins=20, alpha=0.7, label=phys_attrs)
+    plot_binned_histograms(axes[0,1], attributes_df, phys_attrs)
     axes[0,1].set_title('Physical Attributes', fontsize=14, fontweight='bold')
     axes[0,1].set_xlabel('Attribute Rating (1-20)')
     axes[0,1].set_ylabel('Number of Players')
@@ -74,8 +128,7 @@ def plot_attribute_distributions(attributes_df):
     axes[0,1].grid(True, alpha=0.3)
     
     # Mental attributes
-    axes[1,0].hist([attributes_df[attr].dropna() for attr in mental_attrs], 
-                  bins=20, alpha=0.7, label=mental_attrs)
+    plot_binned_histograms(axes[1,0], attributes_df, mental_attrs)
     axes[1,0].set_title('Mental Attributes', fontsize=14, fontweight='bold')
     axes[1,0].set_xlabel('Attribute Rating (1-20)')
     axes[1,0].set_ylabel('Number of Players')
@@ -84,17 +137,25 @@ def plot_attribute_distributions(attributes_df):
     
     # Defensive + Goalkeeping attributes
     all_def_gk = def_attrs + gk_attrs
-    axes[1,1].hist([attributes_df[attr].dropna() for attr in all_def_gk], 
-                  bins=20, alpha=0.7, label=all_def_gk)
+    plot_binned_histograms(axes[1,1], attributes_df, all_def_gk)
     axes[1,1].set_title('Defensive & Goalkeeping Attributes', fontsize=14, fontweight='bold')
     axes[1,1].set_xlabel('Attribute Rating (1-20)')
     axes[1,1].set_ylabel('Number of Players')
     axes[1,1].legend(bbox_to_anchor=(1.05, 1), loc='upper left')
     axes[1,1].grid(True, alpha=0.3)
     
+    # The legends sit outside the axes, so this figure keeps the tight bbox pass on save
     plt.tight_layout()
     plt.savefig('data/attribute_distributions.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    finish_figure()
+
+def top_rows(df, column, n):
+    """Top n rows by column, highest first: O(N) argpartition, then sort only the n picked"""
+    values = df[column].to_numpy()
+    if n >= len(values):
+        return df.iloc[np.argsort(-values, kind='stable')]
+    idx = np.argpartition(-values, n)[:n]
+    return df.iloc[idx[np.argsort(-values[idx], kind='stable')]]
 
 def plot_top_players(attributes_df, top_n=20):
     """Plot top players by different metrics"""
@@ -104,7 +165,7 @@ def plot_top_players(attributes_df, top_n=20):
     fig.suptitle(f'Top {top_n} Players Analysis', fontsize=20, fontweight='bold')
     
     # Top players by CA
-    top_ca = attributes_df.nlargest(top_n, 'CA')
+    top_ca = top_rows(attributes_df, 'CA', top_n)
     axes[0,0].barh(range(len(top_ca)), top_ca['CA'], color='skyblue')
     axes[0,0].set_yticks(range(len(top_ca)))
     axes[0,0].set_yticklabels([f"{name[:15]}..." if len(name) > 15 else name 
@@ -114,7 +175,7 @@ def plot_top_players(attributes_df, top_n=20):
     axes[0,0].grid(True, alpha=0.3)
     
     # Top players by PA
-    top_pa = attributes_df.nlargest(top_n, 'PA')
+    top_pa = top_rows(attributes_df, 'PA', top_n)
     axes[0,1].barh(range(len(top_pa)), top_pa['PA'], color='lightcoral')
     axes[0,1].set_yticks(range(len(top_pa)))
     axes[0,1].set_yticklabels([f"{name[:15]}..." if len(name) > 15 else name 
@@ -125,7 +186,7 @@ def plot_top_players(attributes_df, top_n=20):
     
     # Position-specific CA comparison
     pos_ca_cols = ['CA_GK', 'CA_DEF', 'CA_MID', 'CA_FWD']
-    pos_means = [attributes_df[col].mean() for col in pos_ca_cols]
+    pos_means = attributes_df[pos_ca_cols].mean().to_numpy()
     pos_labels = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
     
     axes[1,0].bar(pos_labels, pos_means, color=['gold', 'lightblue', 'lightgreen', 'orange'])
@@ -134,7 +195,10 @@ def plot_top_players(attributes_df, top_n=20):
     axes[1,0].grid(True, alpha=0.3)
     
     # CA vs PA scatter
-    axes[1,1].scatter(attributes_df['CA'], attributes_df['PA'], alpha=0.6, s=30)
+    # Density of every player on a hex grid: draw cost grows with the bins, not the player count
+    hb = axes[1,1].hexbin(attributes_df['CA'].to_numpy(), attributes_df['PA'].to_numpy(),
+                          gridsize=60, cmap='viridis', mincnt=1)
+    fig.colorbar(hb, ax=axes[1,1], label='Players')
     axes[1,1].set_xlabel('Current Ability (CA)')
     axes[1,1].set_ylabel('Potential Ability (PA)')
     axes[1,1].set_title('CA vs PA Relationship')
@@ -146,8 +210,15 @@ def plot_top_players(attributes_df, top_n=20):
     axes[1,1].legend()
     
     plt.tight_layout()
-    plt.savefig('data/top_players_analysis.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('data/top_players_analysis.png', dpi=300)
+    finish_figure()
+
+# Key attributes for radar charts
+RADAR_ATTRS = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 'positioning', 
+               'tackling', 'goalkeeping']
+# Spoke angles, with the first repeated to close the polygon
+RADAR_ANGLES = np.linspace(0, 2 * np.pi, len(RADAR_ATTRS), endpoint=False).tolist()
+RADAR_ANGLES += RADAR_ANGLES[:1]
 
 def plot_player_radar(player_name, attributes_df):
     """Create a radar chart for a specific player"""
@@ -158,33 +229,27 @@ def plot_player_radar(player_name, attributes_df):
         print(f"Player '{player_name}' not found in database")
         return
     
-    # Select key attributes for radar chart
-    radar_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'stamina', 'positioning', 
-                   'tackling', 'goalkeeping']
-    
-    values = [player_data[attr].iloc[0] for attr in radar_attrs]
+    values = player_data[RADAR_ATTRS].iloc[0].tolist()
     
     # Create radar chart
-    angles = np.linspace(0, 2 * np.pi, len(radar_attrs), endpoint=False).tolist()
     values += values[:1]  # Complete the circle
-    angles += angles[:1]
     
     fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
-    ax.plot(angles, values, 'o-', linewidth=2, label=player_name)
-    ax.fill(angles, values, alpha=0.25)
-    ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(radar_attrs)
+    ax.plot(RADAR_ANGLES, values, 'o-', linewidth=2, label=player_name)
+    ax.fill(RADAR_ANGLES, values, alpha=0.25)
+    ax.set_xticks(RADAR_ANGLES[:-1])
+    ax.set_xticklabels(RADAR_ATTRS)
     ax.set_ylim(0, 20)
     ax.set_title(f'{player_name} - Attribute Radar Chart', size=16, fontweight='bold', pad=20)
     ax.grid(True)
     
     # Add value labels
-    for angle, value in zip(angles[:-1], values[:-1]):
+    for angle, value in zip(RADAR_ANGLES[:-1], values[:-1]):
         ax.text(angle, value + 0.5, f'{value:.1f}', ha='center', va='center', fontweight='bold')
     
     plt.tight_layout()
-    plt.savefig(f'data/{player_name.replace(" ", "_")}_radar.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig(f'data/{player_name.replace(" ", "_")}_radar.png', dpi=300)
+    finish_figure()
 
 def plot_attribute_correlations(attributes_df):
     """Plot correlation matrix of attributes"""
@@ -192,16 +257,27 @@ def plot_attribute_correlations(attributes_df):
     
     # Select numeric attributes for correlation
     numeric_attrs = attributes_df.select_dtypes(include=[np.number]).columns
-    corr_matrix = attributes_df[numeric_attrs].corr()
+    
+    # Pearson correlation as one float32 BLAS product: centre and unit-normalise each column,
+    # then X.T @ X; missing ratings (if any) take the column mean
+    values = attributes_df[numeric_attrs].to_numpy(dtype=np.float32)
+    values = np.where(np.isnan(values), np.nanmean(values, axis=0), values)
+    values -= values.mean(axis=0)
+    values /= np.linalg.norm(values, axis=0)
+    corr_matrix = pd.DataFrame(values.T @ values, index=numeric_attrs, columns=numeric_attrs)
     
     plt.figure(figsize=(16, 14))
     mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
-    sns.heatmap(corr_matrix, mask=mask, annot=True, cmap='coolwarm', center=0,
-                square=True, linewidths=0.5, cbar_kws={"shrink": 0.8}, fmt='.2f')
+    # Cell labels formatted in one vectorised pass, blank above the diagonal
+    labels = np.where(mask, "", np.char.mod('%.2f', corr_matrix.to_numpy()))
+    ax = sns.heatmap(corr_matrix, mask=mask, annot=labels, cmap='coolwarm', center=0,
+                     square=True, linewidths=0.5, cbar_kws={"shrink": 0.8}, fmt='')
+    # Rasterize the colour grid only; the annotations stay vector text
+    ax.collections[0].set_rasterized(True)
     plt.title('Attribute Correlation Matrix', fontsize=16, fontweight='bold')
     plt.tight_layout()
-    plt.savefig('data/attribute_correlations.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('data/attribute_correlations.png', dpi=300)
+    finish_figure()
 
 def plot_performance_stats(stats_df):
     """Plot performance statistics"""
@@ -211,7 +287,9 @@ def plot_performance_stats(stats_df):
     fig.suptitle('Player Performance Statistics', fontsize=20, fontweight='bold')
     
     # Goals per 90 vs xG per 90
-    axes[0,0].scatter(stats_df['xG_per90'], stats_df['goals_per90'], alpha=0.6, s=30)
+    # Uniform markers drawn as one marker-only line (same look as scatter s=30, far cheaper
+    # to render); rasterized keeps vector exports small
+    axes[0,0].plot(stats_df['xG_per90'], stats_df['goals_per90'], 'o', ms=5.5, alpha=0.6, rasterized=True)
     axes[0,0].set_xlabel('Expected Goals per 90 (xG)')
     axes[0,0].set_ylabel('Goals per 90')
     axes[0,0].set_title('Goals vs xG per 90')
@@ -230,7 +308,7 @@ def plot_performance_stats(stats_df):
     axes[0,1].grid(True, alpha=0.3)
     
     # Minutes played vs matches played
-    axes[1,0].scatter(stats_df['matches_played'], stats_df['minutes_played'], alpha=0.6, s=30)
+    axes[1,0].plot(stats_df['matches_played'], stats_df['minutes_played'], 'o', ms=5.5, alpha=0.6, rasterized=True)
     axes[1,0].set_xlabel('Matches Played')
     axes[1,0].set_ylabel('Minutes Played')
     axes[1,0].set_title('Minutes vs Matches Played')
@@ -252,8 +330,8 @@ def plot_performance_stats(stats_df):
     axes[1,1].grid(True, alpha=0.3)
     
     plt.tight_layout()
-    plt.savefig('data/performance_stats.png', dpi=300, bbox_inches='tight')
-    plt.show()
+    plt.savefig('data/performance_stats.png', dpi=300)
+    finish_figure()
 
 def create_summary_report(attributes_df, stats_df):
     """Create a summary report of the database"""
@@ -269,29 +347,28 @@ def create_summary_report(attributes_df, stats_df):
     print(f"   • Players with 500+ minutes: {len(stats_df):,}")
     
     print(f"\n⭐ TOP PLAYERS BY CA:")
-    top_5_ca = attributes_df.nlargest(5, 'CA')[['player_name', 'CA', 'PA']]
-    for _, player in top_5_ca.iterrows():
-        print(f"   • {player['player_name']}: CA {player['CA']:.1f}, PA {player['PA']:.1f}")
+    top_5_ca = top_rows(attributes_df, 'CA', 5)[['player_name', 'CA', 'PA']]
+    for name, ca, pa in top_5_ca.itertuples(index=False):
+        print(f"   • {name}: CA {ca:.1f}, PA {pa:.1f}")
     
     print(f"\n🚀 TOP PLAYERS BY PA:")
-    top_5_pa = attributes_df.nlargest(5, 'PA')[['player_name', 'CA', 'PA']]
-    for _, player in top_5_pa.iterrows():
-        print(f"   • {player['player_name']}: CA {player['CA']:.1f}, PA {player['PA']:.1f}")
+    top_5_pa = top_rows(attributes_df, 'PA', 5)[['player_name', 'CA', 'PA']]
+    for name, ca, pa in top_5_pa.itertuples(index=False):
+        print(f"   • {name}: CA {ca:.1f}, PA {pa:.1f}")
     
     print(f"\n⚽ PERFORMANCE STATS:")
-    print(f"   • Average Goals/90: {stats_df['goals_per90'].mean():.2f}")
-    print(f"   • Average Assists/90: {stats_df['assists_per90'].mean():.2f}")
-    print(f"   • Average Pass Accuracy: {stats_df['pass_accuracy'].mean():.1f}%")
+    perf_means = stats_df[['goals_per90', 'assists_per90', 'pass_accuracy']].mean()
+    print(f"   • Average Goals/90: {perf_means['goals_per90']:.2f}")
+    print(f"   • Average Assists/90: {perf_means['assists_per90']:.2f}")
+    print(f"   • Average Pass Accuracy: {perf_means['pass_accuracy']:.1f}%")
     print(f"   • Total Minutes: {stats_df['minutes_played'].sum():,}")
     
     print(f"\n📈 ATTRIBUTE RANGES:")
     key_attrs = ['passing', 'shooting', 'dribbling', 'pace', 'tackling', 'goalkeeping']
-    for attr in key_attrs:
-        if attr in attributes_df.columns:
-            min_val = attributes_df[attr].min()
-            max_val = attributes_df[attr].max()
-            avg_val = attributes_df[attr].mean()
-            print(f"   • {attr.capitalize()}: {min_val:.1f} - {max_val:.1f} (avg: {avg_val:.1f})")
+    # min/max/mean of every present attribute in one agg call
+    ranges = attributes_df[[a for a in key_attrs if a in attributes_df.columns]].agg(['min', 'max', 'mean'])
+    for attr, (min_val, max_val, avg_val) in ranges.items():
+        print(f"   • {attr.capitalize()}: {min_val:.1f} - {max_val:.1f} (avg: {avg_val:.1f})")
     
     print("\n" + "="*60)
 
@@ -313,11 +390,21 @@ def main():
             print("⚠️  No player stats found in database!")
             return
         
-        # Create visualizations
-        plot_attribute_distributions(attributes_df)
-        plot_top_players(attributes_df)
-        plot_attribute_correlations(attributes_df)
-        plot_performance_stats(stats_df)
+        # Create visualizations; the four figures are independent, so batch runs render them
+        # in separate processes (interactive runs stay serial so each window can be shown)
+        plots = [
+            (plot_attribute_distributions, attributes_df),
+            (plot_top_players, attributes_df),
+            (plot_attribute_correlations, attributes_df),
+            (plot_performance_stats, stats_df),
+        ]
+        if INTERACTIVE:
+            for plot, df in plots:
+                plot(df)
+        else:
+            with ProcessPoolExecutor(max_workers=len(plots)) as executor:
+                for future in [executor.submit(plot, df) for plot, df in plots]:
+                    future.result()  # re-raise any worker error here
         
         # Create summary report
         create_summary_report(attributes_df, stats_df)